@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Benchmark de arranque en frío de cada reporter, en procesos nuevos:
+#   - importación: lo que tarda `import <reporter>` (sin correr main)
+#   - primer pedido: desde que se lanza `python <reporter>.py` hasta que llega su primer
+#     pedido HTTP a un servidor local (REPORTER_HOST_OVERRIDES manda todos los hosts ahí)
+# Uso: python benchmarks/bench_arranque.py [repeticiones] [--detalle]
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTERS = ["weather_reporter", "culture_reporter", "horoscope_reporter", "tourism_reporter", "trends_reporter"]
+
+class Receptor(BaseHTTPRequestHandler):
+    """Anota cuándo llega el primer pedido y contesta 503 para que el reporter termine rápido."""
+    def _responder(self):
+        if not self.server.primero.is_set():
+            self.server.momento = time.perf_counter()
+            self.server.primero.set()
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+    do_GET = do_POST = do_HEAD = do_DELETE = _responder
+    def log_message(self, *args): pass
+
+class Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Los procesos se matan a mitad de pedido a propósito: ese corte no es un error
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)): return
+        super().handle_error(request, client_address)
+
+def entorno(puerto, cache_dir):
+    local = f"http://127.0.0.1:{puerto}"
+    return dict(os.environ, REPORTER_HOST_OVERRIDES=f"*={local}", REPORTER_CACHE_DIR=cache_dir,
+                WORDPRESS_URL=local, WORDPRESS_USER="bench", WORDPRESS_APP_PASSWORD="bench",
+                GEMINI_API_KEY="bench", GOOGLE_SEARCH_API_KEY="bench", GOOGLE_SEARCH_CX="bench",
+                PYTHONDONTWRITEBYTECODE="1")
+
+def medir_importacion(modulo, env):
+    codigo = f"import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, env=env, capture_output=True, text=True, check=True)
+    return float(salida.stdout.strip().splitlines()[-1])
+
+def medir_primer_pedido(modulo, servidor, env, limite=30):
+    servidor.primero = threading.Event()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, f"{modulo}.py"], cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return servidor.momento - inicio if servidor.primero.wait(limite) else None
+    finally:
+        proceso.kill(); proceso.wait()
+
+def medir_interprete(env):
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=RAIZ, env=env, check=True)
+    return time.perf_counter() - inicio
+
+def detalle_importacion(modulo, env, top=8):
+    """Los imports más caros (acumulado, -X importtime) de los que cuelgan del reporter."""
+    salida = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"], cwd=RAIZ, env=env, capture_output=True, text=True)
+    filas, subarbol = [], []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea: continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        subarbol.append((int(acumulado), nombre.strip()))
+        # -X importtime lista los hijos antes que el padre: al cerrar un import de primer
+        # nivel, lo acumulado hasta ahí es su subárbol (así no se cuela lo que importa `site`)
+        if not nombre.startswith("  "):
+            if nombre.strip() == modulo: filas = subarbol
+            subarbol = []
+    for acumulado, nombre in sorted(filas, reverse=True)[1:top + 1]:
+        print(f"      {acumulado / 1000:8.1f} ms  {nombre}")
+
+def ms(valores):
+    valores = [v for v in valores if v is not None]
+    return f"{statistics.median(valores) * 1000:8.1f} ms" if valores else "       -   "
+
+def main():
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    repeticiones = int(argumentos[0]) if argumentos else 5
+    detalle = "--detalle" in sys.argv
+
+    servidor = Servidor(("127.0.0.1", 0), Receptor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = entorno(servidor.server_port, cache_dir)
+        print(f"🐍 Intérprete solo (python -c pass): {ms([medir_interprete(env) for _ in range(repeticiones)]).strip()}")
+        print(f"\n{'reporter':<20} {'importación':>12} {'primer pedido':>14}")
+        for modulo in REPORTERS:
+            importacion = [medir_importacion(modulo, env) for _ in range(repeticiones)]
+            primer_pedido = [medir_primer_pedido(modulo, servidor, env) for _ in range(repeticiones)]
+            print(f"{modulo:<20} {ms(importacion):>12} {ms(primer_pedido):>14}")
+            if detalle: detalle_importacion(modulo, env)
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
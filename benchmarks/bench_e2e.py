@@ -0,0 +1,133 @@
+import os
+import sys
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from collections import defaultdict
+
+# Benchmark de punta a punta: corre el main() de cada reporter contra los servidores
+# simulados (benchmarks/servidores_simulados.py) y reporta percentiles de latencia por
+# reporter (total), por etapa (etapas.py) y por endpoint (http_client).
+#
+#   python benchmarks/bench_e2e.py -n 5 --escala 0.2 --perfil gemini=800,200,0.05
+#
+# Por defecto cada iteración arranca con la caché en disco vacía y sin caché de búsquedas;
+# con --cache se comparte entre iteraciones (mide el caso "proceso residente").
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import servidores_simulados
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores: return 0.0
+    return valores[min(len(valores) - 1, max(0, math.ceil(p / 100 * len(valores)) - 1))]
+
+def endpoint(metodo, url):
+    """Nombre corto del endpoint para agrupar: servicio + la parte fija de la ruta."""
+    from urllib.parse import urlsplit
+    partes = urlsplit(url)
+    servicio = servidores_simulados.HOSTS.get(partes.netloc)
+    if "/wp-json/" in partes.path:
+        ruta = "/".join(p for p in partes.path.split("/wp-json/", 1)[1].split("/") if not p.isdigit())
+        return f"wp {metodo} {ruta}"
+    if servicio == "gemini": return f"gemini {partes.path.rsplit(':', 1)[-1]}"
+    return f"{servicio or 'imagenes'} {metodo}"
+
+class Registro:
+    """Junta las mediciones que mandan los observadores, etiquetadas con el reporter en curso."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reporter = None
+        self.series = defaultdict(list) # (tipo, reporter, nombre) -> [segundos]
+        self.errores = defaultdict(int)
+
+    def anotar(self, tipo, nombre, segundos, ok=True):
+        with self.lock:
+            clave = (tipo, self.reporter, nombre)
+            self.series[clave].append(segundos)
+            if not ok: self.errores[clave] += 1
+
+    def http(self, metodo, url, res, segundos):
+        self.anotar("endpoint", endpoint(metodo, url), segundos, res is not None and res.status_code < 400)
+
+    def etapa(self, nombre, segundos, ok):
+        self.anotar("etapa", nombre.split(":")[0], segundos, ok) # "post:Zapala" -> "post"
+
+def imprimir(registro, tipo, titulo):
+    filas = sorted((clave, valores) for clave, valores in registro.series.items() if clave[0] == tipo)
+    if not filas: return
+    print(f"\n{titulo}")
+    print(f"  {'reporter':<11} {'nombre':<34} {'n':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'máx':>9} {'err':>5}")
+    for clave, valores in filas:
+        valores = sorted(valores)
+        ms = [f"{percentil(valores, p) * 1000:8.1f}" for p in (50, 90, 99)] + [f"{valores[-1] * 1000:8.1f}"]
+        print(f"  {clave[1]:<11} {clave[2]:<34} {len(valores):>5} {' '.join(ms)} {registro.errores[clave]:>5}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta contra servidores simulados.")
+    parser.add_argument("-n", "--iteraciones", type=int, default=3)
+    parser.add_argument("--reporters", default="clima,cultura,horoscopo,turismo,tendencias", help="lista separada por comas")
+    parser.add_argument("--perfil", action="append", default=[], metavar="SERVICIO=LAT,JITTER,ERROR",
+                        help=f"latencia/jitter en ms y tasa de error (servicios: {', '.join(servidores_simulados.PERFILES)})")
+    parser.add_argument("--escala", type=float, default=1.0, help="multiplica todas las latencias (ej. 0.1 para una corrida rápida)")
+    parser.add_argument("--cache", action="store_true", help="compartir las cachés entre iteraciones")
+    parser.add_argument("--verbose", action="store_true", help="mostrar la salida de los reporters")
+    args = parser.parse_args()
+
+    perfiles = dict(servidores_simulados.leer_perfil(p) for p in args.perfil)
+    bases, detener = servidores_simulados.iniciar(perfiles, args.escala)
+    cache_base = tempfile.mkdtemp(prefix="bench-e2e-")
+
+    # La configuración se lee al importar: el entorno tiene que estar listo antes
+    os.environ.update(servidores_simulados.variables_entorno(bases))
+    os.environ["REPORTER_CACHE_DIR"] = cache_base
+    if not args.cache: os.environ["CSE_CACHE"] = "0"
+    import http_client
+    import etapas
+    import storage
+    import runner
+
+    nombres = [n.strip() for n in args.reporters.split(",") if n.strip()]
+    desconocidos = [n for n in nombres if n not in runner.REPORTERS]
+    if desconocidos: parser.error(f"reporters desconocidos: {', '.join(desconocidos)}")
+
+    registro = Registro()
+    http_client.observadores.append(registro.http)
+    etapas.observadores.append(registro.etapa)
+    print(f"🧪 {args.iteraciones} iteraciones, escala {args.escala:g}, cache {'compartida' if args.cache else 'vacía'}")
+    print("   " + ", ".join(f"{s}: {servidores_simulados.PERFILES[s] if s not in perfiles else perfiles[s]}" for s in servidores_simulados.PERFILES))
+
+    nulo = open(os.devnull, "w")
+    try:
+        for nombre in nombres:
+            correr = runner.funcion(nombre)
+            for i in range(args.iteraciones):
+                if not args.cache: storage.CACHE_DIR = tempfile.mkdtemp(dir=cache_base)
+                registro.reporter = nombre
+                salida = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(nulo)
+                inicio, ok = time.perf_counter(), True
+                with salida:
+                    try: correr()
+                    except SystemExit as e: ok = not e.code
+                    except Exception: ok = False
+                registro.anotar("total", "main()", time.perf_counter() - inicio, ok)
+                print(f"  {nombre} #{i + 1}: {(time.perf_counter() - inicio) * 1000:.0f} ms {'✅' if ok else '❌'}")
+    finally:
+        detener()
+        http_client.cerrar()
+        nulo.close()
+        shutil.rmtree(cache_base, ignore_errors=True)
+
+    imprimir(registro, "total", "⏱️ Total por reporter (ms)")
+    imprimir(registro, "etapa", "🧩 Por etapa (ms)")
+    imprimir(registro, "endpoint", "🌐 Por endpoint (ms)")
+
+if __name__ == "__main__":
+    main()
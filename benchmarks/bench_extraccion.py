@@ -0,0 +1,122 @@
+import os
+import re
+import sys
+import time
+import random
+import statistics
+import tracemalloc
+
+# Benchmark de extracción: árbol completo con BeautifulSoup (como antes) contra los
+# extractores incrementales de extraccion.py, sobre páginas sintéticas grandes.
+# Uso: python benchmarks/bench_extraccion.py [repeticiones]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import extraccion
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+CHUNK = 16384 # Mismo tamaño de fragmento que snapshots.obtener_incremental
+
+# --- PÁGINAS SINTÉTICAS ---
+def pagina_tendencias(horas=48, por_lista=50):
+    """Parecida a trends24: una lista por hora, la más reciente primero, con bastante ruido alrededor."""
+    r = random.Random(1)
+    partes = ["<!DOCTYPE html><html><head><title>Trends</title>"]
+    partes += [f"<script>var x{i} = '{'a' * 200}';</script>" for i in range(50)]
+    partes.append("</head><body><nav><a href='/'>Inicio</a></nav>")
+    for h in range(horas):
+        partes.append(f"<div class='list-container'><h3 class='title'>Hace {h} horas</h3><ol class='trend-card__list'>")
+        for i in range(por_lista):
+            partes.append(f"<li><span class='trend-name'><a href='/t/{h}-{i}' class='trend-link'>#Tema{h}_{i}_{r.randint(0, 999)}</a></span>"
+                          f"<span class='tweet-count'>{r.randint(1, 99)}K</span></li>")
+        partes.append("</ol></div>")
+    partes.append("<footer>pie</footer></body></html>")
+    return "".join(partes)
+
+def eventos_agenda(cantidad):
+    """(sala, día, mes, hora) de cada evento sintético, siempre los mismos."""
+    r = random.Random(2)
+    return [(r.randint(1, 30), r.randint(1, 28), r.randint(1, 12), r.randint(10, 23)) for _ in range(cantidad)]
+
+def pagina_agenda(eventos=3000, sin_fecha_cada=0):
+    """
+    Parecida a la agenda municipal: mucho texto, scripts y menús mezclados con los eventos.
+    Con `sin_fecha_cada`=N, uno de cada N eventos no trae la fecha en el listado (solo en su página).
+    """
+    partes = ["<!DOCTYPE html><html><head><style>body { color: red; }</style></head><body>"]
+    partes.append("<nav>" + "".join(f"<a href='/s{i}'>Sección {i}</a>" for i in range(200)) + "</nav>")
+    for i, (sala, dia, mes, hora) in enumerate(eventos_agenda(eventos)):
+        cuando = "Consultar horarios" if sin_fecha_cada and i % sin_fecha_cada == 0 else f"{dia}/{mes} a las {hora}:00 hs."
+        partes.append(f"<article><h2><a href='/agenda/evento-{i}/'>Evento {i}: Música &amp; teatro</a></h2>\n  <p>Lugar: Sala {sala}  —  "
+                      f"{cuando}</p>"
+                      f"<script>track({i});</script></article>\n")
+    partes.append("<footer>Municipalidad de Neuquén</footer></body></html>")
+    return "".join(partes)
+
+def pagina_evento(i):
+    """Página de detalle de un evento de pagina_agenda(), con el horario exacto y la dirección."""
+    sala, dia, mes, hora = eventos_agenda(i + 1)[i]
+    return ("<!DOCTYPE html><html><head><title>Agenda</title><script>var a = 1;</script></head><body>"
+            + "<nav>" + "".join(f"<a href='/s{j}'>Sección {j}</a>" for j in range(50)) + "</nav>"
+            + f"<main><h1>Evento {i}: Música &amp; teatro</h1><p>Fecha: {dia}/{mes}, {hora}:30 hs.</p>"
+            + f"<p>Lugar: Sala {sala}, Av. Argentina {100 + i}</p><p>{'Descripción del evento. ' * 40}</p></main>"
+            + "<footer>Municipalidad de Neuquén</footer></body></html>")
+
+# --- CAMINOS A COMPARAR ---
+def tendencias_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    lista_actual = soup.find("ol", class_="trend-card__list")
+    return [item.find("a").text for item in lista_actual.find_all("li")[:8]] if lista_actual else []
+
+def texto_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(["script", "style", "nav", "footer"]): tag.decompose()
+    return re.sub(r'\s+', ' ', soup.get_text(separator=' ').strip())[:12000]
+
+def fragmentos(html):
+    return (html[i:i + CHUNK] for i in range(0, len(html), CHUNK))
+
+def tendencias_incremental(html):
+    return extraccion.extraer(extraccion.ExtractorTendencias(8), fragmentos(html))
+
+def texto_incremental(html):
+    return extraccion.extraer(extraccion.ExtractorTexto(12000), fragmentos(html))
+
+# --- MEDICIÓN ---
+def medir(funcion, html, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(html)
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos), pico
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    casos = [
+        ("trends24", pagina_tendencias(), tendencias_bs4, tendencias_incremental),
+        ("agenda", pagina_agenda(), texto_bs4, texto_incremental),
+    ]
+    for nombre, html, viejo, nuevo in casos:
+        print(f"\n📄 {nombre}: {len(html) / 1024:.0f} KB")
+        t_nuevo, m_nuevo = medir(nuevo, html, repeticiones)
+        if BeautifulSoup is None:
+            print(f"   incremental: {t_nuevo * 1000:8.2f} ms  pico {m_nuevo / 1024:8.0f} KB  (bs4 no instalado, sin comparación)")
+            continue
+        if viejo(html) != nuevo(html):
+            print("   ❌ Los resultados no coinciden")
+            sys.exit(1)
+        t_viejo, m_viejo = medir(viejo, html, repeticiones)
+        print(f"   bs4:         {t_viejo * 1000:8.2f} ms  pico {m_viejo / 1024:8.0f} KB")
+        print(f"   incremental: {t_nuevo * 1000:8.2f} ms  pico {m_nuevo / 1024:8.0f} KB")
+        print(f"   ✅ Mismo resultado, {t_viejo / t_nuevo:.0f}x más rápido, {m_viejo / max(m_nuevo, 1):.0f}x menos memoria")
+
+if __name__ == "__main__":
+    main()
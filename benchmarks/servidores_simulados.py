@@ -0,0 +1,284 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidores locales que imitan a cada API externa de los reporters (Open-Meteo, SMN,
+# Google CSE, Gemini, trends24, la agenda municipal, WordPress y las imágenes), con
+# latencia, jitter y tasa de errores configurables por servicio.
+#
+#   python benchmarks/servidores_simulados.py   # los levanta y muestra las variables a exportar
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_extraccion import pagina_tendencias, pagina_agenda, pagina_evento
+
+# Host real -> servicio simulado ("*" = cualquier otro host: descargas de imágenes)
+HOSTS = {
+    "api.open-meteo.com": "openmeteo",
+    "ws.smn.gob.ar": "smn",
+    "www.googleapis.com": "cse",
+    "generativelanguage.googleapis.com": "gemini",
+    "trends24.in": "trends24",
+    "www.neuquencapital.gov.ar": "agenda",
+    "wp.simulado": "wp", # WORDPRESS_URL apunta acá
+    "*": "imagenes",
+}
+
+class Perfil:
+    """Latencia media y jitter (ms) y probabilidad de responder 503."""
+
+    def __init__(self, latencia=100, jitter=0, error=0.0):
+        self.latencia, self.jitter, self.error = latencia, jitter, error
+
+    def demora(self, escala=1.0):
+        return max(0.0, (self.latencia + random.uniform(-self.jitter, self.jitter)) * escala / 1000)
+
+    def __repr__(self):
+        return f"{self.latencia:g}±{self.jitter:g}ms err={self.error:g}"
+
+PERFILES = {
+    "openmeteo": Perfil(150, 50),
+    "smn": Perfil(200, 80),
+    "cse": Perfil(250, 80),
+    "gemini": Perfil(3000, 1000),
+    "trends24": Perfil(300, 100),
+    "agenda": Perfil(400, 150),
+    "wp": Perfil(300, 100),
+    "imagenes": Perfil(200, 80),
+}
+
+def leer_perfil(texto):
+    """'gemini=800,200,0.05' -> ("gemini", Perfil(800, 200, 0.05)); los valores que faltan quedan por defecto."""
+    servicio, _, valores = texto.partition("=")
+    if servicio not in PERFILES: raise ValueError(f"Servicio desconocido: {servicio} (hay: {', '.join(PERFILES)})")
+    base = PERFILES[servicio]
+    numeros = [float(v) for v in valores.split(",") if v.strip()]
+    latencia, jitter, error = (numeros + [base.latencia, base.jitter, base.error][len(numeros):])[:3]
+    return servicio, Perfil(latencia, jitter, error)
+
+# --- CONTENIDO ---
+def _jpeg():
+    try:
+        from PIL import Image
+        salida = io.BytesIO()
+        Image.new("RGB", (1200, 800), (70, 120, 160)).save(salida, "JPEG", quality=85)
+        return salida.getvalue()
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + bytes(50000) + b"\xff\xd9" # Sin Pillow: solo las marcas de JPEG
+
+PAGINAS = {"trends24": None, "agenda": None}
+JPEG = None
+
+def _contenido():
+    global JPEG
+    if JPEG is None:
+        PAGINAS["trends24"] = pagina_tendencias(horas=24, por_lista=50).encode("utf-8")
+        PAGINAS["agenda"] = pagina_agenda(eventos=800, sin_fecha_cada=40).encode("utf-8")
+        JPEG = _jpeg()
+
+def texto_gemini(prompt):
+    """Respuesta plausible según el prompt de cada reporter."""
+    if "RESPONDE SOLO CON EL NOMBRE EXACTO" in prompt:
+        elegida = re.search(r"TENDENCIA: (.+)", prompt)
+        return elegida.group(1).strip() if elegida else "NINGUNA"
+    parrafos = " ".join(["Texto simulado para medir la latencia del pipeline completo."] * 12)
+    if "MARKDOWN" in prompt:
+        return ("# Clima simulado: se espera una máxima de **25°C**\n\nBajada del pronóstico.\n\n"
+                + "".join(f"## Sección {i}\n\n{parrafos}\n\n" for i in range(3)))
+    return ("```html\n<h1>Nota simulada para el benchmark</h1>\n<h2>Bajada</h2>\n"
+            + "".join(f"<h3>Sección {i}</h3>\n<p>{parrafos}</p>\n" for i in range(12)) + "```")
+
+def respuesta_cse(params):
+    q = params.get("q", [""])[0]
+    n = int(params.get("num", ["3"])[0])
+    if params.get("searchType", [""])[0] == "image":
+        items = [{"title": f"Teatro y museo - foto {i}", "link": f"https://imagenes.simuladas/foto-{i}.jpg", "displayLink": "imagenes.simuladas",
+                  "mime": "image/jpeg", "image": {"width": 1200, "height": 800, "byteSize": len(JPEG)}} for i in range(n)]
+    elif q.startswith("site:twitter.com"):
+        items = [{"title": "Tweet", "link": "https://twitter.com/usuario/status/1", "snippet": "tweet", "displayLink": "twitter.com"}]
+    else:
+        items = [{"title": f"Noticia {i} sobre {q[:40]}", "link": f"https://noticias.simuladas/{i}", "displayLink": "noticias.simuladas",
+                  "snippet": "Resumen de la noticia con contexto suficiente para que el reporter la tome en cuenta."} for i in range(n)]
+    return {"items": items}
+
+def respuesta_openmeteo(params):
+    cantidad = len(params.get("latitude", ["0"])[0].split(","))
+    uno = {"current": {"temperature_2m": 18.5, "weather_code": 1, "wind_speed_10m": 12.0, "wind_gusts_10m": 30.0, "is_day": 1},
+           "daily": {"weather_code": [1], "temperature_2m_max": [25.1], "temperature_2m_min": [9.3], "uv_index_max": [7.2],
+                     "precipitation_sum": [0.0], "precipitation_probability_max": [10]}}
+    return [uno] * cantidad if cantidad > 1 else uno
+
+ALERTAS_SMN = [{"title": "Viento", "severity": "amarilla", "zones": {"1": "Zapala"}},
+               {"title": "Tormentas", "severity": "naranja", "zones": {"1": "Bariloche"}}]
+
+# --- SERVIDOR ---
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, como los servidores reales
+
+    def log_message(self, *args): pass
+
+    def _enviar(self, estado, cuerpo=b"", tipo="application/json", cabeceras=None):
+        if isinstance(cuerpo, (dict, list)): cuerpo = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in (cabeceras or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD": self.wfile.write(cuerpo)
+
+    def _atender(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = self.rfile.read(largo) if largo else b""
+        servidor = self.server
+        partes = urlsplit(self.path)
+        params = parse_qs(partes.query)
+
+        # La demora entera antes de responder, salvo el streaming de Gemini que la reparte
+        es_stream = servidor.servicio == "gemini" and ":streamGenerateContent" in partes.path
+        demora = servidor.perfil.demora(servidor.escala)
+        time.sleep(demora * (0.3 if es_stream else 1))
+        if random.random() < servidor.perfil.error:
+            return self._enviar(503, {"error": {"code": 503, "message": "error simulado"}})
+        getattr(self, f"_{servidor.servicio}")(partes.path, params, cuerpo, demora * 0.7)
+
+    do_GET = do_POST = do_HEAD = do_DELETE = _atender
+
+    def _openmeteo(self, ruta, params, cuerpo, resto):
+        self._enviar(200, respuesta_openmeteo(params))
+
+    def _smn(self, ruta, params, cuerpo, resto):
+        self._enviar(200, ALERTAS_SMN)
+
+    def _cse(self, ruta, params, cuerpo, resto):
+        self._enviar(200, respuesta_cse(params))
+
+    def _pagina(self, nombre, contenido=None):
+        etag = f'"{nombre}-1"'
+        if self.headers.get("If-None-Match") == etag: return self._enviar(304, cabeceras={"ETag": etag})
+        self._enviar(200, contenido or PAGINAS[nombre], "text/html; charset=utf-8", {"ETag": etag})
+
+    def _trends24(self, ruta, params, cuerpo, resto): self._pagina("trends24")
+
+    def _agenda(self, ruta, params, cuerpo, resto):
+        evento = re.match(r"/agenda/evento-(\d+)/$", ruta)
+        if evento: return self._pagina(f"evento-{evento.group(1)}", pagina_evento(int(evento.group(1))).encode("utf-8"))
+        self._pagina("agenda")
+
+    def _imagenes(self, ruta, params, cuerpo, resto):
+        if ruta.endswith("/foto-0.jpg"): return self._enviar(404, b"<html>no encontrada</html>", "text/html") # Primer resultado roto
+        rango = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if not rango: return self._enviar(200, JPEG, "image/jpeg")
+        inicio, fin = int(rango.group(1)), min(int(rango.group(2) or len(JPEG) - 1), len(JPEG) - 1)
+        self._enviar(206, JPEG[inicio:fin + 1], "image/jpeg", {"Content-Range": f"bytes {inicio}-{fin}/{len(JPEG)}"})
+
+    def _gemini(self, ruta, params, cuerpo, resto):
+        servidor = self.server
+        if servidor.cuota:
+            # Cuota por segundo como la de la API: pasada, 429 con Retry-After
+            with servidor.lock:
+                ahora = time.monotonic()
+                servidor.pedidos = [t for t in servidor.pedidos if ahora - t < 1] + [ahora]
+                excedido = len(servidor.pedidos) > servidor.cuota
+            if excedido: return self._enviar(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, cabeceras={"Retry-After": "1"})
+        prompt = json.loads(cuerpo or b"{}").get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+        texto = texto_gemini(prompt)
+        if ":streamGenerateContent" not in ruta:
+            return self._enviar(200, {"candidates": [{"content": {"parts": [{"text": texto}]}}]})
+
+        # SSE en 8 fragmentos repartiendo el resto de la demora (sin Content-Length: se cierra al final)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        paso = max(1, len(texto) // 8)
+        for i in range(0, len(texto), paso):
+            evento = {"candidates": [{"content": {"parts": [{"text": texto[i:i + paso]}]}}]}
+            self.wfile.write(f"data: {json.dumps(evento)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(resto / 8)
+        self.close_connection = True
+
+    def _wp_pedido(self, metodo, ruta, datos=None, params=None):
+        """(status, cuerpo) de un pedido a /wp/v2, suelto o dentro de un lote."""
+        servidor = self.server
+        m = re.match(r"/wp/v2/(media|posts)(?:/(\d+))?$", ruta)
+        if not m: return 404, {"code": "rest_no_route"}
+        datos, params = datos or {}, params or {}
+        if metodo == "POST" and not m.group(2):
+            with servidor.lock:
+                servidor.siguiente_id += 1
+                nuevo = servidor.siguiente_id
+                if m.group(1) == "posts": servidor.posts[nuevo] = {"id": nuevo, "status": "draft", **datos}
+            return 201, {"id": nuevo, "link": f"https://wp.simulado/?p={nuevo}"}
+        if m.group(2):
+            if metodo == "POST" and int(m.group(2)) in servidor.posts: servidor.posts[int(m.group(2))].update(datos)
+            return 200, {"id": int(m.group(2))}
+        if m.group(1) == "posts" and metodo == "GET":
+            # Filtros que usan los reporters: status, after/before (sobre date_gmt) y search en el título
+            estados = (params.get("status") or ["publish"])[0].split(",")
+            desde, hasta, buscar = (params.get(k, [""])[0] for k in ("after", "before", "search"))
+            return 200, [{"id": p["id"], "status": p["status"], "date_gmt": p.get("date_gmt"), "title": {"rendered": p.get("title", "")}}
+                         for p in list(servidor.posts.values()) if p["status"] in estados and buscar.lower() in str(p.get("title", "")).lower()
+                         and (not desde or (p.get("date_gmt") or "") >= desde) and (not hasta or (p.get("date_gmt") or "") < hasta)]
+        return 200, []
+
+    def _wp(self, ruta, params, cuerpo, resto):
+        if ruta == "/wp-json/batch/v1" and self.command == "POST" and self.server.lotes:
+            pedidos = json.loads(cuerpo or b"{}").get("requests", [])
+            if len(pedidos) > 25: return self._enviar(400, {"code": "rest_batch_max_requests_exceeded"})
+            respuestas = [dict(zip(("status", "body"), self._wp_pedido(p.get("method", "POST"), p["path"], p.get("body"))), headers={}) for p in pedidos]
+            return self._enviar(207, {"responses": respuestas})
+        if not ruta.startswith("/wp-json/wp/v2/"): return self._enviar(404, {"code": "rest_no_route"})
+        datos = json.loads(cuerpo or b"{}") if "json" in self.headers.get("Content-Type", "") else None
+        self._enviar(*self._wp_pedido(self.command, ruta[len("/wp-json"):], datos, params))
+
+class Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass # Los clientes cortan a propósito (extracción con salida temprana, llamadas abandonadas)
+
+def iniciar(perfiles=None, escala=1.0):
+    """
+    Levanta un servidor por servicio en 127.0.0.1 (puertos libres). Devuelve
+    ({servicio: url_base}, detener) con `detener()` para apagarlos.
+    """
+    _contenido()
+    perfiles = dict(PERFILES, **(perfiles or {}))
+    servidores, bases = [], {}
+    for servicio, perfil in perfiles.items():
+        servidor = Servidor(("127.0.0.1", 0), Manejador)
+        servidor.servicio, servidor.perfil, servidor.escala = servicio, perfil, escala
+        servidor.lock, servidor.siguiente_id, servidor.posts = threading.Lock(), 100, {}
+        servidor.lotes = os.environ.get("SIMULADO_WP_LOTES", "1") == "1" # 0 = WP sin /batch/v1 (prueba el fallback)
+        servidor.cuota, servidor.pedidos = int(os.environ.get("SIMULADO_GEMINI_RPS", "0")), [] # >0: pedidos por segundo antes del 429
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        bases[servicio] = f"http://127.0.0.1:{servidor.server_port}"
+
+    def detener():
+        for servidor in servidores: servidor.shutdown(); servidor.server_close()
+    return bases, detener
+
+def variables_entorno(bases):
+    """Variables que apuntan los reporters a los servidores simulados."""
+    return {
+        "REPORTER_HOST_OVERRIDES": ";".join(f"{host}={bases[servicio]}" for host, servicio in HOSTS.items()),
+        "WORDPRESS_URL": "https://wp.simulado", "WORDPRESS_USER": "bench", "WORDPRESS_APP_PASSWORD": "bench",
+        "GEMINI_API_KEY": "bench", "GOOGLE_SEARCH_API_KEY": "bench", "GOOGLE_SEARCH_CX": "bench",
+    }
+
+if __name__ == "__main__":
+    bases, detener = iniciar(dict(leer_perfil(a) for a in sys.argv[1:]))
+    for k, v in variables_entorno(bases).items(): print(f"export {k}='{v}'")
+    print("# Ctrl+C para terminar")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        detener()
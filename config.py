@@ -0,0 +1,22 @@
+import os
+
+# Configuración compartida por todos los reporters (una sola lectura del entorno,
+# también cuando corren juntos dentro de runner.py).
+
+# --- CREDENCIALES ---
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GOOGLE_SEARCH_API_KEY = os.environ.get("GOOGLE_SEARCH_API_KEY")
+GOOGLE_SEARCH_CX = os.environ.get("GOOGLE_SEARCH_CX")
+
+# --- WORDPRESS ---
+WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
+WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
+WORDPRESS_URL = (os.environ.get("WORDPRESS_URL") or "").rstrip('/')
+WORDPRESS_AUTHOR_ID = os.environ.get("WORDPRESS_AUTHOR_ID", "1")
+
+# --- PROCESO ---
+RESIDENTE = False # runner.py (modo scheduler) lo pone en True: el proceso sigue vivo y se puede dejar trabajo en segundo plano
+
+def wordpress_configurado():
+    """True si están las tres variables necesarias para publicar."""
+    return bool(WORDPRESS_URL and WORDPRESS_USER and WORDPRESS_APP_PASSWORD)
@@ -1,20 +1,25 @@
 import os
-import requests
+import google_search
+import gemini_client
+import wordpress
+import imagenes
+import limpieza
+import etapas
+import snapshots
+import rastreo
+import storage
+import extraccion
+import tracing
 import json
 import time
 from datetime import datetime, timedelta
 import re
-from bs4 import BeautifulSoup
+import sys
+import config
 
 # --- CONFIGURACIÓN ---
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GOOGLE_SEARCH_API_KEY = os.environ.get("GOOGLE_SEARCH_API_KEY")
-GOOGLE_SEARCH_CX = os.environ.get("GOOGLE_SEARCH_CX")
-
-WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
-WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
-WORDPRESS_URL = os.environ.get("WORDPRESS_URL").rstrip('/')
-WORDPRESS_AUTHOR_ID = os.environ.get("WORDPRESS_AUTHOR_ID", "1")
+from config import (GEMINI_API_KEY, GOOGLE_SEARCH_API_KEY, GOOGLE_SEARCH_CX,
+                    WORDPRESS_USER, WORDPRESS_APP_PASSWORD, WORDPRESS_URL, WORDPRESS_AUTHOR_ID)
 
 # --- 1. FECHAS ---
 def obtener_proximo_finde():
@@ -32,21 +37,87 @@ def obtener_proximo_finde():
         "sabado": fmt(sabado),
         "domingo": fmt(domingo),
         "short_date": f"{viernes.day}/{viernes.month}",
-        "query_date": f"{meses[viernes.month-1]} {viernes.year}"
+        "query_date": f"{meses[viernes.month-1]} {viernes.year}",
+        "desde": viernes.date(), # Ventana del finde para filtrar eventos
+        "hasta": domingo.date()
     }
 
 # --- 2. DATOS ---
-def scrapear_web_oficial():
+AGENDA_DETALLES_MAX = int(os.environ.get("AGENDA_DETALLES_MAX", "40")) # Páginas de evento a leer por corrida
+AGENDA_INDICE_DIAS = 90 # Se olvidan los eventos que no aparecen en el listado hace más que esto
+CABECERAS = {'User-Agent': 'Mozilla/5.0'}
+DIAS_CORTOS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+def serializar_eventos(eventos):
+    """Una línea corta por evento para el prompt: "Sáb 25/10 21:00 | Título | Lugar | link"."""
+    lineas = []
+    for e in sorted(eventos, key=lambda e: (e["fecha"], e["hora"] or "99")):
+        dia = datetime.fromisoformat(e["fecha"])
+        campos = [f"{DIAS_CORTOS[dia.weekday()]} {dia.day}/{dia.month}" + (f" {e['hora']}" if e["hora"] else ""), e["titulo"]]
+        if e["lugar"]: campos.append(e["lugar"])
+        if e["link"]: campos.append(e["link"])
+        lineas.append(" | ".join(campos))
+    return "\n".join(lineas)
+
+def _huella_listado(evento):
+    return "|".join(str(evento.get(k) or "") for k in ("titulo", "fecha", "hora", "lugar"))
+
+def completar_eventos(eventos, referencia):
+    """
+    Completa fecha, lugar y hora con la página de detalle de cada evento (suelen estar ahí y
+    no en el listado; algunos ni traen fecha en el listado). Las páginas se leen en paralelo
+    con cortesía por host y quedan en un índice por URL (.cache/agenda_eventos.json): un
+    evento que sigue igual en el listado no se vuelve a pedir; solo se leen los nuevos o los
+    que cambiaron: primero los que ya tienen fecha y después los que no.
+    """
+    ruta = storage.ruta("agenda_eventos.json")
+    indice = storage.leer_json(ruta, {})
+    ahora = int(time.time())
+    por_link = {e["link"]: e for e in eventos if e["link"]}
+    pendientes = sorted((link for link, e in por_link.items() if indice.get(link, {}).get("listado") != _huella_listado(e)),
+                        key=lambda link: (por_link[link]["fecha"] is None, por_link[link]["fecha"] or ""))
+
+    if pendientes:
+        if len(pendientes) > AGENDA_DETALLES_MAX: print(f"⚠️ {len(pendientes)} eventos nuevos: se leen {AGENDA_DETALLES_MAX} ahora y el resto en la próxima corrida")
+        pendientes = pendientes[:AGENDA_DETALLES_MAX]
+        print(f"🕷️ Leyendo {len(pendientes)} página(s) de eventos nuevos o cambiados...")
+        leer = lambda url: snapshots.obtener_incremental(url, lambda: extraccion.ExtractorDetalle(referencia), headers=CABECERAS, timeout=10)
+        for link, detalle in rastreo.rastrear(pendientes, leer).items():
+            if detalle is not None: indice[link] = {"listado": _huella_listado(por_link[link]), "detalle": detalle}
+    for link in por_link:
+        if link in indice: indice[link]["visto"] = ahora
+    indice = {link: datos for link, datos in indice.items() if ahora - datos.get("visto", ahora) < AGENDA_INDICE_DIAS * 86400}
+    storage.escribir_json(ruta, indice)
+
+    completos = []
+    for e in eventos:
+        detalle = indice.get(e["link"] or "", {}).get("detalle") or {}
+        completos.append(dict(e, **{k: detalle[k] for k in ("fecha", "lugar", "hora") if detalle.get(k)}))
+    return completos
+
+def scrapear_web_oficial(fechas):
     url = "https://www.neuquencapital.gov.ar/agenda-de-actividades/"
     print(f"👉 Leyendo web oficial: {url}...")
     try:
-        res = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-        if res.status_code == 200:
-            soup = BeautifulSoup(res.text, 'html.parser')
-            for tag in soup(["script", "style", "nav", "footer"]): tag.decompose()
-            texto = re.sub(r'\s+', ' ', soup.get_text(separator=' ').strip())
-            return {"contenido": texto[:12000], "url": url}
-    except: pass
+        # Eventos (título, lugar, fecha, hora, link) de toda la página; si no cambió desde la
+        # última corrida (304), se reutiliza lo ya extraído
+        crear = lambda: extraccion.ExtractorEventos(fechas["desde"], url, sin_fecha=True)
+        pagina = snapshots.obtener_incremental(url, crear, headers=CABECERAS, timeout=10)
+        if pagina is None: return None
+        if not pagina["eventos"]:
+            # Estructura irreconocible: como antes, el texto visible recortado
+            print("⚠️ Sin eventos reconocibles, se usa el texto de la página.")
+            return {"eventos": [], "contenido": pagina["texto"][:6000], "url": url}
+
+        # Se completan con el detalle los que el listado pone en el finde y los que no traen fecha
+        # (la fecha puede estar solo en su página); recién después se filtra viernes a domingo
+        desde, hasta = fechas["desde"].isoformat(), fechas["hasta"].isoformat()
+        candidatos = [e for e in pagina["eventos"] if e["fecha"] is None or desde <= e["fecha"] <= hasta]
+        completos = completar_eventos(candidatos, fechas["desde"])
+        del_finde = [e for e in completos if e["fecha"] and desde <= e["fecha"] <= hasta]
+        print(f"📅 {len(del_finde)} de {len(pagina['eventos'])} eventos caen en el finde.")
+        return {"eventos": del_finde, "contenido": serializar_eventos(del_finde) or "(Sin eventos publicados para el finde)", "url": url}
+    except Exception as e: print(f"⚠️ Web oficial: {e}")
     return None
 
 def buscar_eventos_google(fechas):
@@ -60,8 +131,7 @@ def buscar_eventos_google(fechas):
     for q in queries:
         try:
             params = {"q": q, "cx": GOOGLE_SEARCH_CX, "key": GOOGLE_SEARCH_API_KEY, "num": 2}
-            res = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
-            data = res.json()
+            data = google_search.buscar(params, clase="agenda")
             if "items" in data:
                 for item in data["items"]:
                     resultados.append(f"- {item['title']} ({item['link']}): {item['snippet']}")
@@ -79,8 +149,7 @@ def buscar_y_subir_imagen_segura():
             "q": query, "cx": GOOGLE_SEARCH_CX, "key": GOOGLE_SEARCH_API_KEY,
             "searchType": "image", "imgSize": "large", "num": 8, "safe": "active"
         }
-        res = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
-        data = res.json()
+        data = google_search.buscar(params, clase="imagen")
         
         if "items" not in data: return None
 
@@ -88,7 +157,7 @@ def buscar_y_subir_imagen_segura():
         KEYWORDS_PERMITIDAS = ["teatro", "museo", "mnba", "centro cultural", "parque", "monumento", "cine", "orquesta", "escenario"]
         KEYWORDS_PROHIBIDAS = ["starbucks", "mc donalds", "café", "restaurante", "menu", "oferta", "burguer", "logo"]
         
-        img_url = None
+        candidatas = []
         
         for item in data["items"]:
             titulo = item["title"].lower()
@@ -100,49 +169,41 @@ def buscar_y_subir_imagen_segura():
             
             # 2. Chequeo de Lista Blanca (Debe decir Teatro, Museo, etc.)
             if any(good in titulo for good in KEYWORDS_PERMITIDAS):
-                img_url = item["link"]
-                print(f"✅ Imagen Aprobada: {titulo}")
-                break # Encontramos la correcta
+                candidatas.append({"url": item["link"], "titulo": titulo})
         
-        if not img_url:
+        if not candidatas:
             print("⚠️ Ninguna imagen pasó el filtro estricto. Usando imagen por defecto.")
             return None # Devolver None hará que no suba nada (o podríamos poner una URL fija de backup)
 
-        # Subida
-        res_img = requests.get(img_url, timeout=10)
-        if res_img.status_code == 200:
-            filename = f"cultura-nqn-{int(time.time())}.jpg"
-            url_up = f"{WORDPRESS_URL}/wp-json/wp/v2/media"
-            headers = {"Content-Type": "image/jpeg", "Content-Disposition": f"attachment; filename={filename}"}
-            auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
-            res_wp = requests.post(url_up, headers=headers, data=res_img.content, auth=auth)
-            if res_wp.status_code == 201: return res_wp.json()['id']
+        # 3. Todas las aprobadas se sondean a la vez: gana la mejor que responde con una imagen usable
+        elegidas = imagenes.elegir(candidatas)
+        if not elegidas:
+            print(f"⚠️ Ninguna de las {len(candidatas)} aprobadas responde con una imagen usable.")
+            return None
+        print(f"✅ Imagen Aprobada: {elegidas[0]['titulo']}")
+
+        # Subida (si la descarga de la mejor falla igual, sigue la próxima)
+        for candidata in elegidas:
+            ingerida = imagenes.ingerir(candidata["url"], f"cultura-nqn-{int(time.time())}")
+            if ingerida:
+                auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+                return wordpress.subir_media(WORDPRESS_URL, auth, *ingerida)
 
     except Exception as e:
         print(f"⚠️ Error imagen: {e}")
     return None
 
 # --- 4. REDACCIÓN CON ENLACES DESTACADOS ---
-def llamar_api_gemini(modelo, prompt):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{modelo}:generateContent?key={GEMINI_API_KEY}"
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {"temperature": 0.4} # Baja temperatura para ser preciso
-    }
-    try:
-        res = requests.post(url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        if res.status_code == 200: return res.json()['candidates'][0]['content']['parts'][0]['text']
-    except: pass
-    return None
-
-def redactar_agenda_seo(info_oficial, info_google, fechas):
+def redactar_agenda_seo(info_oficial, info_google, fechas, limpiador=None):
     texto_oficial = info_oficial['contenido'] if info_oficial else ""
     link_oficial = info_oficial['url'] if info_oficial else ""
     
     prompt = f"""
     Eres Editor de Cultura en Neuquén. Escribe la AGENDA ({fechas['viernes']} al {fechas['domingo']}).
     
-    DATOS OFICIALES (Muni): {texto_oficial[:6000]} (Fuente: {link_oficial})
+    DATOS OFICIALES (Muni, eventos del finde: fecha hora | título | lugar | link):
+{texto_oficial}
+    (Fuente: {link_oficial})
     DATOS EXTRA: {" | ".join(info_google)}
 
     REGLAS DE FORMATO Y ESTILO:
@@ -161,62 +222,70 @@ def redactar_agenda_seo(info_oficial, info_google, fechas):
     IDIOMA: Español Argentino.
     """
     
-    for m in ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash"]:
-        texto = llamar_api_gemini(m, prompt)
-        if texto: return texto
-        time.sleep(1)
-    return None
+    # Baja temperatura para ser preciso
+    return gemini_client.generar_con_respaldo(prompt, generation_config={"temperature": 0.4}, limpiador=limpiador)
 
 # --- MAIN ---
+@tracing.ejecucion("cultura")
 def main():
     fechas = obtener_proximo_finde()
     print(f"--- AGENDA: {fechas['short_date']} ---")
-    
-    # Datos
-    oficial = scrapear_web_oficial()
-    google = buscar_eventos_google(fechas)
-    
-    # Imagen (Con filtro anti-starbucks)
-    media_id = buscar_y_subir_imagen_segura()
-    
-    # Redacción
-    texto_html = redactar_agenda_seo(oficial, google, fechas)
-    if not texto_html: return
-
-    # Limpieza
-    texto_html = texto_html.replace('```html', '').replace('```', '').replace('<!DOCTYPE html>', '').strip()
-    if "<h1>" in texto_html: texto_html = texto_html[texto_html.find("<h1>"):]
-    
-    titulo_match = re.search(r'<h1>(.*?)</h1>', texto_html, re.IGNORECASE)
-    titulo = titulo_match.group(1).strip() if titulo_match else f"Agenda Finde: {fechas['viernes']}"
-    cuerpo = re.sub(r'<h1>.*?</h1>', '', texto_html, count=1, flags=re.IGNORECASE).strip()
-
-    # Publicar (Agregando estilos CSS básicos para los enlaces)
-    estilo_enlaces = """
-    <style>
-        .contenido-nota a { color: #d35400; text-decoration: underline; font-weight: bold; }
-        .contenido-nota h3 { color: #2c3e50; border-bottom: 2px solid #eee; padding-bottom: 5px; margin-top: 20px; }
-    </style>
-    """
-    
-    html_final = f"""
-    {estilo_enlaces}
-    <div class="contenido-nota" style="font-family: Arial, sans-serif; font-size: 18px; line-height: 1.6; color: #333;">
-        {cuerpo}
-        <hr>
-        <p style="font-size:14px; color:#777;">⚠️ <em>Datos verificados al momento de redacción.</em></p>
-    </div>
-    """
-    
-    print(f"Publicando: {titulo}")
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
     auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
-    post = {
-        'title': titulo, 'content': html_final, 'status': 'draft',
-        'author': int(WORDPRESS_AUTHOR_ID), 'featured_media': media_id
-    }
-    
-    requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/posts", json=post, auth=auth)
-    print("✅ Agenda publicada.")
+
+    def redaccion(oficial, google):
+        # Redacción (con GEMINI_STREAM el borrador se crea apenas llega el título)
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=gemini_client.GEMINI_STREAM)
+        limpiador = limpieza.LimpiadorIncremental("html", al_titulo=borrador.al_titulo)
+        texto_html = redactar_agenda_seo(oficial, google, fechas, limpiador)
+        if not texto_html: borrador.descartar(); return None
+
+        # Limpieza (hecha en una pasada mientras llegaba el texto)
+        titulo, cuerpo = limpiador.terminar()
+        return titulo or f"Agenda Finde: {fechas['viernes']}", cuerpo, borrador
+
+    def publicar(texto, media_id):
+        if not texto: return False
+        titulo, cuerpo, borrador = texto
+
+        # Publicar (Agregando estilos CSS básicos para los enlaces)
+        estilo_enlaces = """
+        <style>
+            .contenido-nota a { color: #d35400; text-decoration: underline; font-weight: bold; }
+            .contenido-nota h3 { color: #2c3e50; border-bottom: 2px solid #eee; padding-bottom: 5px; margin-top: 20px; }
+        </style>
+        """
+        
+        html_final = f"""
+        {estilo_enlaces}
+        <div class="contenido-nota" style="font-family: Arial, sans-serif; font-size: 18px; line-height: 1.6; color: #333;">
+            {cuerpo}
+            <hr>
+            <p style="font-size:14px; color:#777;">⚠️ <em>Datos verificados al momento de redacción.</em></p>
+        </div>
+        """
+        
+        print(f"Publicando: {titulo}")
+        post = {
+            'title': titulo, 'content': html_final, 'status': 'draft',
+            'author': int(WORDPRESS_AUTHOR_ID), 'featured_media': media_id
+        }
+        
+        borrador.publicar(post)
+        print("✅ Agenda publicada.")
+        return True
+
+    # Web oficial, Google y la imagen (con filtro anti-starbucks) van en paralelo;
+    # la redacción espera a los datos y el post a la redacción y la imagen
+    etapas.ejecutar([
+        etapas.Etapa("oficial", lambda: scrapear_web_oficial(fechas)),
+        etapas.Etapa("google", lambda: buscar_eventos_google(fechas)),
+        etapas.Etapa("imagen", buscar_y_subir_imagen_segura),
+        etapas.Etapa("redaccion", redaccion, "oficial", "google"),
+        etapas.Etapa("post", publicar, "redaccion", "imagen"),
+    ])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import tracing
+
+# --- CONFIGURACIÓN ---
+ETAPAS_CONCURRENCIA = int(os.environ.get("ETAPAS_CONCURRENCIA", "4"))
+
+# Funciones que se llaman al terminar cada etapa con (nombre, segundos, ok)
+observadores = []
+
+class Etapa:
+    """Un paso del reporter: `funcion` recibe, en orden, los resultados de `dependencias`."""
+
+    def __init__(self, nombre, funcion, *dependencias):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.dependencias = list(dependencias)
+
+def _medir(etapa, *args):
+    """Corre la etapa y avisa a los observadores cuánto tardó (la excepción sigue su curso)."""
+    inicio, ok = time.perf_counter(), False
+    try:
+        with tracing.span(etapa.nombre, "etapa"): resultado = etapa.funcion(*args)
+        ok = True
+        return resultado
+    finally:
+        for observador in list(observadores):
+            try: observador(etapa.nombre, time.perf_counter() - inicio, ok)
+            except Exception: pass
+
+def ejecutar(etapas, max_workers=ETAPAS_CONCURRENCIA):
+    """
+    Corre el grafo de etapas: cada una arranca apenas terminaron sus dependencias, así
+    que las independientes (ej. render+subida de la placa y redacción IA) se solapan.
+    Si una etapa lanza una excepción, las que dependen de ella no se ejecutan.
+    Devuelve {nombre: resultado}; las etapas falladas u omitidas quedan en None.
+    """
+    por_nombre = {e.nombre: e for e in etapas}
+    for e in etapas:
+        faltantes = [d for d in e.dependencias if d not in por_nombre]
+        if faltantes: raise ValueError(f"Etapa {e.nombre}: dependencias desconocidas {faltantes}")
+
+    resultados, fallidas, en_vuelo = {}, set(), {}
+    pendientes = list(etapas)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pendientes or en_vuelo:
+            omitida = True
+            while omitida: # Una etapa omitida puede arrastrar a otras: repasamos hasta que no cambie nada
+                omitida = False
+                for e in list(pendientes):
+                    if any(d in fallidas for d in e.dependencias):
+                        pendientes.remove(e); fallidas.add(e.nombre); resultados[e.nombre] = None
+                        print(f"⏭️ Etapa {e.nombre} omitida (falló una dependencia)")
+                        omitida = True
+                    elif all(d in resultados for d in e.dependencias):
+                        pendientes.remove(e)
+                        en_vuelo[pool.submit(tracing.propagar(_medir), e, *[resultados[d] for d in e.dependencias])] = e
+            if not en_vuelo:
+                if pendientes: raise ValueError(f"Ciclo entre etapas: {[e.nombre for e in pendientes]}")
+                break
+
+            hechas, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in hechas:
+                e = en_vuelo.pop(futuro)
+                try:
+                    resultados[e.nombre] = futuro.result()
+                except Exception as ex:
+                    print(f"❌ Etapa {e.nombre}: {ex}")
+                    fallidas.add(e.nombre); resultados[e.nombre] = None
+    return resultados
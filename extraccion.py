@@ -0,0 +1,287 @@
+import re
+from datetime import date
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Extractores incrementales sobre html.parser: se les va pasando el HTML por partes
+# (feed) y levantan `listo` apenas tienen lo que hace falta, así se corta la descarga.
+
+class ExtractorTendencias(HTMLParser):
+    """Texto del primer <a> de los primeros `limite` <li> del primer <ol class="trend-card__list">."""
+
+    def __init__(self, limite=8):
+        super().__init__(convert_charrefs=True)
+        self.limite = limite
+        self.tendencias = []
+        self.listo = False
+        self._profundidad_ol = 0 # > 0 mientras estamos dentro de la lista buscada
+        self._li_con_a = True
+        self._texto_a = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.listo: return
+        if not self._profundidad_ol:
+            if tag == "ol" and "trend-card__list" in (dict(attrs).get("class") or "").split(): self._profundidad_ol = 1
+            return
+        if tag == "ol": self._profundidad_ol += 1
+        elif tag == "li": self._li_con_a = False
+        elif tag == "a" and not self._li_con_a: self._texto_a = []
+
+    def handle_data(self, data):
+        if self._texto_a is not None: self._texto_a.append(data)
+
+    def handle_endtag(self, tag):
+        if self.listo or not self._profundidad_ol: return
+        if tag == "a" and self._texto_a is not None:
+            self.tendencias.append("".join(self._texto_a))
+            self._texto_a = None; self._li_con_a = True
+            if len(self.tendencias) >= self.limite: self.listo = True
+        elif tag == "ol":
+            self._profundidad_ol -= 1
+            if not self._profundidad_ol: self.listo = True # Solo la primera lista (la más reciente)
+
+    def resultado(self):
+        return self.tendencias
+
+class ExtractorTexto(HTMLParser):
+    """
+    Texto visible de la página (sin script/style/nav/footer), con los espacios
+    colapsados, hasta `limite` caracteres: lo mismo que get_text + re.sub + [:limite].
+    """
+    OMITIR = {"script", "style", "nav", "footer"}
+
+    def __init__(self, limite=12000):
+        super().__init__(convert_charrefs=True)
+        self.limite = limite
+        self.listo = False
+        self._omitiendo = 0
+        self._partes = []
+        self._largo = 0
+        self._proximo_chequeo = limite
+        self._corte = True # Hubo un tag desde el último texto: lo que venga es otro nodo
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.OMITIR: self._omitiendo += 1
+        self._corte = True
+
+    def handle_endtag(self, tag):
+        if tag in self.OMITIR and self._omitiendo: self._omitiendo -= 1
+        self._corte = True
+
+    def handle_comment(self, data): self._corte = True
+    def handle_decl(self, decl): self._corte = True
+    def handle_pi(self, data): self._corte = True
+
+    def handle_data(self, data):
+        if self._omitiendo or self.listo: return
+        # Un mismo nodo de texto puede llegar partido entre dos fragmentos: se pega sin separador
+        if self._corte or not self._partes: self._partes.append(data)
+        else: self._partes[-1] += data
+        self._corte = False
+        self._largo += len(data)
+        # El largo crudo nunca es menor que el colapsado: solo medimos de verdad cuando
+        # podría alcanzar el límite, y si no llegó esperamos a que crezca lo que falta
+        if self._largo >= self._proximo_chequeo:
+            faltan = self.limite - len(self._texto())
+            if faltan <= 0: self.listo = True
+            else: self._proximo_chequeo = self._largo + faltan
+
+    def _texto(self):
+        return re.sub(r'\s+', ' ', " ".join(self._partes)).strip()
+
+    def resultado(self):
+        return self._texto()[:self.limite]
+
+MESES = {m: i for i, m in enumerate(["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+                                     "septiembre", "octubre", "noviembre", "diciembre"], 1)}
+MESES["setiembre"] = 9
+RE_FECHA = re.compile(r"\b(\d{1,2})\s*(?:/\s*(\d{1,2})(?:\s*/\s*(\d{2,4}))?|de\s+(" + "|".join(MESES) + r")(?:\s+(?:de\s+)?(\d{4}))?)\b", re.I)
+RE_HORA = re.compile(r"\b([01]?\d|2[0-3])(?:\s*[:.]\s*([0-5]\d))?\s*(?:hs\b|h\b|horas\b)|\b([01]?\d|2[0-3])\s*:\s*([0-5]\d)\b", re.I)
+RE_LUGAR = re.compile(r"\b(?:Lugar|Dónde|Donde|Sede|Espacio|Sala)\s*:\s*(.+?)\s*(?:[—–|·•]|(?<!Av)(?<!Avda)(?<!Gral)(?<!Dr)(?<!Pje)(?<!Sta)(?<!Bv)\.\s|\n|\d{1,2}\s*(?:/|de\s)|$)", re.I)
+
+def leer_fecha(texto, referencia):
+    """Primera fecha del texto ("25/10", "25 de octubre de 2026"...); sin año, la más cercana a `referencia`."""
+    for m in RE_FECHA.finditer(texto):
+        dia = int(m.group(1))
+        mes = int(m.group(2)) if m.group(2) else MESES[m.group(4).lower()]
+        anio = m.group(3) or m.group(5)
+        try:
+            if anio: return date(int(anio) + (2000 if len(anio) == 2 else 0), mes, dia)
+            opciones = [date(referencia.year + d, mes, dia) for d in (-1, 0, 1)]
+        except ValueError:
+            continue
+        return min(opciones, key=lambda f: abs((f - referencia).days))
+    return None
+
+def leer_hora(texto):
+    m = RE_HORA.search(texto)
+    if not m: return None
+    hora, minutos = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+    return f"{int(hora):02d}:{minutos or '00'}"
+
+def leer_lugar(texto):
+    m = RE_LUGAR.search(texto)
+    return m.group(1).strip(" ,;:-")[:80] if m else None
+
+class ExtractorEventos(HTMLParser):
+    """
+    Eventos de una página de agenda: cada bloque (<article>, <li>, <tr> o un elemento con
+    "event"/"evento" en la clase) que trae una fecha es un evento con título (primer
+    encabezado, <strong> o <a>), lugar, fecha, hora y link (primer <a href>). Se queda con el
+    bloque más interno. Con `sin_fecha`, un <article> o bloque "evento" con título y link
+    pero sin fecha en el listado también cuenta (fecha None: la trae la página de detalle).
+    Junta también el texto visible (como ExtractorTexto) por si la página no tiene eventos
+    reconocibles.
+    """
+    OMITIR = ExtractorTexto.OMITIR
+    BLOQUES = {"article", "li", "tr"}
+    TITULOS = {"h1", "h2", "h3", "h4", "h5", "strong", "b", "a"}
+    VACIOS = {"br", "img", "input", "meta", "link", "hr", "source", "wbr", "area", "col", "embed"}
+
+    def __init__(self, referencia, base_url="", limite_texto=12000, limite=2000, sin_fecha=False):
+        super().__init__(convert_charrefs=True)
+        self.referencia, self.base_url, self.limite, self.sin_fecha = referencia, base_url, limite, sin_fecha
+        self.eventos = []
+        self.listo = False
+        self._texto = ExtractorTexto(limite_texto)
+        self._omitiendo = 0
+        self._pila = [] # (tag, bloque o None)
+        self._titulo = None # [tag, partes] del título que se está leyendo
+
+    @staticmethod
+    def _clase_evento(attrs):
+        return "event" in (dict(attrs).get("class") or "").lower() # También "evento", "eventos"
+
+    def _es_bloque(self, tag, attrs):
+        if tag in self.BLOQUES: return True
+        return tag in ("div", "section") and self._clase_evento(attrs)
+
+    def _bloque_actual(self):
+        for _, bloque in reversed(self._pila):
+            if bloque is not None: return bloque
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        self._texto.handle_starttag(tag, attrs)
+        if tag in self.OMITIR: self._omitiendo += 1
+        if self._omitiendo or tag in self.VACIOS:
+            if tag == "br": self.handle_data(" ")
+            return
+        bloque = ({"partes": [], "titulo": None, "link": None, "hijo": False, "evento": tag == "article" or self._clase_evento(attrs)}
+                  if self._es_bloque(tag, attrs) else None)
+        self._pila.append((tag, bloque))
+        actual = self._bloque_actual()
+        if actual is None: return
+        if tag == "a" and not actual["link"]:
+            href = dict(attrs).get("href")
+            if href and not href.startswith(("#", "javascript:", "mailto:")): actual["link"] = urljoin(self.base_url, href)
+        if tag in self.TITULOS and actual["titulo"] is None and self._titulo is None: self._titulo = [tag, []]
+        actual["partes"].append(" ")
+
+    def handle_endtag(self, tag):
+        self._texto.handle_endtag(tag)
+        if tag in self.OMITIR and self._omitiendo:
+            self._omitiendo -= 1
+            return
+        if self._omitiendo or not any(t == tag for t, _ in self._pila): return
+        while self._pila: # Cierra también lo que quedó abierto adentro (HTML mal formado)
+            abierto, bloque = self._pila.pop()
+            if self._titulo and self._titulo[0] == abierto:
+                actual = bloque or self._bloque_actual()
+                titulo = re.sub(r"\s+", " ", "".join(self._titulo[1])).strip()
+                if actual is not None and titulo: actual["titulo"] = titulo
+                self._titulo = None
+            if bloque is not None: self._cerrar(bloque)
+            else:
+                actual = self._bloque_actual()
+                if actual is not None: actual["partes"].append(" ")
+            if abierto == tag: break
+
+    def _cerrar(self, bloque):
+        padre = self._bloque_actual()
+        if bloque["hijo"] or self.listo: # Ya lo representa un bloque más interno
+            if padre is not None: padre["hijo"] = True
+            return
+        texto = re.sub(r"\s+", " ", "".join(bloque["partes"])).strip()
+        fecha = leer_fecha(texto, self.referencia)
+        if fecha is not None and not bloque["titulo"]: # Sin encabezado (ej. una fila de tabla): lo que va antes de la fecha
+            bloque["titulo"] = RE_FECHA.split(texto, 1)[0].strip(" -—–|·:,") or None
+        # Sin fecha solo si es claramente un evento con página propia (no un <li> de un menú)
+        sin_fecha_valido = self.sin_fecha and bloque["evento"] and bloque["link"]
+        if (fecha is None and not sin_fecha_valido) or not bloque["titulo"]:
+            if padre is not None: padre["partes"].append(" " + texto + " ")
+            return
+        if padre is not None: padre["hijo"] = True
+        self.eventos.append({"titulo": bloque["titulo"][:150], "lugar": leer_lugar(texto), "fecha": fecha.isoformat() if fecha else None,
+                             "hora": leer_hora(texto), "link": bloque["link"]})
+        if len(self.eventos) >= self.limite: self.listo = True
+
+    def handle_data(self, data):
+        self._texto.handle_data(data)
+        if self._omitiendo: return
+        if self._titulo is not None: self._titulo[1].append(data)
+        actual = self._bloque_actual()
+        if actual is not None: actual["partes"].append(data)
+
+    def handle_comment(self, data): self._texto.handle_comment(data)
+    def handle_decl(self, decl): self._texto.handle_decl(decl)
+    def handle_pi(self, data): self._texto.handle_pi(data)
+
+    def resultado(self):
+        return {"eventos": self.eventos, "texto": self._texto.resultado()}
+
+class ExtractorDetalle(HTMLParser):
+    """
+    Página de un solo evento: título (primer <h1>, si no el <title>) y, de los renglones de
+    texto visible que siguen (uno por párrafo, celda, ítem...), lugar, fecha y hora. Alcanza
+    con los primeros `limite` caracteres de texto.
+    """
+    OMITIR = ExtractorTexto.OMITIR
+    RENGLONES = {"p", "div", "li", "br", "tr", "td", "th", "dd", "dt", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+    def __init__(self, referencia, limite=4000):
+        super().__init__(convert_charrefs=True)
+        self.referencia, self.limite = referencia, limite
+        self.listo = False
+        self._omitiendo = 0
+        self._renglones = [[]]
+        self._largo = 0
+        self._titulo, self._leyendo, self._fuente, self._cuerpo = None, None, None, 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.OMITIR: self._omitiendo += 1
+        if tag in self.RENGLONES and self._renglones[-1]: self._renglones.append([])
+        if tag in ("h1", "title") and self._fuente != "h1" and self._leyendo is None: self._leyendo = (tag, [])
+
+    def handle_endtag(self, tag):
+        if tag in self.OMITIR and self._omitiendo: self._omitiendo -= 1
+        if self._leyendo and self._leyendo[0] == tag:
+            titulo = re.sub(r"\s+", " ", "".join(self._leyendo[1])).strip()
+            if titulo:
+                self._titulo, self._fuente = titulo, tag
+                if tag == "h1": self._cuerpo = len(self._renglones) # Los datos se buscan después del título, no en el menú
+            self._leyendo = None
+        if tag in self.RENGLONES and self._renglones[-1]: self._renglones.append([])
+
+    def handle_data(self, data):
+        if self._leyendo: self._leyendo[1].append(data)
+        if self._omitiendo or self.listo or self._leyendo and self._leyendo[0] == "title": return
+        self._renglones[-1].append(data)
+        self._largo += len(data)
+        if self._largo >= self.limite and self._fuente == "h1": self.listo = True
+
+    def resultado(self):
+        renglones = [re.sub(r"\s+", " ", "".join(r)).strip() for r in self._renglones[self._cuerpo:]]
+        cuerpo = "\n".join(r for r in renglones if r)
+        fecha = leer_fecha(cuerpo, self.referencia)
+        return {"titulo": (self._titulo or "")[:150] or None, "lugar": leer_lugar(cuerpo),
+                "fecha": fecha.isoformat() if fecha else None, "hora": leer_hora(cuerpo)}
+
+def extraer(extractor, fragmentos):
+    """Pasa los fragmentos al extractor y deja de consumir apenas está listo."""
+    for fragmento in fragmentos:
+        extractor.feed(fragmento)
+        if extractor.listo: break
+    else:
+        extractor.close()
+    return extractor.resultado()
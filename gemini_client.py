@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+import http_client
+import tracing
+from config import GEMINI_API_KEY
+
+# --- CONFIGURACIÓN ---
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Orden de preferencia de modelos
+MODELOS_RESPALDO = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash"]
+
+# Segundos que se espera a un modelo antes de disparar el siguiente en paralelo
+GEMINI_HEDGE_DELAY = float(os.environ.get("GEMINI_HEDGE_DELAY", "4"))
+
+# GEMINI_STREAM=1 usa :streamGenerateContent y limpia el texto a medida que llega
+GEMINI_STREAM = os.environ.get("GEMINI_STREAM", "0") == "1"
+
+# Ante un 429 se espera lo que pida Retry-After (o un backoff con jitter) y se reintenta el mismo modelo
+GEMINI_429_REINTENTOS = int(os.environ.get("GEMINI_429_REINTENTOS", "2"))
+GEMINI_429_ESPERA_MAX = float(os.environ.get("GEMINI_429_ESPERA_MAX", "30")) # Tope de cada espera, en segundos
+
+def _payload(prompt, generation_config=None):
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config: payload["generationConfig"] = generation_config
+    return json.dumps(payload)
+
+def espera_429(res, intento):
+    """Segundos a esperar tras un 429: el Retry-After si vino en segundos, si no backoff exponencial con jitter."""
+    pedido = res.headers.get("Retry-After", "").strip()
+    espera = float(pedido) if pedido.isdigit() else 2 ** intento * random.uniform(0.5, 1.5)
+    return min(espera, GEMINI_429_ESPERA_MAX)
+
+def _post(url, prompt, generation_config, **kwargs):
+    """POST al modelo reintentando los 429 (cuota por minuto agotada) hasta GEMINI_429_REINTENTOS veces."""
+    for intento in range(GEMINI_429_REINTENTOS + 1):
+        res = http_client.post(url, headers={'Content-Type': 'application/json'}, data=_payload(prompt, generation_config), **kwargs)
+        if res.status_code != 429 or intento == GEMINI_429_REINTENTOS: return res
+        espera = espera_429(res, intento)
+        res.close()
+        print(f"🚦 Gemini 429: reintento en {espera:.1f}s")
+        tracing.anotar(esperas_429=intento + 1)
+        time.sleep(espera)
+
+def llamar_modelo(modelo, prompt, generation_config=None, limpiador=None, **kwargs):
+    """
+    Una llamada a :generateContent. Devuelve el texto o None si la respuesta no sirve.
+    Si se pasa un `limpiador` (limpieza.LimpiadorIncremental) se le entrega el texto;
+    con GEMINI_STREAM se le entrega fragmento a fragmento mientras se genera.
+    """
+    if limpiador and GEMINI_STREAM: return _generar_stream(prompt, [modelo], generation_config, limpiador, **kwargs)
+
+    url = f"{GEMINI_URL}/{modelo}:generateContent?key={GEMINI_API_KEY}"
+    res = _post(url, prompt, generation_config, **kwargs)
+    if res.status_code == 200:
+        texto = res.json()['candidates'][0]['content']['parts'][0]['text']
+        tracing.anotar(modelo=modelo)
+        if limpiador: limpiador.feed(texto)
+        return texto
+    return None
+
+def stream_modelo(modelo, prompt, generation_config=None, **kwargs):
+    """Generador con los fragmentos de texto de :streamGenerateContent (eventos SSE)."""
+    url = f"{GEMINI_URL}/{modelo}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+    res = _post(url, prompt, generation_config, stream=True, **kwargs)
+    with res:
+        if res.status_code != 200: raise RuntimeError(f"HTTP {res.status_code}")
+        res.encoding = "utf-8" # text/event-stream sin charset: requests asumiría latin-1
+        for linea in res.iter_lines(decode_unicode=True):
+            if not linea or not linea.startswith("data:"): continue
+            evento = json.loads(linea[5:])
+            for parte in (evento.get('candidates') or [{}])[0].get('content', {}).get('parts', []):
+                if parte.get('text'): yield parte['text']
+
+def _generar_stream(prompt, modelos, generation_config, limpiador, **kwargs):
+    """Streaming con los modelos en orden; si uno se corta, el limpiador se reinicia y sigue el próximo."""
+    for modelo in modelos:
+        partes = []
+        try:
+            for fragmento in stream_modelo(modelo, prompt, generation_config, **kwargs):
+                partes.append(fragmento)
+                if limpiador: limpiador.feed(fragmento)
+            if partes:
+                print(f"🤖 {modelo} (stream) ✅")
+                tracing.anotar(modelo=modelo, intentos=modelos.index(modelo) + 1)
+                return "".join(partes)
+        except Exception as e:
+            print(f"⚠️ {modelo}: {e}")
+        print(f"🤖 {modelo} (stream) ❌")
+        if limpiador and partes: limpiador.reiniciar()
+    return None
+
+def generar_con_respaldo(prompt, modelos=MODELOS_RESPALDO, generation_config=None, espera=GEMINI_HEDGE_DELAY, limpiador=None):
+    """
+    Pedido "hedged" respetando el orden de preferencia de `modelos`: arranca con el
+    primero y, si en `espera` segundos no respondió, dispara el siguiente sin cortar
+    el anterior. Si un modelo falla se pasa al siguiente en el acto. Gana la primera
+    respuesta válida; las llamadas que siguen en vuelo se abandonan (hilos daemon,
+    no frenan la salida del proceso).
+    Con GEMINI_STREAM los modelos se prueban en orden, en streaming, alimentando al
+    `limpiador` a medida que llega el texto.
+    """
+    if GEMINI_STREAM: return _generar_stream(prompt, modelos, generation_config, limpiador)
+
+    resultados = queue.Queue()
+    estado = {"lanzados": 0, "pendientes": 0}
+
+    def intentar(modelo):
+        # Cada intento en su propio span: los que quedan en vuelo no pisan los atributos del que ganó
+        try:
+            with tracing.span(modelo, "gemini"): texto = llamar_modelo(modelo, prompt, generation_config)
+        except Exception as e:
+            print(f"⚠️ {modelo}: error red {e}")
+            texto = None
+        resultados.put((modelo, texto))
+
+    def lanzar():
+        modelo = modelos[estado["lanzados"]]
+        estado["lanzados"] += 1; estado["pendientes"] += 1
+        threading.Thread(target=tracing.propagar(intentar), args=(modelo,), daemon=True).start()
+
+    lanzar()
+    while estado["pendientes"]:
+        quedan = estado["lanzados"] < len(modelos)
+        try:
+            modelo, texto = resultados.get(timeout=espera if quedan else None)
+        except queue.Empty:
+            print(f"⏱️ Sin respuesta en {espera}s, disparando {modelos[estado['lanzados']]}")
+            lanzar(); continue
+
+        estado["pendientes"] -= 1
+        if texto:
+            print(f"🤖 {modelo} ✅")
+            tracing.anotar(modelo=modelo, intentos=estado["lanzados"])
+            if limpiador: limpiador.feed(texto)
+            return texto
+        print(f"🤖 {modelo} ❌")
+        if quedan: lanzar()
+    return None
@@ -0,0 +1,137 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+import http_client
+import storage
+import tracing
+from search_cache import CacheRespuestas
+
+# --- CONFIGURACIÓN ---
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
+CSE_CACHE = os.environ.get("CSE_CACHE", "1") == "1" # CSE_CACHE=0 desactiva la caché
+
+# Límites de la API: consultas por segundo (también es la ráfaga máxima) y por día
+CSE_QPS = float(os.environ.get("CSE_QPS", "5"))
+CSE_DIARIO = int(os.environ.get("CSE_DIARIO", "100"))
+
+# Fracción de la cuota diaria que puede gastar cada prioridad: lo que "baja" no puede usar
+# queda reservado para las demás (las tendencias no le dejan sin búsquedas a la agenda).
+# El contador (.cache/cse_cuota.json) tiene que ser uno solo para todos: en runner.py lo es de por
+# sí; en Actions cada workflow que busca lo restaura y lo guarda con la clave compartida "cse-cuota-"
+CUOTA_POR_PRIORIDAD = {"alta": 1.0, "media": 0.9, "baja": 0.6}
+PRIORIDAD_POR_CLASE = {"agenda": "alta", "imagen": "alta", "web": "media", "noticias": "baja"}
+
+_cache = None
+_limitador = None
+_lock = threading.Lock()
+
+def _obtener_cache():
+    global _cache
+    with _lock:
+        if _cache is None: _cache = CacheRespuestas()
+        return _cache
+
+def _obtener_limitador():
+    global _limitador
+    with _lock:
+        if _limitador is None: _limitador = Limitador()
+        return _limitador
+
+try:
+    from zoneinfo import ZoneInfo
+    _ZONA_CUOTA = ZoneInfo("America/Los_Angeles") # La cuota diaria de Google se reinicia a medianoche del Pacífico
+except Exception:
+    _ZONA_CUOTA = timezone(timedelta(hours=-8))
+
+class Limitador:
+    """
+    Token bucket (CSE_QPS por segundo) más contador diario persistido en disco.
+    Los pedidos que esperan token se atienden por prioridad y, dentro de la misma
+    prioridad, por orden de llegada; si hay tokens se sale en el acto, sin pausas fijas.
+    """
+    ORDEN = {"alta": 0, "media": 1, "baja": 2}
+
+    def __init__(self, qps=CSE_QPS, diario=CSE_DIARIO, archivo=None):
+        self.qps, self.diario = qps, diario
+        self.capacidad = max(1.0, qps)
+        self.tokens, self._ultimo = self.capacidad, time.monotonic()
+        self.archivo = archivo or storage.ruta("cse_cuota.json")
+        self._cond = threading.Condition()
+        self._cola, self._turno = [], itertools.count()
+
+    def _hoy(self):
+        return datetime.now(_ZONA_CUOTA).strftime("%Y-%m-%d")
+
+    def usadas(self):
+        """Consultas hechas hoy (también las de corridas anteriores del día)."""
+        datos = storage.leer_json(self.archivo, {})
+        return datos.get("usadas", 0) if datos.get("fecha") == self._hoy() else 0
+
+    def _sumar(self, cantidad=1, total=None):
+        usadas = total if total is not None else self.usadas() + cantidad
+        storage.escribir_json(self.archivo, {"fecha": self._hoy(), "usadas": usadas})
+
+    def agotar(self):
+        """La API avisó que se acabó la cuota del día: no se hacen más consultas hasta mañana."""
+        with self._cond: self._sumar(total=self.diario)
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.qps)
+        self._ultimo = ahora
+
+    def adquirir(self, prioridad="media"):
+        """Espera turno y token. Devuelve False si la cuota diaria de esa prioridad ya se gastó."""
+        limite = int(self.diario * CUOTA_POR_PRIORIDAD[prioridad])
+        with self._cond:
+            entrada = (self.ORDEN[prioridad], next(self._turno))
+            heapq.heappush(self._cola, entrada)
+            try:
+                while True:
+                    if self.usadas() >= limite: return False
+                    if self.qps <= 0: self._sumar(); return True # Sin límite por segundo
+                    self._recargar()
+                    if self._cola[0] == entrada and self.tokens >= 1:
+                        self.tokens -= 1
+                        self._sumar()
+                        return True
+                    # El primero de la cola espera lo que falta para el próximo token; el resto, su turno
+                    self._cond.wait((1 - self.tokens) / self.qps if self._cola[0] == entrada else None)
+            finally:
+                self._cola.remove(entrada); heapq.heapify(self._cola)
+                self._cond.notify_all()
+
+def buscar(params, clase="web", prioridad=None):
+    """
+    Consulta Google Custom Search pasando primero por la caché en disco; lo que no
+    está en caché pasa por el limitador (QPS + cuota diaria según `prioridad`, que por
+    defecto sale de la clase). Devuelve el JSON de la respuesta (las respuestas con
+    error no se cachean); sin cuota devuelve un error 429 sin llamar a la API.
+    """
+    prioridad = prioridad or PRIORIDAD_POR_CLASE.get(clase, "media")
+    with tracing.span("buscar", "search", clase=clase, prioridad=prioridad) as s:
+        if CSE_CACHE:
+            cacheada = _obtener_cache().obtener(params, clase)
+            s["cache"] = cacheada is not None
+            if cacheada is not None: return cacheada
+
+        inicio = time.perf_counter()
+        permitido = _obtener_limitador().adquirir(prioridad)
+        s["espera_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        if not permitido:
+            print(f"⛔ Cuota diaria de Custom Search agotada para prioridad {prioridad}")
+            s["error"] = "cuota diaria"
+            return {"error": {"code": 429, "message": f"Cuota diaria agotada para prioridad {prioridad}"}}
+
+        data = http_client.get(CSE_URL, params=params).json()
+        if "error" in data:
+            error = data["error"] if isinstance(data["error"], dict) else {"message": str(data["error"])}
+            s["error"] = str(error.get("message"))[:200]
+            # Cuota del proyecto agotada del lado de Google: cortamos por hoy
+            if error.get("code") == 429 and "per day" in str(error.get("message", "")).lower(): _obtener_limitador().agotar()
+        elif CSE_CACHE: _obtener_cache().guardar(params, data, clase)
+        s["resultados"] = len(data.get("items", []))
+        return data
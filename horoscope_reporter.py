@@ -1,15 +1,42 @@
 import os
-import requests
+import sys
+import gemini_client
+import limpieza
+import wordpress
+import tracing
+import storage
 import json
 import time
-from datetime import datetime
+import random
+import threading
+from datetime import datetime, timedelta
 import re
+from concurrent.futures import ThreadPoolExecutor
+import config
 
 # --- CONFIGURACIÓN ---
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
-WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
-WORDPRESS_URL = os.environ.get("WORDPRESS_URL").rstrip('/')
+from config import GEMINI_API_KEY, WORDPRESS_USER, WORDPRESS_APP_PASSWORD, WORDPRESS_URL
+
+# HOROSCOPO_MODO: "por_signo" (intro + 12 signos en pedidos cortos y paralelos) o "unico" (un solo pedido largo)
+HOROSCOPO_MODO = os.environ.get("HOROSCOPO_MODO", "por_signo")
+HOROSCOPO_CONCURRENCIA = int(os.environ.get("HOROSCOPO_CONCURRENCIA", "6")) # Piezas en vuelo en total, aunque el lote genere varios días
+HOROSCOPO_REINTENTOS = int(os.environ.get("HOROSCOPO_REINTENTOS", "2")) # Vueltas extra solo para las piezas que fallaron
+HOROSCOPO_ESPERA = float(os.environ.get("HOROSCOPO_ESPERA", "2")) # Base del backoff entre vueltas, en segundos
+
+# HOROSCOPO_LOTE=N: en vez del día de hoy, genera los próximos N días y los deja programados en WP
+HOROSCOPO_LOTE = int(os.environ.get("HOROSCOPO_LOTE", "0"))
+HOROSCOPO_LOTE_DIAS = 7 # Días que pre-genera la entrada semanal "horoscopo_lote" de runner.py
+HOROSCOPO_LOTE_CONCURRENCIA = int(os.environ.get("HOROSCOPO_LOTE_CONCURRENCIA", "2")) # Días generándose a la vez
+HORA_PUBLICACION = "09:00:00" # UTC, la misma hora del cron diario
+
+# Cupo compartido por todas las piezas del proceso: con el lote, días x piezas no pasa de HOROSCOPO_CONCURRENCIA
+_cupo = threading.BoundedSemaphore(max(1, HOROSCOPO_CONCURRENCIA))
+
+# Orden fijo de publicación
+SIGNOS = [
+    ("Aries", "♈"), ("Tauro", "♉"), ("Géminis", "♊"), ("Cáncer", "♋"), ("Leo", "♌"), ("Virgo", "♍"),
+    ("Libra", "♎"), ("Escorpio", "♏"), ("Sagitario", "♐"), ("Capricornio", "♑"), ("Acuario", "♒"), ("Piscis", "♓"),
+]
 
 # --- TRADUCCIÓN MANUAL DE FECHAS (INFALIBLE) ---
 DIAS_SEMANA = {
@@ -22,9 +49,9 @@ MESES = {
     'September': 'Septiembre', 'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
 }
 
-def obtener_fecha_en_espanol():
+def obtener_fecha_en_espanol(now=None):
     """Genera la fecha en español manualmente sin depender del sistema operativo."""
-    now = datetime.now()
+    now = now or datetime.now()
     dia_ing = now.strftime("%A") # Monday
     mes_ing = now.strftime("%B") # January
     dia_num = now.strftime("%d")
@@ -36,33 +63,8 @@ def obtener_fecha_en_espanol():
     
     return f"{dia_es} {dia_num} de {mes_es} de {anio}"
 
-def llamar_api_directa(modelo, prompt):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{modelo}:generateContent?key={GEMINI_API_KEY}"
-    headers = {'Content-Type': 'application/json'}
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "temperature": 0.8,
-            "maxOutputTokens": 2000
-        }
-    }
-
-    try:
-        print(f"👉 Probando: {modelo}...", end=" ")
-        res = requests.post(url, headers=headers, data=json.dumps(payload))
-        if res.status_code == 200:
-            print("✅")
-            return res.json()['candidates'][0]['content']['parts'][0]['text']
-        else:
-            print(f"❌ Error {res.status_code}")
-            return None
-    except Exception as e:
-        print(f"⚠️ Error red: {e}")
-        return None
-
-def generar_horoscopo_ia(fecha_hoy):
-    modelos = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash"]
-    
+@tracing.etapa("redaccion")
+def generar_horoscopo_ia(fecha_hoy, limpiador=None):
     prompt = f"""
     Actúa como una Astróloga experta. Escribe el HORÓSCOPO para hoy: {fecha_hoy}.
     
@@ -76,50 +78,99 @@ def generar_horoscopo_ia(fecha_hoy):
     6. IDIOMA: Español Neutro.
     """
 
-    for modelo in modelos:
-        texto = llamar_api_directa(modelo, prompt)
-        if texto: return texto
-        time.sleep(1)
-    return None
+    return gemini_client.generar_con_respaldo(prompt, generation_config={"temperature": 0.8, "maxOutputTokens": 2000}, limpiador=limpiador)
 
-def limpiar_respuesta(texto):
-    """Elimina saludos de la IA y extrae el título."""
-    texto = texto.replace('```html', '').replace('```', '').replace('<!DOCTYPE html>', '').strip()
-    
-    # Si la IA empieza saludando, buscamos donde empieza el primer <h1>
-    if "<h1>" in texto:
-        inicio = texto.find("<h1>")
-        texto = texto[inicio:] # Cortamos todo lo que esté antes del H1
-
-    titulo_match = re.search(r'<h1>(.*?)</h1>', texto, re.IGNORECASE)
-    if titulo_match:
-        titulo = titulo_match.group(1).strip()
-        cuerpo = re.sub(r'<h1>.*?</h1>', '', texto, count=1, flags=re.IGNORECASE).strip()
+def prompt_pieza(fecha_hoy, signo=None):
+    if signo is None:
+        pedido = "Un breve resumen planetario de la energía del día (la intro del horóscopo)."
     else:
-        titulo = f"Horóscopo del día"
-        cuerpo = texto
-        
-    return titulo, cuerpo
+        pedido = f"La predicción de hoy para {signo}: amor, trabajo y bienestar."
+    return f"""
+    Actúa como una Astróloga experta. Horóscopo para hoy: {fecha_hoy}.
+    ESCRIBE SOLO ESTO: {pedido}
+    REGLAS: Un único párrafo de 3 a 5 oraciones, texto plano (sin HTML, sin títulos, sin markdown, sin saludar).
+    TONO: Místico, inspirador y útil. IDIOMA: Español Neutro.
+    """
 
-def main():
-    fecha_hoy = obtener_fecha_en_espanol()
-    print(f"--- GENERANDO HORÓSCOPO PARA: {fecha_hoy} ---")
+def limpiar_pieza(texto):
+    """Texto plano de una pieza (la IA a veces agrega cercos, etiquetas o asteriscos igual)."""
+    texto = re.sub(r"```\w*", "", texto or "")
+    texto = re.sub(r"<[^>]+>", "", texto).replace("**", "")
+    return re.sub(r"\s+", " ", texto).strip()
 
-    texto_ia = generar_horoscopo_ia(fecha_hoy)
+def generar_pieza(fecha_hoy, signo=None):
+    """Una pieza (intro si `signo` es None); None si la IA no devolvió algo usable."""
+    with _cupo, tracing.span(f"pieza:{signo or 'intro'}", "etapa"):
+        texto = limpiar_pieza(gemini_client.generar_con_respaldo(prompt_pieza(fecha_hoy, signo), generation_config={"temperature": 0.8, "maxOutputTokens": 400}))
+        return texto if len(texto) >= 40 else None
 
-    if not texto_ia:
-        print("❌ Falló la generación.")
-        return
+@tracing.etapa("redaccion")
+def generar_horoscopo_por_signo(fecha_hoy, limpiador, max_workers=HOROSCOPO_CONCURRENCIA, reintentos=HOROSCOPO_REINTENTOS):
+    """
+    Intro y los 12 signos como pedidos cortos en paralelo (como mucho `max_workers` a la
+    vez, y nunca más que el cupo global). Las piezas que fallan se vuelven a pedir solas,
+    hasta `reintentos` vueltas más, con backoff y jitter entre vueltas.
+    Se arma el HTML en el orden fijo de SIGNOS y se pasa al limpiador; devuelve el HTML
+    o None si quedó alguna pieza sin generar.
+    """
+    # El título no depende de la IA: se entrega ya y el borrador anticipado arranca enseguida
+    encabezado = f"<h1>Horóscopo del día: {fecha_hoy}</h1>\n"
+    limpiador.feed(encabezado)
+
+    piezas = [None] + [nombre for nombre, _ in SIGNOS] # None = intro
+    textos = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for vuelta in range(reintentos + 1):
+            faltan = [p for p in piezas if p not in textos]
+            if not faltan: break
+            if vuelta:
+                espera = HOROSCOPO_ESPERA * 2 ** (vuelta - 1) * random.uniform(0.5, 1.5)
+                print(f"🔁 Reintentando {len(faltan)} pieza(s) en {espera:.1f}s: {', '.join(p or 'intro' for p in faltan)}")
+                time.sleep(espera)
+            futuros = {p: pool.submit(tracing.propagar(generar_pieza), fecha_hoy, p) for p in faltan}
+            for p, futuro in futuros.items():
+                try: texto = futuro.result()
+                except Exception as e: print(f"⚠️ {p or 'intro'}: {e}"); texto = None
+                if texto: textos[p] = texto
+
+    faltan = [p or "intro" for p in piezas if p not in textos]
+    if faltan:
+        print(f"❌ Sin generar: {', '.join(faltan)}")
+        return None
+
+    cuerpo = f"<h2>Energía Cósmica de Hoy</h2>\n<p>{textos[None]}</p>\n"
+    cuerpo += "".join(f"<h3>{emoji} {nombre}</h3>\n<p>{textos[nombre]}</p>\n" for nombre, emoji in SIGNOS)
+    limpiador.feed(cuerpo)
+    return encabezado + cuerpo
+
+def limpiar_respuesta(limpiador):
+    """Título y cuerpo ya limpios (sin saludos de la IA ni nada antes del <h1>)."""
+    titulo, cuerpo = limpiador.terminar()
+    return titulo or "Horóscopo del día", cuerpo
+
+def redactar(fecha_hoy, limpiador):
+    """(título, cuerpo) ya limpios para esa fecha, o None si falló la generación."""
+    texto_ia = None
+    if HOROSCOPO_MODO == "por_signo":
+        texto_ia = generar_horoscopo_por_signo(fecha_hoy, limpiador)
+        if not texto_ia:
+            # Antes que perder el día por un signo: un solo pedido con todo
+            print("↩️ Faltaron piezas: se pide el horóscopo completo en un solo pedido")
+            limpiador.reiniciar()
+    if not texto_ia: texto_ia = generar_horoscopo_ia(fecha_hoy, limpiador)
+    if not texto_ia: return None
+
+    # Limpieza inteligente (ya hecha en una pasada mientras llegaba el texto)
+    titulo_final, cuerpo_final = limpiar_respuesta(limpiador)
 
-    # Limpieza inteligente
-    titulo_final, cuerpo_final = limpiar_respuesta(texto_ia)
-    
     # Asegurar fecha correcta en el título si la IA falló
     if len(titulo_final) < 5 or "DOCTYPE" in titulo_final:
         titulo_final = f"Horóscopo de hoy: {fecha_hoy}"
+    return titulo_final, cuerpo_final
 
-    # Diseño HTML Místico
-    html_final = f"""
+def disenar_html(fecha_hoy, cuerpo_final):
+    """Diseño HTML Místico"""
+    return f"""
     <div style="font-family: 'Georgia', serif; font-size: 18px; line-height: 1.7; color: #2c3e50; max-width: 800px; margin: auto;">
         
         <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 40px; border-radius: 15px; text-align: center; margin-bottom: 30px; box-shadow: 0 4px 15px rgba(0,0,0,0.2);">
@@ -138,18 +189,156 @@ def main():
     </div>
     """
 
+# --- LOTE (días por adelantado) ---
+# Cada día generado queda en .cache/horoscopos/AAAA-MM-DD.json con el HTML terminado y,
+# una vez subido, el id del post: la corrida diaria de ese día ya no llama a Gemini.
+def ruta_dia(dia):
+    return storage.ruta("horoscopos", f"{dia.isoformat()}.json")
+
+def preparar_dia(dia):
+    """Genera y guarda el horóscopo de `dia` (o devuelve el ya guardado); None si falló."""
+    guardado = storage.leer_json(ruta_dia(dia))
+    if guardado: return guardado
+    fecha = obtener_fecha_en_espanol(datetime.combine(dia, datetime.min.time()))
+    with tracing.span(f"dia:{dia.isoformat()}"):
+        redactado = redactar(fecha, limpieza.LimpiadorIncremental("html"))
+    if not redactado:
+        print(f"❌ {fecha}: falló la generación")
+        return None
+    registro = {"dia": dia.isoformat(), "titulo": redactado[0], "contenido": disenar_html(fecha, redactado[1]),
+                "generado": int(time.time()), "wp_id": None}
+    storage.escribir_json(ruta_dia(dia), registro)
+    print(f"📝 {fecha}: listo")
+    return registro
+
+def post_del_dia(dia):
+    """
+    ID del horóscopo de `dia` que ya esté en WP (programado o publicado), o None. Cubre el
+    caso de un lote que lo subió pero no llegó a guardar el wp_id en la caché.
+    """
+    desde = datetime.combine(dia, datetime.min.time())
+    posts = wordpress.buscar_posts(WORDPRESS_URL, (WORDPRESS_USER, WORDPRESS_APP_PASSWORD), status="future,publish",
+                                   search="Horóscopo", after=desde.isoformat(), before=(desde + timedelta(days=1)).isoformat())
+    return posts[0]["id"] if posts else None
+
+def guardar_wp_id(registro, wp_id):
+    registro["wp_id"] = wp_id
+    storage.escribir_json(ruta_dia(datetime.fromisoformat(registro["dia"]).date()), registro)
+
+@tracing.etapa("programar", "post")
+def programar(registros):
+    """
+    Sube los días generados como posts `future` a la hora del cron diario, todos en una
+    cola (/batch/v1); devuelve cuántos fallaron. Si WP no respondió bien (ej. un timeout
+    con el lote ya aplicado), antes de darlo por fallido se busca el post del día.
+    """
+    cola = wordpress.ColaPublicacion(WORDPRESS_URL, (WORDPRESS_USER, WORDPRESS_APP_PASSWORD))
+    for registro in registros:
+        cola.agregar({"title": registro["titulo"], "content": registro["contenido"], "status": "future",
+                      "date_gmt": f"{registro['dia']}T{HORA_PUBLICACION}"})
+    fallidos = 0
+    for registro, r in zip(registros, cola.enviar()):
+        if r.status_code != 201:
+            existente = post_del_dia(datetime.fromisoformat(registro["dia"]).date())
+            if existente:
+                guardar_wp_id(registro, existente)
+                print(f"🗓️ {registro['dia']}: WP respondió HTTP {r.status_code} pero el post quedó programado ({existente})")
+                continue
+            print(f"❌ Error WP ({registro['dia']}): HTTP {r.status_code}: {r.text[:200]}")
+            fallidos += 1
+            continue
+        guardar_wp_id(registro, r.json()["id"])
+        print(f"🗓️ {registro['dia']}: programado (post {registro['wp_id']})")
+    return fallidos
+
+def lote(dias):
+    """Genera los próximos `dias` días (varios a la vez) y después los programa en WP en una sola pasada."""
+    manana = datetime.now().date() + timedelta(days=1)
+    fechas = [manana + timedelta(days=i) for i in range(dias)]
+    print(f"--- LOTE DE HORÓSCOPOS: {fechas[0]} a {fechas[-1]} ---")
+
+    # Días que ya están en WP aunque la caché no lo sepa (caché perdida): ni se generan ni se suben de nuevo
+    a_generar = []
+    for dia in fechas:
+        if not (storage.leer_json(ruta_dia(dia)) or {}).get("wp_id"):
+            existente = post_del_dia(dia)
+            if existente:
+                print(f"⏭️ {dia}: ya está en WP (post {existente})")
+                continue
+        a_generar.append(dia)
+
+    with ThreadPoolExecutor(max_workers=max(1, HOROSCOPO_LOTE_CONCURRENCIA)) as pool:
+        futuros = [pool.submit(tracing.propagar(preparar_dia), dia) for dia in a_generar]
+    registros = []
+    for dia, futuro in zip(a_generar, futuros):
+        try: registros.append(futuro.result())
+        except Exception as e: print(f"❌ {dia}: {e}"); registros.append(None)
+
+    pendientes = [r for r in registros if r and not r.get("wp_id")]
+    fallidos = registros.count(None) + (programar(pendientes) if pendientes else 0)
+    print(f"{'✅' if not fallidos else '⚠️'} Lote: {len(fechas) - fallidos}/{len(fechas)} días programados.")
+    if fallidos: sys.exit(1)
+
+@tracing.ejecucion("horoscopo_lote")
+def main_lote(dias=HOROSCOPO_LOTE_DIAS):
+    """Los próximos `dias` días por adelantado (runner.py lo corre aparte, sin tocar HOROSCOPO_LOTE)."""
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
+    lote(dias)
+
+@tracing.ejecucion("horoscopo")
+def main():
+    if HOROSCOPO_LOTE > 0: return main_lote(HOROSCOPO_LOTE)
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
+
+    hoy = datetime.now().date()
+    fecha_hoy = obtener_fecha_en_espanol()
+    guardado = storage.leer_json(ruta_dia(hoy))
+    if guardado and guardado.get("wp_id"):
+        print(f"⏭️ El horóscopo de {fecha_hoy} ya está en WP (post {guardado['wp_id']}).")
+        return
+    # Sin wp_id en la caché (o sin caché): puede estar programado igual por un lote que no la guardó
+    existente = post_del_dia(hoy)
+    if existente:
+        print(f"⏭️ El horóscopo de {fecha_hoy} ya está en WP (post {existente}).")
+        if guardado: guardar_wp_id(guardado, existente)
+        return
+
+    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+    if guardado:
+        # Generado por el lote pero sin subir: se publica tal cual, sin pasar por Gemini
+        print(f"--- PUBLICANDO HORÓSCOPO PRE-GENERADO PARA: {fecha_hoy} ---")
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=False)
+        titulo_final, html_final = guardado["titulo"], guardado["contenido"]
+    else:
+        print(f"--- GENERANDO HORÓSCOPO PARA: {fecha_hoy} ---")
+        # Con GEMINI_STREAM (o por signo, donde el título se conoce de entrada) el borrador se crea en WP
+        # apenas hay título, mientras la IA sigue escribiendo
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=gemini_client.GEMINI_STREAM or HOROSCOPO_MODO == "por_signo")
+        limpiador = limpieza.LimpiadorIncremental("html", al_titulo=borrador.al_titulo)
+        redactado = redactar(fecha_hoy, limpiador)
+        if not redactado:
+            borrador.descartar()
+            print("❌ Falló la generación.")
+            return
+        titulo_final, html_final = redactado[0], disenar_html(fecha_hoy, redactado[1])
+
     # Publicar
     print(f"Publicando: {titulo_final}")
-    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
     post = {
         'title': titulo_final, 
         'content': html_final, 
         'status': 'draft'
     }
-    r = requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/posts", json=post, auth=auth)
+    r = borrador.publicar(post)
     
-    if r.status_code == 201:
+    if r.status_code in (200, 201):
         print("✅ ÉXITO: Horóscopo publicado.")
+        storage.escribir_json(ruta_dia(hoy), {"dia": hoy.isoformat(), "titulo": titulo_final, "contenido": html_final,
+                                              "generado": (guardado or {}).get("generado", int(time.time())), "wp_id": r.json()["id"]})
     else:
         print(f"❌ Error WP: {r.text}")
 
@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+# --- CONFIGURACIÓN ---
+# Conexiones keep-alive que se mantienen abiertas por host
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+# Hosts de terceros (descargas de imágenes, páginas de eventos): solo las últimas N sesiones
+# quedan abiertas, así el proceso residente (runner.py) no junta una por cada sitio visitado
+HTTP_SESIONES_SUELTAS = int(os.environ.get("HTTP_SESIONES_SUELTAS", "4"))
+
+# APIs y sitios fijos de los reporters: su sesión se mantiene siempre (además de Gemini,
+# Custom Search y WordPress, que se reconocen por tipo_endpoint)
+HOSTS_FIJOS = {"api.open-meteo.com", "ws.smn.gob.ar", "trends24.in", "www.neuquencapital.gov.ar"}
+
+# Timeouts (conexión, lectura) en segundos según el tipo de endpoint
+TIMEOUTS = {
+    "gemini": (5, 60),   # Generaciones largas (horóscopo, notas)
+    "search": (5, 10),   # Google Custom Search
+    "wp": (5, 30),       # API REST de WordPress (subida de media incluida)
+    "wp_lote": (5, 120), # /wp-json/batch/v1: hasta WP_LOTE_MAX altas en una sola llamada
+    "default": (5, 15),  # Open-Meteo, SMN, scraping, descargas de imágenes
+}
+
+def _leer_overrides(spec):
+    overrides = {}
+    for par in spec.split(";"):
+        host, _, base = par.partition("=")
+        if host.strip() and base.strip(): overrides[host.strip()] = base.strip().rstrip("/")
+    return overrides
+
+# REPORTER_HOST_OVERRIDES: "host=http://127.0.0.1:8001;otro.host=..." manda los pedidos de esos
+# hosts a otro servidor (benchmarks y pruebas sin tocar las APIs reales); "*" aplica a cualquier host
+HOST_OVERRIDES = _leer_overrides(os.environ.get("REPORTER_HOST_OVERRIDES", ""))
+
+# Funciones que se llaman después de cada pedido con (metodo, url, respuesta, segundos).
+# `url` es la original (antes de REPORTER_HOST_OVERRIDES) y `respuesta` es None si el pedido
+# falló; en los pedidos con stream=True el tiempo es hasta recibir las cabeceras.
+observadores = []
+
+_sesiones = {}
+_sueltas = OrderedDict() # Sesiones de hosts de terceros, de la menos a la más usada
+_lock = threading.Lock()
+
+def tipo_endpoint(url):
+    """Clasifica la URL para elegir el timeout que le corresponde."""
+    partes = urlsplit(url)
+    if partes.netloc == "generativelanguage.googleapis.com": return "gemini"
+    if partes.path.startswith("/customsearch/"): return "search"
+    if partes.path.rstrip("/").endswith("/wp-json/batch/v1"): return "wp_lote"
+    if "/wp-json/" in partes.path: return "wp"
+    return "default"
+
+def destino(url):
+    """URL a la que realmente se pide, aplicando REPORTER_HOST_OVERRIDES."""
+    if not HOST_OVERRIDES: return url
+    partes = urlsplit(url)
+    base = HOST_OVERRIDES.get(partes.netloc) or HOST_OVERRIDES.get(partes.hostname or "") or HOST_OVERRIDES.get("*")
+    if not base: return url
+    nueva = urlsplit(base)
+    return urlunsplit((nueva.scheme, nueva.netloc, partes.path, partes.query, partes.fragment))
+
+def _nueva_sesion():
+    # requests se importa recién con el primer pedido: arrancar un reporter no lo paga
+    import requests
+    from requests.adapters import HTTPAdapter
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+def es_fijo(url):
+    """True para las APIs y sitios propios de los reporters (su sesión no se descarta nunca)."""
+    return tipo_endpoint(url) != "default" or (urlsplit(url).hostname or "") in HOSTS_FIJOS
+
+def obtener_sesion(url, fija=None):
+    """
+    Devuelve la sesión keep-alive del host (una por esquema+host, compartida entre hilos).
+    Las de hosts de terceros (`fija` False; por defecto según es_fijo) van a un LRU de
+    HTTP_SESIONES_SUELTAS: al pasarse, se cierra la menos usada.
+    """
+    partes = urlsplit(url)
+    clave = f"{partes.scheme}://{partes.netloc}"
+    if fija is None: fija = es_fijo(url)
+    with _lock:
+        if fija:
+            sesion = _sesiones.get(clave)
+            if sesion is None: sesion = _sesiones[clave] = _nueva_sesion()
+            return sesion
+        sesion = _sueltas.pop(clave, None) or _nueva_sesion()
+        _sueltas[clave] = sesion
+        while len(_sueltas) > max(1, HTTP_SESIONES_SUELTAS):
+            # Cerrar no corta los pedidos en curso: sus conexiones se descartan al liberarse
+            _sueltas.popitem(last=False)[1].close()
+        return sesion
+
+def request(metodo, url, **kwargs):
+    """requests.request sobre la sesión del host, con el timeout del endpoint si no se pasa uno."""
+    kwargs.setdefault("timeout", TIMEOUTS[tipo_endpoint(url)])
+    real = destino(url)
+    sesion = obtener_sesion(real, es_fijo(url)) # Fija o no según el host original, no el de REPORTER_HOST_OVERRIDES
+    if not observadores: return sesion.request(metodo, real, **kwargs)
+
+    inicio, res = time.perf_counter(), None
+    try:
+        res = sesion.request(metodo, real, **kwargs)
+        return res
+    finally:
+        segundos = time.perf_counter() - inicio
+        for observador in list(observadores):
+            try: observador(metodo, url, res, segundos)
+            except Exception: pass
+
+def get(url, **kwargs): return request("GET", url, **kwargs)
+def post(url, **kwargs): return request("POST", url, **kwargs)
+def head(url, **kwargs): return request("HEAD", url, **kwargs)
+
+def cerrar():
+    """Cierra todas las sesiones abiertas."""
+    with _lock:
+        for sesion in list(_sesiones.values()) + list(_sueltas.values()): sesion.close()
+        _sesiones.clear()
+        _sueltas.clear()
@@ -0,0 +1,186 @@
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+import http_client
+
+# Ingesta de imágenes de terceros antes de subirlas a WordPress: descarga en streaming con
+# tope de bytes, formato real según los primeros bytes (no la extensión ni el Content-Type
+# del servidor), achicado al tamaño de la imagen destacada del tema y recompresión.
+# Antes de elegir, los candidatos de una búsqueda se sondean todos a la vez (GET con Range
+# de los primeros KB) y se puntúan por respuesta, formato, dimensiones y peso.
+
+# --- CONFIGURACIÓN ---
+IMAGEN_MAX_BYTES = int(os.environ.get("IMAGEN_MAX_BYTES", str(15 * 1024 * 1024))) # Se corta la descarga al pasarlo
+IMAGEN_ANCHO = int(os.environ.get("IMAGEN_ANCHO", "1200")) # Caja de la imagen destacada (se respeta la proporción)
+IMAGEN_ALTO = int(os.environ.get("IMAGEN_ALTO", "800"))
+IMAGEN_CALIDAD = int(os.environ.get("IMAGEN_CALIDAD", "82")) # Calidad JPEG de salida
+IMAGEN_SONDEO_BYTES = 65536 # Lo que se lee de cada candidato: alcanza para el encabezado con las dimensiones
+
+MIME = {"jpeg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp", "avif": "image/avif"}
+EXTENSION = {"jpeg": "jpg", "png": "png", "gif": "gif", "webp": "webp", "avif": "avif"}
+
+def detectar_formato(cabecera):
+    """Formato según los magic bytes ("jpeg", "png", "gif", "webp", "avif") o None si no es una imagen conocida."""
+    if cabecera.startswith(b"\xff\xd8\xff"): return "jpeg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"): return "png"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"): return "gif"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP": return "webp"
+    if cabecera[4:8] == b"ftyp" and cabecera[8:12] in (b"avif", b"avis"): return "avif"
+    return None
+
+def descargar(url, limite=IMAGEN_MAX_BYTES):
+    """(bytes, formato) leyendo en streaming; None si no es una imagen, no respondió 200 o pasa de `limite`."""
+    with http_client.get(url, stream=True) as res:
+        if res.status_code != 200:
+            print(f"❌ Descarga: HTTP {res.status_code}", end=" ")
+            return None
+        largo = res.headers.get("Content-Length")
+        if largo and largo.isdigit() and int(largo) > limite:
+            print(f"❌ Imagen demasiado grande ({int(largo) // 1024} KB)", end=" ")
+            return None
+
+        partes, total, formato = [], 0, None
+        for parte in res.iter_content(65536):
+            partes.append(parte)
+            total += len(parte)
+            if total > limite:
+                print(f"❌ Imagen demasiado grande (más de {limite // 1024} KB)", end=" ")
+                return None
+            if formato is None and total >= 16:
+                formato = detectar_formato(b"".join(partes)[:16])
+                if formato is None: # HTML de error, página de login, etc.: no seguimos bajando
+                    print(f"❌ No es una imagen ({res.headers.get('Content-Type', '?')})", end=" ")
+                    return None
+    contenido = b"".join(partes)
+    return (contenido, formato) if formato else None
+
+# --- CANDIDATOS ---
+def dimensiones(cabecera, formato):
+    """(ancho, alto) leídos del encabezado del archivo, o None si no están en esos bytes."""
+    try:
+        if formato == "png" and cabecera[12:16] == b"IHDR":
+            return int.from_bytes(cabecera[16:20], "big"), int.from_bytes(cabecera[20:24], "big")
+        if formato == "gif":
+            return int.from_bytes(cabecera[6:8], "little"), int.from_bytes(cabecera[8:10], "little")
+        if formato == "webp":
+            bloque = cabecera[12:16]
+            if bloque == b"VP8 ": return int.from_bytes(cabecera[26:28], "little") & 0x3FFF, int.from_bytes(cabecera[28:30], "little") & 0x3FFF
+            if bloque == b"VP8L":
+                b0, b1, b2, b3 = cabecera[21:25]
+                return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+            if bloque == b"VP8X": return 1 + int.from_bytes(cabecera[24:27], "little"), 1 + int.from_bytes(cabecera[27:30], "little")
+        if formato == "jpeg":
+            i = 2
+            while i + 9 < len(cabecera):
+                if cabecera[i] != 0xFF: return None
+                marca = cabecera[i + 1]
+                if marca == 0xFF: i += 1; continue # Relleno
+                if 0xD0 <= marca <= 0xD9 or marca == 0x01: i += 2; continue # Marcas sin largo
+                if marca in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF): # SOFn
+                    return int.from_bytes(cabecera[i + 7:i + 9], "big"), int.from_bytes(cabecera[i + 5:i + 7], "big")
+                i += 2 + int.from_bytes(cabecera[i + 2:i + 4], "big")
+    except ValueError:
+        pass
+    return None
+
+def sondear(url):
+    """Pide los primeros KB de `url`: {"ok", "status", "formato", "ancho", "alto", "bytes"}."""
+    resultado = {"ok": False, "status": None, "formato": None, "ancho": None, "alto": None, "bytes": None}
+    try:
+        with http_client.get(url, headers={"Range": f"bytes=0-{IMAGEN_SONDEO_BYTES - 1}"}, stream=True) as res:
+            resultado["status"] = res.status_code
+            if res.status_code not in (200, 206): return resultado
+            # Peso total: del Content-Range si respetó el Range, si no del Content-Length
+            total = re.search(r"/(\d+)$", res.headers.get("Content-Range", ""))
+            largo = total.group(1) if total else (res.headers.get("Content-Length") if res.status_code == 200 else None)
+            if largo and largo.isdigit(): resultado["bytes"] = int(largo)
+            cabecera = b""
+            for parte in res.iter_content(16384):
+                cabecera += parte
+                if len(cabecera) >= IMAGEN_SONDEO_BYTES: break
+    except Exception:
+        return resultado
+    resultado["formato"] = detectar_formato(cabecera[:16])
+    medidas = dimensiones(cabecera, resultado["formato"])
+    if medidas: resultado["ancho"], resultado["alto"] = medidas
+    resultado["ok"] = resultado["formato"] is not None
+    return resultado
+
+def puntaje(sondeo, ancho=IMAGEN_ANCHO, alto=IMAGEN_ALTO):
+    """Qué tan buena es como destacada (0 = no sirve): tamaño frente a la caja, proporción y peso."""
+    if not sondeo["ok"]: return 0.0
+    if sondeo["bytes"] and sondeo["bytes"] > IMAGEN_MAX_BYTES: return 0.0
+    valor = 1.0
+    if sondeo["ancho"] and sondeo["alto"]:
+        valor *= min(1.0, sondeo["ancho"] / ancho) * min(1.0, sondeo["alto"] / alto) # Chica = se ve pixelada
+        proporcion = sondeo["ancho"] / sondeo["alto"]
+        if not 1.2 <= proporcion <= 2.0: valor *= 0.6 # Vertical o panorámica: el tema la recorta mucho
+    else:
+        valor *= 0.7 # Sin medidas: incierta
+    if sondeo["bytes"] and sondeo["bytes"] < 20 * 1024: valor *= 0.5 # Miniatura o ícono
+    if sondeo["formato"] == "gif": valor *= 0.5
+    return valor
+
+@tracing.etapa("candidatos", "imagen")
+def elegir(candidatos, max_workers=8):
+    """
+    Sondea todos los candidatos (dicts con "url") en paralelo y los devuelve ordenados del
+    mejor al peor, sin los que no sirven; a igual puntaje gana el que venía antes. A cada uno
+    se le agrega "sondeo" y "puntaje".
+    """
+    if not candidatos: return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidatos)))) as pool:
+        futuros = [pool.submit(tracing.propagar(sondear), c["url"]) for c in candidatos]
+        sondeos = [f.result() for f in futuros]
+    validos = []
+    for orden, (candidato, sondeo) in enumerate(zip(candidatos, sondeos)):
+        valor = puntaje(sondeo)
+        if valor > 0: validos.append((-valor, orden, dict(candidato, sondeo=sondeo, puntaje=round(valor, 3))))
+    tracing.anotar(candidatos=len(candidatos), validos=len(validos))
+    return [c for _, _, c in sorted(validos)]
+
+def optimizar(contenido, formato, ancho=IMAGEN_ANCHO, alto=IMAGEN_ALTO, calidad=IMAGEN_CALIDAD):
+    """
+    Achica la imagen para que entre en ancho x alto y la recomprime como JPEG. Devuelve
+    (bytes, formato); si no hay Pillow, no se puede abrir o el original ya pesa menos,
+    devuelve el original tal cual.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return contenido, formato
+    try:
+        imagen = Image.open(io.BytesIO(contenido))
+        imagen.draft("RGB", (ancho, alto)) # JPEG: decodifica directo a una escala reducida
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode in ("RGBA", "LA", "P"):
+            # Sin transparencias en la destacada: se apoya sobre blanco
+            imagen = imagen.convert("RGBA")
+            fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+            fondo.paste(imagen, mask=imagen.getchannel("A"))
+            imagen = fondo
+        elif imagen.mode != "RGB":
+            imagen = imagen.convert("RGB")
+        imagen.thumbnail((ancho, alto), Image.LANCZOS)
+        salida = io.BytesIO()
+        imagen.save(salida, "JPEG", quality=calidad, optimize=True, progressive=True)
+    except Exception as e:
+        print(f"⚠️ No se pudo optimizar ({e})", end=" ")
+        return contenido, formato
+    optimizada = salida.getvalue()
+    if formato == "jpeg" and len(optimizada) >= len(contenido): return contenido, formato
+    return optimizada, "jpeg"
+
+@tracing.etapa("ingesta", "imagen")
+def ingerir(url, nombre):
+    """
+    Descarga y optimiza una imagen para subirla: (bytes, nombre_de_archivo, content_type)
+    con la extensión y el MIME del formato real, o None si la descarga no sirve.
+    """
+    descargada = descargar(url)
+    if not descargada: return None
+    contenido, formato = optimizar(*descargada)
+    tracing.anotar(formato_original=descargada[1], bytes_originales=len(descargada[0]), formato=formato, bytes=len(contenido))
+    return contenido, f"{nombre}.{EXTENSION[formato]}", MIME[formato]
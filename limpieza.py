@@ -0,0 +1,112 @@
+import re
+
+# Limpieza de las respuestas de la IA en una sola pasada, fragmento a fragmento.
+# Sirve igual para el texto completo (un solo feed) que para el streaming de Gemini.
+
+TOKENS_HTML = ['```html', '<!DOCTYPE html>', '```']
+TOKENS_MARKDOWN = ['```markdown', '```']
+
+class LimpiadorIncremental:
+    """
+    Recibe el texto de la IA por partes (feed) y en una sola pasada:
+    - borra los cercos de código y el DOCTYPE (aunque lleguen partidos entre fragmentos),
+    - en modo "html" descarta el saludo previo al primer <h1> y separa el título,
+    - en modo "markdown" toma como título la primera línea si empieza con '#'.
+    Apenas se cierra el título llama a `al_titulo(titulo)`, sin esperar el resto.
+    terminar() devuelve (titulo, cuerpo); titulo es None si la IA no puso uno.
+    """
+
+    def __init__(self, modo="html", al_titulo=None):
+        self.modo = modo
+        self.tokens = TOKENS_HTML if modo == "html" else TOKENS_MARKDOWN
+        # Un solo recorrido con una regex; los más largos primero ("```html" antes que "```")
+        self._patron = re.compile("|".join(re.escape(t) for t in sorted(self.tokens, key=len, reverse=True)))
+        self._largo_max = max(len(t) for t in self.tokens)
+        self.al_titulo = al_titulo
+        self._titulo_notificado = False
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta lo recibido (ej. un stream que se cortó y se reintenta con otro modelo)."""
+        self._pendiente = ""
+        self._estado = "antes"
+        self._previo = ""
+        self._titulo_buf = ""
+        self._titulo = None
+        self._cuerpo = []
+
+    def feed(self, fragmento):
+        limpio, self._pendiente = self._quitar_tokens(self._pendiente + fragmento)
+        if limpio: self._procesar(limpio)
+
+    def terminar(self):
+        limpio, self._pendiente = self._quitar_tokens(self._pendiente, final=True)
+        if limpio: self._procesar(limpio)
+
+        if self._estado == "cuerpo": return self._titulo, "".join(self._cuerpo).strip()
+        if self.modo == "html":
+            if self._estado == "titulo": return None, ("<h1>" + self._titulo_buf).strip() # <h1> sin cerrar
+            return None, self._previo.strip()
+        if self._estado == "titulo": return self._notificar(self._titulo_buf), ""
+        return None, ""
+
+    # --- Internos ---
+    def _quitar_tokens(self, texto, final=False):
+        """Devuelve (texto sin tokens, cola retenida por ser posible comienzo de un token)."""
+        salida, i = [], 0
+        limite = len(texto) if final else len(texto) - self._largo_max + 1
+        for m in self._patron.finditer(texto):
+            if m.start() >= limite: break
+            salida.append(texto[i:m.start()]); i = m.end()
+        if i < limite: salida.append(texto[i:limite]); i = limite
+        # Los últimos caracteres (menos que el token más largo) pueden ser un token a medias
+        while i < len(texto):
+            if any(len(texto) - i < len(t) and t.startswith(texto[i:]) for t in self.tokens):
+                return "".join(salida), texto[i:]
+            m = self._patron.match(texto, i)
+            if m: i = m.end()
+            else: salida.append(texto[i]); i += 1
+        return "".join(salida), ""
+
+    def _notificar(self, titulo):
+        if self.modo == "markdown": titulo = titulo.replace('#', '').replace('**', '').replace('__', '')
+        self._titulo = titulo.strip()
+        if self.al_titulo and not self._titulo_notificado:
+            self._titulo_notificado = True
+            self.al_titulo(self._titulo)
+        return self._titulo
+
+    def _procesar(self, texto):
+        if self._estado == "antes":
+            if self.modo == "markdown":
+                texto = texto.lstrip()
+                if not texto: return
+                self._estado = "titulo" if texto.startswith('#') else "cuerpo"
+                return self._procesar(texto)
+            desde = max(0, len(self._previo) - 3)
+            self._previo += texto
+            k = self._previo.lower().find("<h1>", desde)
+            if k == -1: return
+            resto, self._previo = self._previo[k + 4:], ""
+            self._estado = "titulo" # Lo anterior al <h1> (saludos de la IA) se descarta
+            return self._procesar(resto)
+
+        if self._estado == "titulo":
+            cierre = "</h1>" if self.modo == "html" else "\n"
+            desde = max(0, len(self._titulo_buf) - len(cierre) + 1)
+            self._titulo_buf += texto
+            k = self._titulo_buf.lower().find(cierre, desde)
+            if k == -1: return
+            self._notificar(self._titulo_buf[:k])
+            self._estado = "cuerpo"
+            texto = self._titulo_buf[k + len(cierre):]
+
+        self._cuerpo.append(texto)
+
+def limpiar_html(texto):
+    limpiador = LimpiadorIncremental("html"); limpiador.feed(texto)
+    return limpiador.terminar()
+
+def limpiar_markdown(texto):
+    limpiador = LimpiadorIncremental("markdown"); limpiador.feed(texto)
+    return limpiador.terminar()
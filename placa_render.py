@@ -0,0 +1,210 @@
+import io
+import os
+import re
+import math
+import hashlib
+import tempfile
+import threading
+from functools import lru_cache
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+import storage
+
+# --- CONFIGURACIÓN ---
+ANCHO = 800; MARGEN = 10 # Misma anchura que el div de la placa HTML (+ margen blanco)
+ALTO_BASE = 660; ALTO_ALERTA = 80
+VERSION_CAPAS = "1" # Subir si cambia el diseño de capa_base, invalida la caché en disco
+FUENTES = [ # (regular, negrita); PLACA_FUENTE / PLACA_FUENTE_NEGRITA tienen prioridad
+    (os.environ.get("PLACA_FUENTE", ""), os.environ.get("PLACA_FUENTE_NEGRITA", "")),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf", "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"),
+]
+
+# Emoji de interpretar_wmo -> dibujo vectorial (no dependemos de una fuente de emojis)
+ICONOS = {"☀️": "sol", "🌙": "luna", "☁️": "nube", "🌫️": "niebla", "🌧️": "lluvia", "⛈️": "tormenta", "⛅": "variable", "⚠️": "alerta"}
+
+# --- FUENTES Y COLORES ---
+@lru_cache(maxsize=None)
+def ruta_fuente(negrita=False):
+    """Ruta de la primera fuente TrueType disponible, o None (se usa la de Pillow)."""
+    for regular, bold in FUENTES:
+        ruta = bold if negrita else regular
+        if ruta and os.path.exists(ruta): return ruta
+    return None
+
+@lru_cache(maxsize=None)
+def fuente(tamano, negrita=False):
+    """Primera fuente TrueType disponible; si no hay ninguna, la de Pillow."""
+    ruta = ruta_fuente(negrita)
+    return ImageFont.truetype(ruta, tamano) if ruta else ImageFont.load_default(size=tamano)
+
+def colores_degradado(fondo_css):
+    """Extrae los colores de un 'linear-gradient(...)' de interpretar_wmo."""
+    return [ImageColor.getrgb(c) for c in re.findall(r'#[0-9a-fA-F]{3,6}\b', fondo_css)] or [(102, 166, 255), (137, 247, 254)]
+
+def con_alfa(color_css, alfa):
+    return ImageColor.getrgb(color_css)[:3] + (int(255 * alfa),)
+
+# --- CAPAS ---
+def degradado(ancho, alto, c1, c2):
+    """Degradado diagonal a 135° (arriba-izquierda -> abajo-derecha), como el CSS."""
+    largo = ancho + alto
+    tira = Image.new("L", (largo, 1))
+    tira.putdata([int(255 * i / (largo - 1)) for i in range(largo)])
+    mascara = Image.new("L", (ancho, alto))
+    for y in range(alto): mascara.paste(tira.crop((y, 0, y + ancho, 1)), (0, y))
+    return Image.composite(Image.new("RGBA", (ancho, alto), c2 + (255,)), Image.new("RGBA", (ancho, alto), c1 + (255,)), mascara)
+
+def dibujar_icono(d, tipo, cx, cy, r):
+    """Icono del cielo centrado en (cx, cy) con radio aproximado r."""
+    def sol(cx, cy, r):
+        for i in range(8):
+            ang = i * math.pi / 4
+            d.line([(cx + math.cos(ang) * r * 0.75, cy + math.sin(ang) * r * 0.75), (cx + math.cos(ang) * r, cy + math.sin(ang) * r)], fill=(255, 200, 40, 255), width=max(2, r // 10))
+        d.ellipse([cx - r * 0.6, cy - r * 0.6, cx + r * 0.6, cy + r * 0.6], fill=(255, 217, 59, 255))
+
+    def nube(cx, cy, r, color=(240, 243, 245, 255)):
+        d.ellipse([cx - r * 0.95, cy - r * 0.1, cx - r * 0.25, cy + r * 0.55], fill=color)
+        d.ellipse([cx - r * 0.55, cy - r * 0.6, cx + r * 0.35, cy + r * 0.3], fill=color)
+        d.ellipse([cx + r * 0.05, cy - r * 0.3, cx + r * 0.95, cy + r * 0.55], fill=color)
+        d.rectangle([cx - r * 0.6, cy + r * 0.1, cx + r * 0.6, cy + r * 0.55], fill=color)
+
+    if tipo == "sol": sol(cx, cy, r)
+    elif tipo == "luna":
+        d.ellipse([cx - r * 0.7, cy - r * 0.7, cx + r * 0.7, cy + r * 0.7], fill=(245, 243, 206, 255))
+        d.ellipse([cx - r * 0.35, cy - r * 0.9, cx + r * 0.95, cy + r * 0.4], fill=(0, 0, 0, 0))
+    elif tipo == "nube": nube(cx, cy, r)
+    elif tipo == "niebla":
+        for i, ancho in enumerate([1.0, 0.8, 0.95, 0.7]):
+            y = cy - r * 0.5 + i * r * 0.35
+            d.rounded_rectangle([cx - r * ancho, y, cx + r * ancho, y + r * 0.14], radius=int(r * 0.07), fill=(245, 245, 245, 230))
+    elif tipo == "lluvia":
+        nube(cx, cy - r * 0.2, r)
+        for dx in (-0.45, 0, 0.45):
+            d.line([(cx + r * dx, cy + r * 0.5), (cx + r * (dx - 0.12), cy + r * 0.9)], fill=(40, 120, 230, 255), width=max(3, r // 12))
+    elif tipo == "tormenta":
+        nube(cx, cy - r * 0.2, r, color=(90, 90, 100, 255))
+        d.polygon([(cx, cy + r * 0.2), (cx - r * 0.25, cy + r * 0.65), (cx, cy + r * 0.6), (cx - r * 0.1, cy + r * 1.0), (cx + r * 0.25, cy + r * 0.5), (cx, cy + r * 0.55)], fill=(255, 214, 0, 255))
+    elif tipo == "alerta":
+        d.polygon([(cx, cy - r * 0.85), (cx - r, cy + r * 0.8), (cx + r, cy + r * 0.8)], fill=(255, 204, 0, 255))
+        d.text((cx, cy + r * 0.25), "!", font=fuente(int(r * 1.1), True), fill=(40, 40, 40, 255), anchor="mm")
+    else: # variable: sol asomando detrás de una nube
+        sol(cx + r * 0.3, cy - r * 0.3, int(r * 0.7))
+        nube(cx - r * 0.1, cy + r * 0.15, int(r * 0.85))
+
+def dibujar_icono_chico(d, tipo, cx, cy, color):
+    """Iconos del panel de datos: viento, lluvia y UV."""
+    if tipo == "viento":
+        for i, ancho in enumerate([22, 30, 18]):
+            y = cy - 10 + i * 10
+            d.line([(cx - 15, y), (cx - 15 + ancho, y)], fill=color, width=3)
+    elif tipo == "lluvia":
+        d.pieslice([cx - 18, cy - 16, cx + 18, cy + 16], 180, 360, fill=color)
+        d.line([(cx, cy), (cx, cy + 14)], fill=color, width=3)
+    else:
+        d.ellipse([cx - 9, cy - 9, cx + 9, cy + 9], fill=color)
+        for dx, dy in [(0, -16), (0, 16), (-16, 0), (16, 0), (-11, -11), (11, 11), (-11, 11), (11, -11)]:
+            d.line([(cx + dx * 0.8, cy + dy * 0.8), (cx + dx, cy + dy)], fill=color, width=2)
+
+COLUMNAS = [("viento", "Ráfagas"), ("lluvia", "Prob. Lluvia"), ("uv", "Índice UV")]
+
+def capa_base(fondo, icono, color_texto, con_alerta):
+    """Todo lo que no depende de los números del día: fondo, icono, etiquetas fijas y cajas."""
+    alto = ALTO_BASE + (ALTO_ALERTA if con_alerta else 0)
+    c1, c2 = (colores_degradado(fondo) + [None])[:2]
+    capa = degradado(ANCHO, alto, c1, c2 or c1)
+    velo = Image.new("RGBA", capa.size, (0, 0, 0, 0))
+    d = ImageDraw.Draw(velo)
+
+    dibujar_icono(d, ICONOS.get(icono, "variable"), ANCHO // 2, 175, 60)
+    d.text((ANCHO // 2, 275), "Pronóstico del día", font=fuente(32), fill=con_alfa(color_texto, 1), anchor="mm")
+
+    # Panel de datos (rgba(255,255,255,0.2) como en el HTML)
+    d.rounded_rectangle([40, 480, ANCHO - 40, 620], radius=15, fill=(255, 255, 255, 51))
+    ancho_col = (ANCHO - 80) // 3
+    for i, (tipo, etiqueta) in enumerate(COLUMNAS):
+        cx = 40 + ancho_col * i + ancho_col // 2
+        dibujar_icono_chico(d, tipo, cx, 510, con_alfa(color_texto, 0.9))
+        d.text((cx, 545), etiqueta, font=fuente(17), fill=con_alfa(color_texto, 1), anchor="mm")
+
+    if con_alerta:
+        d.rounded_rectangle([40, 640, ANCHO - 40, 640 + ALTO_ALERTA - 20], radius=8, fill=(0, 0, 0, 77), outline=(255, 255, 255, 128))
+    return Image.alpha_composite(capa, velo)
+
+_capas = {}
+_lock_capas = threading.Lock()
+
+def capa_base_cacheada(fondo, icono, color_texto, con_alerta):
+    """
+    capa_base se construye una sola vez por estado visual (hay pocos: seis cielos y la
+    alerta) y se guarda como PNG en la caché; después solo se componen los datos del día.
+    """
+    # Las fuentes entran en la clave: con otra PLACA_FUENTE la capa guardada ya no sirve
+    fuentes = f"{ruta_fuente(False)}|{ruta_fuente(True)}"
+    clave = hashlib.sha1(f"{VERSION_CAPAS}|{ANCHO}|{fuentes}|{fondo}|{icono}|{color_texto}|{con_alerta}".encode("utf-8")).hexdigest()[:16]
+    with _lock_capas:
+        capa = _capas.get(clave)
+        if capa is None:
+            archivo = storage.ruta("placas", f"base-{clave}.png")
+            try:
+                with Image.open(archivo) as guardada: capa = guardada.convert("RGBA")
+            except (OSError, ValueError):
+                capa = capa_base(fondo, icono, color_texto, con_alerta)
+                # Temporal + rename: otro proceso nunca lee un PNG a medio escribir
+                fd, temporal = tempfile.mkstemp(dir=os.path.dirname(archivo), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f: capa.save(f, format="PNG")
+                os.replace(temporal, archivo)
+            _capas[clave] = capa
+    return capa
+
+def dibujar_datos(capa, clima, alertas, fecha, texto_cielo, color_texto, ubicacion):
+    """Lo que cambia en cada corrida: ubicación, fecha, temperaturas, valores y texto de alerta."""
+    velo = Image.new("RGBA", capa.size, (0, 0, 0, 0))
+    d = ImageDraw.Draw(velo)
+    color = con_alfa(color_texto, 1); tenue = con_alfa(color_texto, 0.7)
+
+    d.text((40, 45), ubicacion, font=fuente(20), fill=con_alfa(color_texto, 0.9), anchor="lm")
+    d.text((ANCHO - 40, 45), fecha, font=fuente(20), fill=con_alfa(color_texto, 0.9), anchor="rm")
+
+    # "31°C / 18°C" con la mínima más chica y tenue
+    maxima, minima = f"{clima['temp_max']}°C ", f"/ {clima['temp_min']}°C"
+    f_max, f_min = fuente(84, True), fuente(42, True)
+    total = d.textlength(maxima, font=f_max) + d.textlength(minima, font=f_min)
+    x = (ANCHO - total) / 2
+    d.text((x, 375), maxima, font=f_max, fill=color, anchor="ls")
+    d.text((x + d.textlength(maxima, font=f_max), 375), minima, font=f_min, fill=tenue, anchor="ls")
+    d.text((ANCHO // 2, 430), texto_cielo, font=fuente(30), fill=color, anchor="mm")
+
+    ancho_col = (ANCHO - 80) // 3
+    valores = [f"{clima['viento_rafagas']} km/h", f"{clima['prob_lluvia']}%", f"{clima['uv_index']}"]
+    for i, valor in enumerate(valores):
+        d.text((40 + ancho_col * i + ancho_col // 2, 580), valor, font=fuente(22, True), fill=color, anchor="mm")
+
+    if alertas:
+        texto, f_alerta = f"ALERTA: {alertas[0]['titulo']}", fuente(20, True)
+        while d.textlength(texto, font=f_alerta) > ANCHO - 120 and len(texto) > 10: texto = texto[:-2].rstrip() + "…"
+        d.text((ANCHO // 2, 670), texto, font=f_alerta, fill=(255, 255, 255, 255), anchor="mm")
+    return Image.alpha_composite(capa, velo)
+
+# --- RENDER ---
+@lru_cache(maxsize=None)
+def mascara_redondeada(ancho, alto):
+    mascara = Image.new("L", (ancho, alto), 0)
+    ImageDraw.Draw(mascara).rounded_rectangle([0, 0, ancho - 1, alto - 1], radius=20, fill=255)
+    return mascara
+
+def exportar(tarjeta, formato="jpg", calidad=90):
+    """Apoya la placa (bordes redondeados) sobre blanco y la codifica a JPEG/WebP."""
+    lienzo = Image.new("RGB", (tarjeta.width + MARGEN * 2, tarjeta.height + MARGEN * 2), (255, 255, 255))
+    lienzo.paste(tarjeta, (MARGEN, MARGEN), mascara_redondeada(*tarjeta.size))
+    salida = io.BytesIO()
+    lienzo.save(salida, format="WEBP" if formato == "webp" else "JPEG", quality=calidad)
+    return salida.getvalue()
+
+def renderizar_placa(estado, clima, alertas, fecha, ubicacion="Neuquén Capital", formato="jpg", calidad=90):
+    """
+    Dibuja la placa del pronóstico en memoria y devuelve los bytes de la imagen.
+    `estado` es el dict de estado_visual (texto_cielo, icono, fondo, color_texto).
+    """
+    capa = capa_base_cacheada(estado["fondo"], estado["icono"], estado["color_texto"], bool(alertas))
+    tarjeta = dibujar_datos(capa, clima, alertas, fecha, estado["texto_cielo"], estado["color_texto"], ubicacion)
+    return exportar(tarjeta, formato, calidad)
@@ -0,0 +1,59 @@
+import os
+import time
+import threading
+import contextlib
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+
+# Rastreo de varias páginas a la vez con cortesía por host: como mucho RASTREO_POR_HOST
+# pedidos simultáneos a un mismo sitio y al menos RASTREO_PAUSA segundos entre el inicio
+# de dos pedidos seguidos a ese sitio. Los distintos hosts no se frenan entre sí.
+
+# --- CONFIGURACIÓN ---
+RASTREO_CONCURRENCIA = int(os.environ.get("RASTREO_CONCURRENCIA", "6"))
+RASTREO_POR_HOST = int(os.environ.get("RASTREO_POR_HOST", "2"))
+RASTREO_PAUSA = float(os.environ.get("RASTREO_PAUSA", "0.25"))
+
+class Cortesia:
+    """Turnos por host: un semáforo de `por_host` y un espaciado mínimo de `pausa` segundos."""
+
+    def __init__(self, por_host=RASTREO_POR_HOST, pausa=RASTREO_PAUSA):
+        self.por_host, self.pausa = max(1, por_host), pausa
+        self._lock = threading.Lock()
+        self._semaforos = {}
+        self._proximo = {} # host -> primer momento en que puede arrancar otro pedido
+
+    @contextlib.contextmanager
+    def turno(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaforo = self._semaforos.setdefault(host, threading.Semaphore(self.por_host))
+        with semaforo:
+            with self._lock:
+                ahora = time.monotonic()
+                inicio = max(ahora, self._proximo.get(host, 0.0))
+                self._proximo[host] = inicio + self.pausa
+            if inicio > ahora: time.sleep(inicio - ahora)
+            yield
+
+def rastrear(urls, obtener, max_workers=RASTREO_CONCURRENCIA, cortesia=None):
+    """
+    Llama a `obtener(url)` para cada URL (sin repetir) en paralelo, respetando los turnos
+    por host. Devuelve {url: resultado}; si `obtener` lanza una excepción queda None.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls: return {}
+    cortesia = cortesia or Cortesia()
+
+    def tarea(url):
+        with cortesia.turno(url):
+            try: return obtener(url)
+            except Exception as e:
+                print(f"⚠️ Rastreo {url}: {e}")
+                return None
+
+    with tracing.span("rastreo", "scrape", paginas=len(urls)):
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+            futuros = {url: pool.submit(tracing.propagar(tarea), url) for url in urls}
+        return {url: futuro.result() for url, futuro in futuros.items()}
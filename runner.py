@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+import http_client
+import config
+
+# Un solo proceso residente para todos los reporters: se importan una vez, comparten
+# config.py, las sesiones HTTP de http_client y las cachés en memoria, y cada uno
+# corre su main() según su horario cron (en UTC, los mismos de los workflows).
+#
+#   python runner.py                      # queda corriendo con el scheduler
+#   python runner.py --once clima cultura # corre esos reporters ahora y sale
+#   python runner.py --listar             # muestra la próxima corrida de cada uno
+
+# --- CONFIGURACIÓN ---
+# nombre: (módulo, cron) o (módulo, cron, función) si no se corre el main() del módulo
+REPORTERS = {
+    "clima": ("weather_reporter", "0 7 * * *"),
+    "cultura": ("culture_reporter", "0 13 * * 5"),
+    "horoscopo": ("horoscope_reporter", "0 9 * * *"),
+    "horoscopo_lote": ("horoscope_reporter", "0 3 * * 0", "main_lote"), # Domingos: la semana que viene por adelantado
+    "turismo": ("tourism_reporter", "0 14 * * 4"),
+    "tendencias": ("trends_reporter", "0 15,23 * * *"),
+}
+# RUNNER_REPORTERS: lista separada por comas de los que se activan (por defecto, todos)
+RUNNER_REPORTERS = [n.strip() for n in os.environ.get("RUNNER_REPORTERS", ",".join(REPORTERS)).split(",") if n.strip()]
+
+# --- CRON ---
+class Cron:
+    """Expresión cron de 5 campos (minuto hora día mes día_semana) con *, listas, rangos y pasos."""
+    RANGOS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != 5: raise ValueError(f"Cron inválido: {expresion!r}")
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, self.dias_semana = [
+            self._campo(c, bajo, alto) for c, (bajo, alto) in zip(campos, self.RANGOS)]
+        # Como en cron: si se restringen día del mes y día de la semana, alcanza con que coincida uno
+        self._dia_o_semana = campos[2] != "*" and campos[4] != "*"
+
+    @staticmethod
+    def _campo(texto, bajo, alto):
+        valores = set()
+        for parte in texto.split(","):
+            rango, _, paso = parte.partition("/")
+            if rango == "*": inicio, fin = bajo, alto
+            elif "-" in rango: inicio, fin = (int(x) for x in rango.split("-"))
+            else: inicio = fin = int(rango)
+            if paso and rango != "*" and "-" not in rango: fin = alto # "5/15" = desde 5 cada 15
+            valores.update(range(inicio, fin + 1, int(paso or 1)))
+        if not valores or min(valores) < bajo or max(valores) > alto + (alto == 6): raise ValueError(f"Campo cron inválido: {texto!r}")
+        if alto == 6: valores = {v % 7 for v in valores} # 7 también es domingo
+        return valores
+
+    def coincide(self, momento):
+        if momento.minute not in self.minutos or momento.hour not in self.horas or momento.month not in self.meses: return False
+        dia = momento.day in self.dias
+        semana = (momento.weekday() + 1) % 7 in self.dias_semana # cron: 0 = domingo
+        return (dia or semana) if self._dia_o_semana else (dia and semana)
+
+    def proxima(self, desde):
+        """Primer minuto después de `desde` que coincide (busca hasta un año adelante)."""
+        momento = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366)
+        while momento < limite:
+            if momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1); continue
+            if self.coincide(momento): return momento
+            momento += timedelta(minutes=1)
+        return None
+
+# --- EJECUCIÓN ---
+def cargar(nombre):
+    return importlib.import_module(REPORTERS[nombre][0])
+
+def funcion(nombre):
+    """Lo que se llama para correr `nombre`: el main() del módulo u otra función del mismo."""
+    return getattr(cargar(nombre), (REPORTERS[nombre] + ("main",))[2])
+
+def correr(nombre):
+    """Corre el main() de un reporter y devuelve su código de salida (los sys.exit no tiran el proceso)."""
+    print(f"\n▶️ {nombre} ({datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC)")
+    inicio = time.time()
+    try:
+        funcion(nombre)()
+        codigo = 0
+    except SystemExit as e:
+        codigo = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        codigo = 1
+    print(f"{'✅' if codigo == 0 else '❌'} {nombre} terminó en {time.time() - inicio:.1f}s (código {codigo})")
+    return codigo
+
+def bucle(nombres):
+    """Scheduler: una vez por minuto lanza, cada uno en su hilo, los reporters que tocan."""
+    horarios = {n: Cron(REPORTERS[n][1]) for n in nombres}
+    config.RESIDENTE = True
+    for n in nombres: cargar(n) # La importación se paga una sola vez, al arrancar
+    listar(horarios)
+
+    en_curso = {}
+    ultimo = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    while True:
+        siguiente = ultimo + timedelta(minutes=1)
+        time.sleep(max(0, (siguiente - datetime.now(timezone.utc)).total_seconds()))
+        ahora = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        # Si el proceso estuvo frenado (suspensión, reloj), se recorren los minutos salteados
+        momento = siguiente
+        while momento <= ahora:
+            for n, cron in horarios.items():
+                if not cron.coincide(momento): continue
+                hilo = en_curso.get(n)
+                if hilo and hilo.is_alive():
+                    print(f"⏭️ {n}: sigue corriendo la ejecución anterior, se saltea")
+                    continue
+                en_curso[n] = threading.Thread(target=correr, args=(n,), name=n, daemon=True)
+                en_curso[n].start()
+            momento += timedelta(minutes=1)
+        ultimo = ahora
+
+def listar(horarios):
+    ahora = datetime.now(timezone.utc)
+    for n, cron in horarios.items():
+        proxima = cron.proxima(ahora)
+        print(f"🗓️ {n:<14} {cron.expresion:<15} próxima: {proxima:%Y-%m-%d %H:%M} UTC" if proxima else f"🗓️ {n}: sin próxima corrida")
+
+def main():
+    parser = argparse.ArgumentParser(description="Corre los reporters en un solo proceso.")
+    parser.add_argument("--once", nargs="*", metavar="REPORTER", help="correr ahora estos reporters (o todos los activos) y salir")
+    parser.add_argument("--listar", action="store_true", help="mostrar la próxima corrida de cada reporter")
+    args = parser.parse_args()
+
+    desconocidos = [n for n in (args.once or []) + RUNNER_REPORTERS if n not in REPORTERS]
+    if desconocidos:
+        print(f"❌ Reporters desconocidos: {', '.join(desconocidos)} (disponibles: {', '.join(REPORTERS)})")
+        sys.exit(2)
+
+    if args.listar:
+        listar({n: Cron(REPORTERS[n][1]) for n in RUNNER_REPORTERS})
+        return
+    try:
+        if args.once is not None:
+            codigos = [correr(n) for n in (args.once or RUNNER_REPORTERS)]
+            sys.exit(1 if any(codigos) else 0)
+        bucle(RUNNER_REPORTERS)
+    except KeyboardInterrupt:
+        print("\n👋 Runner detenido")
+    finally:
+        http_client.cerrar()
+
+if __name__ == "__main__":
+    main()
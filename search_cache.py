@@ -0,0 +1,59 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import storage
+
+# --- CONFIGURACIÓN ---
+# Vida útil (segundos) de una respuesta según la clase de consulta
+TTL_POR_CLASE = {
+    "noticias": 60 * 60,           # Tendencias: el contexto cambia rápido
+    "agenda": 12 * 60 * 60,        # Cartelera y agenda cultural
+    "imagen": 30 * 24 * 60 * 60,   # Fotos de edificios y destinos
+    "web": 6 * 60 * 60,
+}
+CSE_CACHE_MAX = int(os.environ.get("CSE_CACHE_MAX", "2000")) # Entradas antes de desalojar por LRU
+
+def normalizar_clave(params):
+    """Clave estable para los parámetros de búsqueda (sin la API key, query normalizada)."""
+    limpios = {k: v for k, v in params.items() if k != "key"}
+    if "q" in limpios: limpios["q"] = re.sub(r'\s+', ' ', str(limpios["q"])).strip().lower()
+    return hashlib.sha256(json.dumps(limpios, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+class CacheRespuestas:
+    """Caché en disco (SQLite) de respuestas de Custom Search con TTL por clase y desalojo LRU."""
+
+    def __init__(self, archivo=None, max_entradas=CSE_CACHE_MAX):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(archivo or storage.ruta("cse_cache.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL"); self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS respuestas (
+            clave TEXT PRIMARY KEY, clase TEXT, respuesta TEXT, creado REAL, accedido REAL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accedido ON respuestas (accedido)")
+        self._db.commit()
+
+    def obtener(self, params, clase="web"):
+        clave = normalizar_clave(params)
+        ahora = time.time()
+        with self._lock:
+            fila = self._db.execute("SELECT respuesta, creado FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+            if not fila: return None
+            if ahora - fila[1] > TTL_POR_CLASE.get(clase, TTL_POR_CLASE["web"]):
+                self._db.execute("DELETE FROM respuestas WHERE clave = ?", (clave,)); self._db.commit()
+                return None
+            self._db.execute("UPDATE respuestas SET accedido = ? WHERE clave = ?", (ahora, clave)); self._db.commit()
+        return json.loads(fila[0])
+
+    def guardar(self, params, respuesta, clase="web"):
+        ahora = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?)",
+                             (normalizar_clave(params), clase, json.dumps(respuesta, ensure_ascii=False), ahora, ahora))
+            # LRU: si nos pasamos del máximo, borramos las menos usadas
+            self._db.execute("""DELETE FROM respuestas WHERE clave IN (
+                SELECT clave FROM respuestas ORDER BY accedido DESC LIMIT -1 OFFSET ?)""", (self.max_entradas,))
+            self._db.commit()
@@ -0,0 +1,84 @@
+import time
+import hashlib
+import http_client
+import extraccion
+import storage
+import tracing
+
+# Snapshot por URL: validadores HTTP (ETag / Last-Modified), hash del contenido y el
+# resultado ya extraído. Si la página no cambió, no se descarga ni se vuelve a parsear.
+
+def _ruta(url):
+    return storage.ruta("snapshots", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+@tracing.etapa("snapshot", "scrape")
+def obtener(url, extraer, headers=None, **kwargs):
+    """
+    GET condicional de `url`. Con 304 (o un 200 con el mismo hash que la última vez)
+    devuelve el resultado guardado sin llamar a `extraer`; si cambió, corre
+    `extraer(texto)` y guarda el resultado (tiene que ser serializable a JSON).
+    Devuelve None si la respuesta no es 200/304 o si `extraer` devuelve None.
+    """
+    tracing.anotar(url=url)
+    snapshot = storage.leer_json(_ruta(url))
+    cabeceras = dict(headers or {})
+    cabeceras["Cache-Control"] = "no-cache" # Que los intermediarios revaliden contra el origen
+    if snapshot:
+        if snapshot.get("etag"): cabeceras["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"): cabeceras["If-Modified-Since"] = snapshot["last_modified"]
+
+    res = http_client.get(url, headers=cabeceras, **kwargs)
+    if res.status_code == 304 and snapshot:
+        print("(sin cambios: 304)", end=" ")
+        tracing.anotar(cambios=False)
+        return snapshot["resultado"]
+    if res.status_code != 200: return None
+
+    huella = hashlib.sha256(res.content).hexdigest()
+    if snapshot and snapshot.get("hash") == huella:
+        print("(sin cambios: mismo hash)", end=" ")
+        tracing.anotar(cambios=False)
+        resultado = snapshot["resultado"]
+    else:
+        resultado = extraer(res.text)
+        if resultado is None: return None
+
+    storage.escribir_json(_ruta(url), {
+        "url": url, "etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified"),
+        "hash": huella, "resultado": resultado, "actualizado": int(time.time()),
+    })
+    return resultado
+
+@tracing.etapa("snapshot_incremental", "scrape")
+def obtener_incremental(url, crear_extractor, headers=None, **kwargs):
+    """
+    Igual que obtener(), pero descarga en streaming y pasa los fragmentos a un
+    extractor de extraccion.py, cortando la descarga apenas el extractor está listo.
+    Como no se baja la página entera no hay hash: el ahorro viene de los validadores
+    HTTP (304) y de no leer más de lo necesario.
+    """
+    extractor = crear_extractor()
+    tracing.anotar(url=url, extractor=type(extractor).__name__)
+    snapshot = storage.leer_json(_ruta(url))
+    # Un resultado guardado por otro extractor (u obtener()) no tiene el mismo formato
+    if snapshot and snapshot.get("extractor") != type(extractor).__name__: snapshot = None
+    cabeceras = dict(headers or {})
+    cabeceras["Cache-Control"] = "no-cache"
+    if snapshot:
+        if snapshot.get("etag"): cabeceras["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"): cabeceras["If-Modified-Since"] = snapshot["last_modified"]
+
+    with http_client.get(url, headers=cabeceras, stream=True, **kwargs) as res:
+        if res.status_code == 304 and snapshot:
+            print("(sin cambios: 304)", end=" ")
+            tracing.anotar(cambios=False)
+            return snapshot["resultado"]
+        if res.status_code != 200: return None
+        if "charset" not in res.headers.get("Content-Type", "").lower(): res.encoding = "utf-8"
+        resultado = extraccion.extraer(extractor, res.iter_content(chunk_size=16384, decode_unicode=True))
+
+    storage.escribir_json(_ruta(url), {
+        "url": url, "etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified"),
+        "hash": None, "extractor": type(extractor).__name__, "resultado": resultado, "actualizado": int(time.time()),
+    })
+    return resultado
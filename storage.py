@@ -0,0 +1,27 @@
+import os
+import json
+import tempfile
+
+# --- CONFIGURACIÓN ---
+# Directorio de datos persistentes entre corridas (cachés, índices, snapshots)
+CACHE_DIR = os.environ.get("REPORTER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+def ruta(*partes):
+    """Ruta dentro del directorio de caché, creando las carpetas intermedias."""
+    destino = os.path.join(CACHE_DIR, *partes)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    return destino
+
+def leer_json(destino, defecto=None):
+    """Lee un JSON persistido; si no existe o está corrupto devuelve `defecto`."""
+    try:
+        with open(destino, encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return defecto
+
+def escribir_json(destino, datos):
+    """Escribe el JSON de forma atómica (archivo temporal + rename)."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f: json.dump(datos, f, ensure_ascii=False)
+    os.replace(tmp, destino)
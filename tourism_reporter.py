@@ -1,19 +1,24 @@
 import os
-import requests
+import google_search
+import gemini_client
+import wordpress
+import imagenes
+import limpieza
+import etapas
+import tracing
+import storage
 import json
 import time
 from datetime import datetime
 import re
+import unicodedata
+import threading
+import sys
+import config
 
 # --- CONFIGURACIÓN ---
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GOOGLE_SEARCH_API_KEY = os.environ.get("GOOGLE_SEARCH_API_KEY")
-GOOGLE_SEARCH_CX = os.environ.get("GOOGLE_SEARCH_CX")
-
-WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
-WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
-WORDPRESS_URL = os.environ.get("WORDPRESS_URL").rstrip('/')
-WORDPRESS_AUTHOR_ID = os.environ.get("WORDPRESS_AUTHOR_ID", "1")
+from config import (GEMINI_API_KEY, GOOGLE_SEARCH_API_KEY, GOOGLE_SEARCH_CX,
+                    WORDPRESS_USER, WORDPRESS_APP_PASSWORD, WORDPRESS_URL, WORDPRESS_AUTHOR_ID)
 
 # LISTA DE DESTINOS
 DESTINOS = [
@@ -24,14 +29,25 @@ DESTINOS = [
     "Moquehue", "Paso Córdoba Neuquén", "Lago Aluminé", "Volcán Batea Mahuida"
 ]
 
-def seleccionar_destino_por_semana():
+# ALMACÉN DE CONTENIDO: una entrada por destino en .cache/turismo/ con la nota redactada, la
+# imagen elegida, su ID en WP y cuándo se generó. La corrida semanal solo busca y publica;
+# después deja listos los próximos destinos de la rotación que falten o estén vencidos.
+# Cada nota se regenera una vez cada TURISMO_ROTACIONES pasadas de su destino (con 18 destinos y
+# 3 vueltas, una vez por año): en las otras se publica la guardada. La regeneración la hace
+# siempre el refresco de fondo, semanas antes, porque ahí se mira si seguirá vigente el día que
+# se publique; TURISMO_FORZAR=1 rehace igual la de hoy y las próximas.
+TURISMO_ROTACIONES = int(os.environ.get("TURISMO_ROTACIONES", "3"))
+TURISMO_FRESCURA_DIAS = int(os.environ.get("TURISMO_FRESCURA_DIAS", str(len(DESTINOS) * 7 * TURISMO_ROTACIONES)))
+TURISMO_FORZAR = os.environ.get("TURISMO_FORZAR", "0") == "1"
+TURISMO_ADELANTO = int(os.environ.get("TURISMO_ADELANTO", "2")) # Próximos destinos a refrescar en cada corrida
+
+def seleccionar_destino_por_semana(adelanto=0):
     semana_actual = datetime.now().isocalendar()[1]
-    indice = semana_actual % len(DESTINOS)
+    indice = (semana_actual + adelanto) % len(DESTINOS)
     return DESTINOS[indice]
 
-def buscar_imagen_google(query):
+def buscar_imagen_google(query, prioridad=None):
     """Busca imagen evitando Instagram/Facebook."""
-    url = "https://www.googleapis.com/customsearch/v1"
     BLACK_LIST = ["instagram.com", "facebook.com", "pinterest.com", "x.com", "twitter.com"]
     
     params = {
@@ -47,13 +63,13 @@ def buscar_imagen_google(query):
     
     try:
         print(f"👉 Buscando imagen para: {query}...", end=" ")
-        res = requests.get(url, params=params)
-        data = res.json()
+        data = google_search.buscar(params, clase="imagen", prioridad=prioridad)
         
         if "items" not in data:
             print("❌ No encontrada.")
             return None
             
+        candidatos = []
         for item in data["items"]:
             origen = item["displayLink"].lower()
             es_valido = True
@@ -63,13 +79,20 @@ def buscar_imagen_google(query):
                     break
             
             if es_valido:
-                print(f"✅ Encontrada en: {origen}")
-                return {
+                candidatos.append({
                     "url": item["link"],
                     "contexto": item["title"],
                     "origen": item["displayLink"]
-                }
-        return None
+                })
+
+        # Se sondean todos a la vez y se queda la mejor que responde de verdad con una imagen
+        elegidas = imagenes.elegir(candidatos)
+        if not elegidas:
+            print(f"❌ Ninguna de las {len(candidatos)} responde con una imagen usable.")
+            return None
+        mejor = elegidas[0]
+        print(f"✅ Encontrada en: {mejor['origen'].lower()} ({mejor['sondeo']['ancho'] or '?'}x{mejor['sondeo']['alto'] or '?'})")
+        return mejor
     except Exception as e:
         print(f"⚠️ Error Search: {e}")
         return None
@@ -83,55 +106,28 @@ def subir_imagen_wordpress(img_data, titulo_destino):
     print(f"⬆️ Subiendo imagen a WordPress: {titulo_destino}...")
     
     try:
-        # 1. Descargar imagen a memoria
-        res_img = requests.get(image_url)
-        if res_img.status_code != 200:
+        # 1. Descargar (con tope de tamaño), achicar y recomprimir
+        ingerida = imagenes.ingerir(image_url, titulo_destino.lower().replace(' ', '-'))
+        if not ingerida:
             print("❌ Error al descargar imagen fuente.")
             return None
-        
-        imagen_binaria = res_img.content
-        nombre_archivo = f"{titulo_destino.lower().replace(' ', '-')}.jpg"
-
-        # 2. Subir a WordPress API
-        url_upload = f"{WORDPRESS_URL}/wp-json/wp/v2/media"
-        headers = {
-            "Content-Type": "image/jpeg",
-            "Content-Disposition": f"attachment; filename={nombre_archivo}"
-        }
+
+        # 2. Subir a WordPress API (si ya la subimos en otra vuelta de la rotación, se reutiliza)
         auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+        media_id = wordpress.subir_media(WORDPRESS_URL, auth, *ingerida)
         
-        res_wp = requests.post(url_upload, headers=headers, data=imagen_binaria, auth=auth)
-        
-        if res_wp.status_code == 201:
-            media_id = res_wp.json()['id']
-            print(f"✅ Imagen subida con ID: {media_id}")
+        if media_id:
+            print(f"✅ Imagen con ID: {media_id}")
             return media_id
         else:
-            print(f"❌ Error subiendo a WP: {res_wp.text}")
+            print("❌ Error subiendo a WP.")
             return None
 
     except Exception as e:
         print(f"⚠️ Excepción subida: {e}")
         return None
 
-def llamar_api_directa(modelo, prompt):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{modelo}:generateContent?key={GEMINI_API_KEY}"
-    headers = {'Content-Type': 'application/json'}
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {"temperature": 0.5}
-    }
-
-    try:
-        res = requests.post(url, headers=headers, data=json.dumps(payload))
-        if res.status_code == 200:
-            return res.json()['candidates'][0]['content']['parts'][0]['text']
-        return None
-    except:
-        return None
-
-def generar_nota_turismo(destino):
-    modelos = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash"]
+def generar_nota_turismo(destino, limpiador=None):
     prompt = f"""
     Actúa como un Guía de Turismo Responsable. Escribe un ARTÍCULO PERIODÍSTICO sobre: {destino}.
     
@@ -149,81 +145,139 @@ def generar_nota_turismo(destino):
     5. TONO: Informativo, serio, sin saludar.
     """
 
-    for modelo in modelos:
-        texto = llamar_api_directa(modelo, prompt)
-        if texto: return texto
-        time.sleep(1)
-    return None
+    return gemini_client.generar_con_respaldo(prompt, generation_config={"temperature": 0.5}, limpiador=limpiador)
 
-def limpiar_respuesta(texto, destino_hoy):
-    texto = texto.replace('```html', '').replace('```', '').replace('<!DOCTYPE html>', '').strip()
-    
-    if "<h1>" in texto:
-        indice = texto.find("<h1>")
-        texto = texto[indice:]
-    
-    titulo_match = re.search(r'<h1>(.*?)</h1>', texto, re.IGNORECASE)
-    if titulo_match:
-        titulo = titulo_match.group(1).strip()
-        cuerpo = re.sub(r'<h1>.*?</h1>', '', texto, count=1, flags=re.IGNORECASE).strip()
-    else:
-        titulo = f"Destino recomendado: {destino_hoy}"
-        cuerpo = texto
-        
-    return titulo, cuerpo
+def limpiar_respuesta(limpiador, destino_hoy):
+    titulo, cuerpo = limpiador.terminar()
+    return titulo or f"Destino recomendado: {destino_hoy}", cuerpo
 
-def main():
-    destino_hoy = seleccionar_destino_por_semana()
-    print(f"--- TURISMO: {destino_hoy} ---")
-    
-    # 1. Buscar Imagen
-    img_data = buscar_imagen_google(destino_hoy)
-    if not img_data:
-        print("❌ Sin imagen, cancelando.")
-        return
-
-    # 2. SUBIR IMAGEN A WORDPRESS (NUEVO PASO)
-    media_id = subir_imagen_wordpress(img_data, destino_hoy)
-    # Nota: Si falla la subida, media_id será None, pero igual intentaremos publicar la nota sin foto destacada.
+# --- ALMACÉN ---
+def ruta_entrada(destino):
+    sin_tildes = unicodedata.normalize("NFKD", destino).encode("ascii", "ignore").decode()
+    nombre = re.sub(r"[^a-z0-9]+", "-", sin_tildes.lower()).strip("-")
+    return storage.ruta("turismo", f"{nombre}.json")
+
+def vigente(entrada, dentro_de_dias=0):
+    """True si la entrada todavía va a estar fresca dentro de `dentro_de_dias` (cuando se publique)."""
+    if not entrada or TURISMO_FORZAR: return False
+    return time.time() + dentro_de_dias * 86400 - entrada.get("actualizado", 0) < TURISMO_FRESCURA_DIAS * 86400
+
+def preparar_destino(destino, al_titulo=None, prioridad=None):
+    """
+    Imagen (búsqueda + subida a WP) y nota para `destino`, en paralelo; guarda la entrada en
+    el almacén y la devuelve. None si no hubo imagen o texto (no se guarda nada).
+    """
+    def imagen():
+        # 1. Buscar Imagen
+        img_data = buscar_imagen_google(destino, prioridad)
+        if not img_data: raise RuntimeError("Sin imagen, cancelando.")
+        return img_data
+
+    def redaccion():
+        # 3. Redactar (con GEMINI_STREAM y `al_titulo`, el borrador se crea apenas llega el título)
+        limpiador = limpieza.LimpiadorIncremental("html", al_titulo=al_titulo)
+        if not generar_nota_turismo(destino, limpiador): return None
+        titulo, cuerpo = limpiar_respuesta(limpiador, destino)
+        if len(titulo) < 5: titulo = f"Descubrí {destino}"
+        return titulo, cuerpo
+
+    # La búsqueda+subida de la imagen (2. SUBIR IMAGEN A WORDPRESS) y la redacción no dependen entre sí
+    resultados = etapas.ejecutar([
+        etapas.Etapa("imagen", imagen),
+        etapas.Etapa("subida", lambda img_data: subir_imagen_wordpress(img_data, destino), "imagen"),
+        etapas.Etapa("redaccion", redaccion),
+    ])
+    if not resultados["imagen"] or not resultados["redaccion"]: return None
 
-    # 3. Redactar
-    texto_crudo = generar_nota_turismo(destino_hoy)
-    if not texto_crudo: return
+    titulo, cuerpo = resultados["redaccion"]
+    entrada = {"destino": destino, "titulo": titulo, "cuerpo": cuerpo, "imagen": resultados["imagen"],
+               "media_id": resultados["subida"], "actualizado": int(time.time())}
+    storage.escribir_json(ruta_entrada(destino), entrada)
+    return entrada
 
-    titulo, cuerpo = limpiar_respuesta(texto_crudo, destino_hoy)
-    if len(titulo) < 5: titulo = f"Descubrí {destino_hoy}"
+def refrescar_proximos(adelanto=TURISMO_ADELANTO):
+    """Deja listos en el almacén los próximos destinos de la rotación que falten o estén vencidos."""
+    for i in range(1, adelanto + 1):
+        destino = seleccionar_destino_por_semana(i)
+        if vigente(storage.leer_json(ruta_entrada(destino)), dentro_de_dias=i * 7): continue
+        print(f"🔄 Preparando {destino} para dentro de {i} semana(s)...")
+        with tracing.span(f"refresco:{destino}"):
+            try: ok = preparar_destino(destino, prioridad="baja")
+            except Exception as e: print(f"⚠️ {e}"); ok = None
+        print(f"{'✅' if ok else '⚠️'} {destino}: {'en el almacén' if ok else 'queda para la próxima corrida'}")
+
+@tracing.etapa("post")
+def publicar(entrada, borrador):
+    # Nota: Si falla la subida, media_id será None, pero igual intentaremos publicar la nota sin foto destacada.
+    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+    media_id = entrada["media_id"]
+    if media_id and not wordpress.media_existe(WORDPRESS_URL, auth, media_id): media_id = None
+    if not media_id:
+        # La imagen se borró de la biblioteca (o nunca subió): se vuelve a subir la elegida
+        media_id = subir_imagen_wordpress(entrada["imagen"], entrada["destino"])
+        if media_id: storage.escribir_json(ruta_entrada(entrada["destino"]), dict(entrada, media_id=media_id))
 
     # 4. HTML Cuerpo (Ya no necesitamos poner la <img> al principio, porque será destacada)
     html_post = f"""
     <div style="font-family: 'Arial', sans-serif; font-size: 18px; line-height: 1.8; color: #333; max-width: 800px; margin: auto;">
         
         <div class="contenido-nota">
-            {cuerpo}
+            {entrada['cuerpo']}
         </div>
         
         <div style="margin-top: 40px; padding: 20px; background: #fff3cd; border-left: 5px solid #ffc107; font-size: 16px; color: #856404;">
             🔥 <strong>Prevención:</strong> En Patagonia el fuego solo está permitido en campings habilitados. Cuidemos el bosque.
-            <br><small style="color: #999;">Foto de portada: {img_data['origen']}</small>
+            <br><small style="color: #999;">Foto de portada: {entrada['imagen']['origen']}</small>
         </div>
     </div>
     """
 
     # 5. Publicar con Featured Media
     print(f"Publicando nota...")
-    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
     post = {
-        'title': titulo, 
+        'title': entrada['titulo'], 
         'content': html_post, 
         'status': 'draft',
         'author': int(WORDPRESS_AUTHOR_ID),
         'featured_media': media_id if media_id else None # AQUÍ SE ASIGNA LA FOTO DESTACADA
     }
-    r = requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/posts", json=post, auth=auth)
+    r = borrador.publicar(post)
     
-    if r.status_code == 201:
+    if r.status_code in (200, 201):
         print("✅ ÉXITO: Nota publicada con Imagen Destacada.")
+        return True
+    print(f"❌ Error WP: {r.text}")
+    return False
+
+@tracing.ejecucion("turismo")
+def main():
+    destino_hoy = seleccionar_destino_por_semana()
+    print(f"--- TURISMO: {destino_hoy} ---")
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
+    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+
+    entrada = storage.leer_json(ruta_entrada(destino_hoy))
+    if vigente(entrada):
+        print(f"📦 Nota del almacén (generada el {datetime.fromtimestamp(entrada['actualizado']):%d/%m/%Y})")
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=False)
+    else:
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=gemini_client.GEMINI_STREAM)
+        entrada = preparar_destino(destino_hoy, al_titulo=borrador.al_titulo)
+        if not entrada:
+            # Sin imagen o sin texto no se publica: si la redacción ya había creado el borrador, se borra
+            borrador.descartar()
+            print("❌ No se pudo preparar la nota.")
+            return
+
+    publicar(entrada, borrador)
+    # Fuera del camino crítico: la próxima corrida ya encuentra su nota lista. Dentro de
+    # runner.py el proceso sigue vivo y se hace en otro hilo; suelto (Actions), antes de salir
+    if config.RESIDENTE:
+        threading.Thread(target=tracing.propagar(refrescar_proximos), name="turismo-refresco", daemon=True).start()
     else:
-        print(f"❌ Error WP: {r.text}")
+        refrescar_proximos()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+import threading
+import functools
+import contextlib
+import contextvars
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import http_client
+import storage
+
+# Trazas de cada corrida: un span por etapa, llamada HTTP, búsqueda, generación, render,
+# subida y publicación, con duración, bytes, status y modelo. Cada span se agrega como una
+# línea JSON en .cache/trazas/AAAA-MM-DD.jsonl y, al terminar la corrida, se escribe un
+# textfile de Prometheus (reporter_<nombre>.prom) para el textfile collector de node_exporter.
+# Fuera de una corrida (main decorado con @ejecucion) todo esto no hace nada.
+
+# --- CONFIGURACIÓN ---
+TRACING = os.environ.get("TRACING", "1") == "1" # TRACING=0 lo desactiva
+TRACE_DIAS = int(os.environ.get("TRACE_DIAS", "7")) # Días de JSONL que se conservan
+METRICS_DIR = os.environ.get("METRICS_DIR") # Por defecto .cache/metricas
+
+_ejecucion = contextvars.ContextVar("ejecucion", default=None)
+_span = contextvars.ContextVar("span", default=None)
+_lock_archivo = threading.Lock()
+
+class Ejecucion:
+    """Una corrida de un reporter: junta sus spans para exportar las métricas al final."""
+
+    def __init__(self, reporter):
+        self.reporter = reporter
+        self.id = uuid.uuid4().hex[:12]
+        self.codigo = 0
+        self.spans = []
+        self.lock = threading.Lock()
+
+# --- SPANS ---
+@contextlib.contextmanager
+def span(nombre, tipo="etapa", **atributos):
+    """
+    Mide el bloque como un span hijo del span en curso. Devuelve el dict de atributos
+    para completar sobre la marcha (ej. s["bytes"] = len(datos)).
+    """
+    ejecucion = _ejecucion.get()
+    if ejecucion is None:
+        yield atributos
+        return
+    padre = _span.get()
+    datos = {"id": uuid.uuid4().hex[:8], "padre": padre["id"] if padre else None, "tipo": tipo, "nombre": nombre, **atributos}
+    token = _span.set(datos)
+    inicio, t0 = time.time(), time.perf_counter()
+    try:
+        yield datos
+    except BaseException as e:
+        if not (isinstance(e, SystemExit) and not e.code): datos.setdefault("error", f"{type(e).__name__}: {e}"[:300])
+        raise
+    finally:
+        _span.reset(token)
+        _registrar(ejecucion, datos, inicio, time.perf_counter() - t0)
+
+def etapa(nombre=None, tipo="etapa"):
+    """Decorador: cada llamada a la función es un span."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with span(nombre or funcion.__name__, tipo): return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
+def anotar(**atributos):
+    """Agrega atributos al span en curso (ej. el modelo de Gemini que terminó respondiendo)."""
+    actual = _span.get()
+    if actual is not None: actual.update(atributos)
+
+def propagar(funcion):
+    """
+    Envuelve `funcion` para que corra en otro hilo dentro de la corrida y el span actuales
+    (los hilos nuevos no heredan el contexto). Crear un envoltorio por cada hilo/tarea.
+    """
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcion, *args, **kwargs)
+
+def ejecucion(reporter):
+    """Decorador para el main() de un reporter: abre la corrida y exporta al terminar."""
+    def decorador(main):
+        @functools.wraps(main)
+        def envuelta(*args, **kwargs):
+            if not TRACING or _ejecucion.get() is not None: return main(*args, **kwargs)
+            corrida = Ejecucion(reporter)
+            token = _ejecucion.set(corrida)
+            try:
+                with span(reporter, "ejecucion"): return main(*args, **kwargs)
+            except SystemExit as e:
+                corrida.codigo = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                raise
+            except BaseException:
+                corrida.codigo = 1
+                raise
+            finally:
+                _ejecucion.reset(token)
+                try: exportar(corrida)
+                except Exception as e: print(f"⚠️ Métricas: {e}")
+        return envuelta
+    return decorador
+
+# --- HTTP (desde los observadores de http_client) ---
+def endpoint(url):
+    """Clase de endpoint para las métricas: gemini, search, wp_media, wp_posts, wp_batch, wp o fetch."""
+    tipo = http_client.tipo_endpoint(url)
+    if tipo == "wp":
+        ruta = urlsplit(url).path
+        if "/wp/v2/media" in ruta: return "wp_media"
+        if "/wp/v2/posts" in ruta: return "wp_posts"
+        if "/batch/v1" in ruta: return "wp_batch"
+        return "wp"
+    return "fetch" if tipo == "default" else tipo
+
+def _bytes_recibidos(res):
+    # Sin stream=True requests ya leyó todo el cuerpo (el socket quedó cerrado): se cuenta.
+    # Con stream=True todavía no se leyó y no hay que tocarlo: solo vale el Content-Length
+    if res.raw is None or res.raw.closed:
+        try: return len(res.content or b"")
+        except Exception: pass
+    largo = res.headers.get("Content-Length")
+    return int(largo) if largo and largo.isdigit() else None
+
+def _observar_http(metodo, url, res, segundos):
+    ejecucion = _ejecucion.get()
+    if ejecucion is None: return
+    padre = _span.get()
+    partes = urlsplit(url) # Sin la query: ahí van las API keys
+    datos = {"id": uuid.uuid4().hex[:8], "padre": padre["id"] if padre else None, "tipo": "http",
+             "nombre": f"{metodo} {partes.netloc}{partes.path}", "endpoint": endpoint(url), "metodo": metodo}
+    modelo = re.search(r"/models/([^/:]+):", partes.path)
+    if modelo: datos["modelo"] = modelo.group(1)
+    if res is None:
+        datos["error"] = "sin respuesta"
+    else:
+        cuerpo = res.request.body if res.request is not None else None
+        datos.update(status=res.status_code, bytes_enviados=len(cuerpo) if cuerpo else 0, bytes_recibidos=_bytes_recibidos(res))
+        if res.status_code >= 400: datos["error"] = f"HTTP {res.status_code}"
+    _registrar(ejecucion, datos, time.time() - segundos, segundos)
+
+if TRACING: http_client.observadores.append(_observar_http)
+
+# --- SALIDA ---
+def _registrar(ejecucion, datos, inicio, segundos):
+    registro = {"run": ejecucion.id, "reporter": ejecucion.reporter, **datos,
+                "inicio": datetime.fromtimestamp(inicio).isoformat(timespec="milliseconds"),
+                "duracion_ms": round(segundos * 1000, 1), "ok": "error" not in datos}
+    with ejecucion.lock: ejecucion.spans.append(registro)
+    linea = json.dumps(registro, ensure_ascii=False, default=str)
+    with _lock_archivo:
+        with open(storage.ruta("trazas", f"{datetime.now():%Y-%m-%d}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+def _etiquetas(**etiquetas):
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+def metricas(corrida):
+    """Texto en formato de exposición de Prometheus con el resumen de la corrida."""
+    r = corrida.reporter
+    raiz = next((s for s in corrida.spans if s["tipo"] == "ejecucion"), None)
+    lineas = [
+        "# HELP reporter_ejecucion_segundos Duración de la última corrida.",
+        "# TYPE reporter_ejecucion_segundos gauge",
+        f"reporter_ejecucion_segundos{_etiquetas(reporter=r)} {raiz['duracion_ms'] / 1000 if raiz else 0}",
+        "# HELP reporter_ejecucion_exito 1 si la última corrida terminó bien.",
+        "# TYPE reporter_ejecucion_exito gauge",
+        f"reporter_ejecucion_exito{_etiquetas(reporter=r)} {int(corrida.codigo == 0 and (raiz or {}).get('ok', False))}",
+        "# HELP reporter_ejecucion_timestamp_segundos Momento en que terminó la última corrida.",
+        "# TYPE reporter_ejecucion_timestamp_segundos gauge",
+        f"reporter_ejecucion_timestamp_segundos{_etiquetas(reporter=r)} {int(time.time())}",
+    ]
+
+    # Spans agrupados por (tipo, nombre); los HTTP por endpoint, sin la ruta con ids
+    grupos, http, bytes_http = {}, {}, {}
+    for s in corrida.spans:
+        if s["tipo"] == "ejecucion": continue
+        clave = (s["tipo"], s["endpoint"] if s["tipo"] == "http" else s["nombre"].split(":")[0])
+        total, cantidad, errores = grupos.get(clave, (0.0, 0, 0))
+        grupos[clave] = (total + s["duracion_ms"] / 1000, cantidad + 1, errores + (not s["ok"]))
+        if s["tipo"] == "http":
+            clave_http = (s["endpoint"], s.get("modelo", ""), str(s.get("status", "error")))
+            http[clave_http] = http.get(clave_http, 0) + 1
+            for direccion in ("enviados", "recibidos"):
+                clave_bytes = (s["endpoint"], direccion)
+                bytes_http[clave_bytes] = bytes_http.get(clave_bytes, 0) + (s.get(f"bytes_{direccion}") or 0)
+
+    for nombre, ayuda, indice in [("reporter_span_segundos", "Tiempo total en spans de ese tipo/nombre en la última corrida.", 0),
+                                  ("reporter_span_cantidad", "Cantidad de spans en la última corrida.", 1),
+                                  ("reporter_span_errores", "Spans con error en la última corrida.", 2)]:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+        for (tipo, nombre_span), valores in sorted(grupos.items()):
+            lineas.append(f"{nombre}{_etiquetas(reporter=r, tipo=tipo, nombre=nombre_span)} {round(valores[indice], 3)}")
+
+    lineas += ["# HELP reporter_http_respuestas Respuestas HTTP por endpoint, modelo y status en la última corrida.",
+               "# TYPE reporter_http_respuestas gauge"]
+    for (ep, modelo, status), cantidad in sorted(http.items()):
+        lineas.append(f"reporter_http_respuestas{_etiquetas(reporter=r, endpoint=ep, modelo=modelo, status=status)} {cantidad}")
+    lineas += ["# HELP reporter_http_bytes Bytes HTTP por endpoint y dirección en la última corrida.",
+               "# TYPE reporter_http_bytes gauge"]
+    for (ep, direccion), cantidad in sorted(bytes_http.items()):
+        lineas.append(f"reporter_http_bytes{_etiquetas(reporter=r, endpoint=ep, direccion=direccion)} {cantidad}")
+    return "\n".join(lineas) + "\n"
+
+def exportar(corrida):
+    """Escribe el textfile de Prometheus (reemplazo atómico) y borra trazas viejas."""
+    directorio = METRICS_DIR or os.path.dirname(storage.ruta("metricas", "x"))
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f: f.write(metricas(corrida))
+    os.replace(temporal, os.path.join(directorio, f"reporter_{corrida.reporter}.prom"))
+
+    limite = f"{datetime.now() - timedelta(days=TRACE_DIAS):%Y-%m-%d}"
+    carpeta = os.path.dirname(storage.ruta("trazas", "x"))
+    for archivo in os.listdir(carpeta):
+        if archivo.endswith(".jsonl") and archivo[:10] < limite: os.remove(os.path.join(carpeta, archivo))
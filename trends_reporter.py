@@ -1,22 +1,29 @@
 import os
-import requests
+import google_search
+import gemini_client
+import wordpress
+import limpieza
+import snapshots
+import extraccion
+import tracing
 import json
 import time
 from datetime import datetime
 import re
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import config
 
 # --- CONFIGURACIÓN ---
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GOOGLE_SEARCH_API_KEY = os.environ.get("GOOGLE_SEARCH_API_KEY")
-GOOGLE_SEARCH_CX = os.environ.get("GOOGLE_SEARCH_CX")
+from config import (GEMINI_API_KEY, GOOGLE_SEARCH_API_KEY, GOOGLE_SEARCH_CX,
+                    WORDPRESS_USER, WORDPRESS_APP_PASSWORD, WORDPRESS_URL, WORDPRESS_AUTHOR_ID)
 
-WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
-WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
-WORDPRESS_URL = os.environ.get("WORDPRESS_URL").rstrip('/')
-WORDPRESS_AUTHOR_ID = os.environ.get("WORDPRESS_AUTHOR_ID", "1")
+# Investigación de tendencias: cuántas se investigan y cuántas consultas a Google en paralelo
+TRENDS_A_INVESTIGAR = int(os.environ.get("TRENDS_A_INVESTIGAR", "8"))
+TRENDS_CONCURRENCIA = int(os.environ.get("TRENDS_CONCURRENCIA", "4"))
 
 # --- 1. OBTENER TENDENCIAS (Scraping Trends24) ---
+@tracing.etapa("tendencias")
 def obtener_top_tendencias():
     """Obtiene el Top 10 de Argentina desde Trends24."""
     url = "https://trends24.in/argentina/"
@@ -24,18 +31,9 @@ def obtener_top_tendencias():
     
     print(f"👉 Scrapeando tendencias de: {url}...")
     try:
-        res = requests.get(url, headers=headers, timeout=10)
-        if res.status_code == 200:
-            soup = BeautifulSoup(res.text, 'html.parser')
-            # Trends24 tiene listas por hora. Tomamos la primera lista (la más reciente)
-            lista_actual = soup.find("ol", class_="trend-card__list")
-            
-            tendencias = []
-            if lista_actual:
-                for item in lista_actual.find_all("li")[:8]: # Tomamos las top 8
-                    tag = item.find("a").text
-                    tendencias.append(tag)
-            
+        # Trends24 tiene listas por hora: leemos hasta la primera (la más reciente) y cortamos en las top 8
+        tendencias = snapshots.obtener_incremental(url, lambda: extraccion.ExtractorTendencias(8), headers=headers, timeout=10)
+        if tendencias is not None:
             print(f"✅ Tendencias encontradas: {tendencias}")
             return tendencias
     except Exception as e:
@@ -43,40 +41,45 @@ def obtener_top_tendencias():
     return []
 
 # --- 2. INVESTIGAR CONTEXTO (Google Search) ---
-def investigar_tendencia(trend):
-    """Busca en Google por qué esto es tendencia."""
-    print(f"🕵️ Investigando: {trend}...")
-    
-    # 1. Buscamos noticias recientes para entender el contexto
+def buscar_contexto_noticias(trend):
+    """Busca noticias recientes para entender el contexto."""
     query_news = f"{trend} qué pasó noticia argentina"
     contexto = ""
-    
     try:
-        url = "https://www.googleapis.com/customsearch/v1"
         params = {"q": query_news, "cx": GOOGLE_SEARCH_CX, "key": GOOGLE_SEARCH_API_KEY, "num": 3}
-        res = requests.get(url, params=params)
-        data = res.json()
+        data = google_search.buscar(params, clase="noticias")
         
         if "items" in data:
             for item in data["items"]:
                 contexto += f"- {item['title']}: {item['snippet']}\n"
     except: pass
+    return contexto
 
-    # 2. Buscamos UN tweet viral específico para embeber
-    tweet_url = None
+def buscar_tweet(trend):
+    """Busca UN tweet viral específico para embeber (solo en twitter.com)."""
     try:
-        # Buscamos solo en twitter.com
         query_tweet = f"site:twitter.com {trend}"
         params_t = {"q": query_tweet, "cx": GOOGLE_SEARCH_CX, "key": GOOGLE_SEARCH_API_KEY, "num": 1}
-        res_t = requests.get(url, params=params_t)
-        data_t = res_t.json()
+        data_t = google_search.buscar(params_t, clase="noticias")
         if "items" in data_t:
-            tweet_url = data_t["items"][0]["link"]
+            return data_t["items"][0]["link"]
     except: pass
+    return None
 
-    return {"nombre": trend, "contexto": contexto, "tweet_url": tweet_url}
+@tracing.etapa("investigacion")
+def investigar_tendencias_concurrente(trends, max_workers=TRENDS_CONCURRENCIA):
+    """
+    Investiga todas las tendencias en paralelo: la búsqueda de noticias y la de
+    tweets de cada tendencia van al pool a la vez, con como mucho `max_workers`
+    consultas en vuelo. Devuelve los resultados en el mismo orden que `trends`.
+    """
+    print(f"🕵️ Investigando {len(trends)} tendencias (concurrencia {max_workers})...")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pendientes = [(t, pool.submit(tracing.propagar(buscar_contexto_noticias), t), pool.submit(tracing.propagar(buscar_tweet), t)) for t in trends]
+        return [{"nombre": t, "contexto": f_ctx.result(), "tweet_url": f_tw.result()} for t, f_ctx, f_tw in pendientes]
 
 # --- 3. SELECCIÓN IA ---
+@tracing.etapa("seleccion")
 def seleccionar_mejor_historia(lista_tendencias_investigadas):
     """Le da a Gemini la lista y le pide que elija la más noticiable."""
     
@@ -98,18 +101,15 @@ def seleccionar_mejor_historia(lista_tendencias_investigadas):
     RESPONDE SOLO CON EL NOMBRE EXACTO DE LA TENDENCIA ELEGIDA. Si ninguna sirve, responde "NINGUNA".
     """
     
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}"
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    
     try:
-        res = requests.post(url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        eleccion = res.json()['candidates'][0]['content']['parts'][0]['text'].strip()
+        eleccion = gemini_client.llamar_modelo("gemini-2.5-flash-lite", prompt).strip()
         print(f"🤖 La IA eligió: {eleccion}")
         return eleccion
     except: return "NINGUNA"
 
 # --- 4. REDACCIÓN ---
-def redactar_nota_viral(trend_data):
+@tracing.etapa("redaccion")
+def redactar_nota_viral(trend_data, limpiador=None):
     tweet_embed = f'\n\n[embed]{trend_data["tweet_url"]}[/embed]' if trend_data["tweet_url"] else ""
     
     prompt = f"""
@@ -131,30 +131,27 @@ def redactar_nota_viral(trend_data):
     - Idioma Español Argentino.
     """
     
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    
     try:
-        res = requests.post(url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        texto = res.json()['candidates'][0]['content']['parts'][0]['text']
+        texto = gemini_client.llamar_modelo("gemini-2.5-flash", prompt, limpiador=limpiador)
+        if texto and limpiador: limpiador.feed(tweet_embed)
         return texto + tweet_embed # Agregamos el tweet al final
     except: return None
 
 # --- MAIN ---
+@tracing.ejecucion("tendencias")
 def main():
     print("--- BUSCANDO VIRALES ---")
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
     
     # 1. Obtener lista cruda
     raw_trends = obtener_top_tendencias()
     if not raw_trends: return
 
-    # 2. Investigar las primeras 4 (para ahorrar cuota y tiempo)
-    investigadas = []
-    for t in raw_trends[:4]:
-        data = investigar_tendencia(t)
-        if len(data['contexto']) > 50: # Solo si encontró noticias reales
-            investigadas.append(data)
-        time.sleep(1)
+    # 2. Investigar todas en paralelo (noticias + tweet de cada una a la vez)
+    resultados = investigar_tendencias_concurrente(raw_trends[:TRENDS_A_INVESTIGAR])
+    investigadas = [d for d in resultados if len(d['contexto']) > 50] # Solo si encontró noticias reales
     
     if not investigadas:
         print("❌ Ninguna tendencia tiene contexto noticioso hoy.")
@@ -174,16 +171,15 @@ def main():
 
     # 4. Redactar
     print(f"✍️ Redactando sobre: {datos_ganadora['nombre']}")
-    texto_html = redactar_nota_viral(datos_ganadora)
-    if not texto_html: return
+    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+    borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=gemini_client.GEMINI_STREAM)
+    limpiador = limpieza.LimpiadorIncremental("html", al_titulo=borrador.al_titulo)
+    texto_html = redactar_nota_viral(datos_ganadora, limpiador)
+    if not texto_html: borrador.descartar(); return
 
-    # 5. Limpieza
-    texto_html = texto_html.replace('```html', '').replace('```', '').replace('<!DOCTYPE html>', '').strip()
-    if "<h1>" in texto_html: texto_html = texto_html[texto_html.find("<h1>"):]
-    
-    titulo_match = re.search(r'<h1>(.*?)</h1>', texto_html, re.IGNORECASE)
-    titulo = titulo_match.group(1).strip() if titulo_match else f"Viral: {datos_ganadora['nombre']}"
-    cuerpo = re.sub(r'<h1>.*?</h1>', '', texto_html, count=1, flags=re.IGNORECASE).strip()
+    # 5. Limpieza (hecha en una pasada mientras llegaba el texto)
+    titulo, cuerpo = limpiador.terminar()
+    titulo = titulo or f"Viral: {datos_ganadora['nombre']}"
 
     # 6. Publicar
     html_final = f"""
@@ -195,12 +191,11 @@ def main():
     """
     
     print(f"Publicando: {titulo}")
-    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
     post = {
         'title': titulo, 'content': html_final, 'status': 'draft',
         'author': int(WORDPRESS_AUTHOR_ID)
     }
-    requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/posts", json=post, auth=auth)
+    borrador.publicar(post)
     print("✅ Nota viral publicada.")
 
 if __name__ == "__main__":
@@ -1,72 +1,144 @@
 import os
-import requests
+import http_client
+import gemini_client
+import wordpress
+import imagenes
+import limpieza
+import etapas
+import snapshots
+import tracing
 import json
 import time
 from datetime import datetime
 import re
-import markdown
+import unicodedata
 import sys
-import imgkit # LIBRERÍA NUEVA PARA GENERAR IMÁGENES
+import config
 
 # --- CONFIGURACIÓN ---
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-GOOGLE_SEARCH_API_KEY = os.environ.get("GOOGLE_SEARCH_API_KEY")
-GOOGLE_SEARCH_CX = os.environ.get("GOOGLE_SEARCH_CX")
-
-WORDPRESS_USER = os.environ.get("WORDPRESS_USER")
-WORDPRESS_APP_PASSWORD = os.environ.get("WORDPRESS_APP_PASSWORD")
-WORDPRESS_URL = os.environ.get("WORDPRESS_URL")
-WORDPRESS_AUTHOR_ID = os.environ.get("WORDPRESS_AUTHOR_ID", "1")
-
-if not WORDPRESS_URL or not WORDPRESS_USER or not WORDPRESS_APP_PASSWORD:
-    print("❌ ERROR: Faltan variables de entorno WP.")
-    sys.exit(1)
-WORDPRESS_URL = WORDPRESS_URL.rstrip('/')
+from config import (GEMINI_API_KEY, GOOGLE_SEARCH_API_KEY, GOOGLE_SEARCH_CX,
+                    WORDPRESS_USER, WORDPRESS_APP_PASSWORD, WORDPRESS_URL, WORDPRESS_AUTHOR_ID)
+
 LAT = -38.9516; LON = -68.0591 # Neuquén
 
+# Ciudades conocidas. "zonas": departamentos del SMN que cuentan como alerta local;
+# "provincia" + "excluir": alertas provinciales que también aplican (salvo las de cordillera)
+CIUDADES = {
+    "Neuquén": {"nombre": "Neuquén Capital", "lat": LAT, "lon": LON, "zonas": ["Confluencia"], "provincia": "Neuquén", "excluir": ["Cordillera"]},
+    "Plottier": {"nombre": "Plottier", "lat": -38.9667, "lon": -68.2333, "zonas": ["Confluencia"], "provincia": "Neuquén", "excluir": ["Cordillera"]},
+    "Centenario": {"nombre": "Centenario", "lat": -38.8296, "lon": -68.1318, "zonas": ["Confluencia"], "provincia": "Neuquén", "excluir": ["Cordillera"]},
+    "Cutral Có": {"nombre": "Cutral Có", "lat": -38.9340, "lon": -69.2300, "zonas": ["Confluencia"], "provincia": "Neuquén", "excluir": ["Cordillera"]},
+    "Zapala": {"nombre": "Zapala", "lat": -38.8992, "lon": -70.0544, "zonas": ["Zapala"]},
+    "Chos Malal": {"nombre": "Chos Malal", "lat": -37.3781, "lon": -70.2709, "zonas": ["Chos Malal"]},
+    "San Martín de los Andes": {"nombre": "San Martín de los Andes", "lat": -40.1572, "lon": -71.3534, "zonas": ["Lácar"]},
+    "Junín de los Andes": {"nombre": "Junín de los Andes", "lat": -39.9504, "lon": -71.0694, "zonas": ["Huiliches"]},
+    "Villa La Angostura": {"nombre": "Villa La Angostura", "lat": -40.7617, "lon": -71.6460, "zonas": ["Los Lagos"]},
+    "Cipolletti": {"nombre": "Cipolletti", "lat": -38.9339, "lon": -67.9903, "zonas": ["General Roca"]},
+    "General Roca": {"nombre": "General Roca", "lat": -39.0333, "lon": -67.5833, "zonas": ["General Roca"]},
+    "Bariloche": {"nombre": "San Carlos de Bariloche", "lat": -41.1335, "lon": -71.3103, "zonas": ["Bariloche"]},
+}
+# TARGET_CITY: lista separada por ";" de ciudades conocidas o "Nombre:lat:lon" (ej. "Neuquén;Zapala;Aluminé:-39.23:-70.92")
+TARGET_CITY = os.environ.get("TARGET_CITY") or "Neuquén"
+PLACA_FORMATO = os.environ.get("PLACA_FORMATO", "jpg") # jpg | webp
+
 # --- 1. DATOS (MOTOR HÍBRIDO) ---
-def obtener_clima_openmeteo():
-    print("🌍 Open-Meteo...", end=" ")
+def leer_ciudades(spec=TARGET_CITY):
+    """
+    Convierte TARGET_CITY en la lista de ciudades a reportar. Las conocidas se reconocen sin
+    importar tildes ni mayúsculas ("neuquen" = "Neuquén"); lo que no se entiende se saltea y,
+    si no queda ninguna, se reporta Neuquén.
+    """
+    conocidas = {slug(clave): clave for clave in CIUDADES}
+    ciudades = []
+    for item in re.split(r'[;\n]', spec):
+        item = item.strip()
+        if not item: continue
+        partes = item.split(":")
+        if len(partes) == 3:
+            nombre = partes[0].strip()
+            try:
+                lat, lon = float(partes[1]), float(partes[2])
+            except ValueError:
+                print(f"⚠️ Coordenadas inválidas, se saltea: {item}")
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                print(f"⚠️ Coordenadas fuera de rango, se saltea: {item}")
+                continue
+            ciudades.append({"clave": nombre, "nombre": nombre, "lat": lat, "lon": lon, "zonas": [nombre]})
+        elif slug(item) in conocidas:
+            clave = conocidas[slug(item)]
+            ciudades.append({"clave": clave, **CIUDADES[clave]})
+        else:
+            print(f"⚠️ Ciudad desconocida (usar 'Nombre:lat:lon'): {item}")
+    if not ciudades:
+        print("⚠️ TARGET_CITY sin ciudades válidas: se reporta Neuquén.")
+        ciudades.append({"clave": "Neuquén", **CIUDADES["Neuquén"]})
+    return ciudades
+
+# (clave del registro, bloque de Open-Meteo, variable)
+CAMPOS_OPENMETEO = [
+    # Datos actuales (para el texto)
+    ("temp_actual", "current", "temperature_2m"),
+    ("viento_vel", "current", "wind_speed_10m"),
+    ("viento_rafagas", "current", "wind_gusts_10m"),
+    ("es_dia_actual", "current", "is_day"),
+    # Datos DEL DÍA (para la placa y pronóstico)
+    ("temp_max", "daily", "temperature_2m_max"),
+    ("temp_min", "daily", "temperature_2m_min"),
+    ("lluvia_mm", "daily", "precipitation_sum"),
+    ("prob_lluvia", "daily", "precipitation_probability_max"),
+    ("uv_index", "daily", "uv_index_max"),
+    ("codigo_wmo_dia", "daily", "weather_code"), # Código del día entero
+]
+
+def obtener_clima_openmeteo_lote(ciudades):
+    """Pronóstico de todas las ciudades en UNA sola llamada multi-coordenada a Open-Meteo."""
+    print(f"🌍 Open-Meteo ({len(ciudades)} ciudades)...", end=" ")
     try:
         url = "https://api.open-meteo.com/v1/forecast"
         params = {
-            "latitude": LAT, "longitude": LON,
+            "latitude": ",".join(str(c["lat"]) for c in ciudades), "longitude": ",".join(str(c["lon"]) for c in ciudades),
             "current": "temperature_2m,weather_code,wind_speed_10m,wind_gusts_10m,is_day",
             "daily": "weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_sum,precipitation_probability_max",
             "timezone": "America/Argentina/Salta", "forecast_days": 1
         }
-        res = requests.get(url, params=params, timeout=10); res.raise_for_status()
-        data = res.json(); cur = data['current']; day = data['daily']
-        
+        res = http_client.get(url, params=params, timeout=10); res.raise_for_status()
+        data = res.json()
+        respuestas = data if isinstance(data, list) else [data] # Con una sola coordenada viene un objeto
+
+        # Columna por campo (el diario trae un array por día, usamos el [0]) y después filas por ciudad
+        columnas = [[r[bloque][var][0] if bloque == "daily" else r[bloque][var] for r in respuestas] for _, bloque, var in CAMPOS_OPENMETEO]
+        claves = [clave for clave, _, _ in CAMPOS_OPENMETEO]
+        registros = [dict(zip(claves, fila)) for fila in zip(*columnas)]
+        for r in registros: r["es_dia_actual"] = r["es_dia_actual"] == 1
+
         print("✅")
-        return {
-            # Datos actuales (para el texto)
-            "temp_actual": cur['temperature_2m'],
-            "viento_vel": cur['wind_speed_10m'],
-            "viento_rafagas": cur['wind_gusts_10m'],
-            "es_dia_actual": cur['is_day'] == 1,
-            
-            # Datos DEL DÍA (para la placa y pronóstico)
-            "temp_max": day['temperature_2m_max'][0],
-            "temp_min": day['temperature_2m_min'][0],
-            "lluvia_mm": day['precipitation_sum'][0],
-            "prob_lluvia": day['precipitation_probability_max'][0],
-            "uv_index": day['uv_index_max'][0],
-            "codigo_wmo_dia": day['weather_code'][0] # Código del día entero
-        }
+        return registros
     except Exception as e: print(f"❌ Error OM: {e}"); return None
 
+def obtener_clima_openmeteo():
+    registros = obtener_clima_openmeteo_lote(leer_ciudades("Neuquén"))
+    return registros[0] if registros else None
+
 def obtener_alertas_smn():
+    """Todas las alertas vigentes del SMN (se filtran por ciudad con filtrar_alertas)."""
     print("🇦🇷 SMN Alertas...", end=" ")
-    alertas = []
     try:
-        res = requests.get(f"https://ws.smn.gob.ar/alerts/type/AL?v={int(time.time())}", headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-        for a in res.json():
-            txt = json.dumps(a, ensure_ascii=False)
-            if "Confluencia" in txt or ("Neuquén" in txt and "Cordillera" not in txt):
-                alertas.append({"titulo": a['title'], "nivel": a['severity']})
-        print(f"✅ ({len(alertas)})")
+        # GET condicional (no-cache + ETag/Last-Modified) en lugar de romper la caché con ?v=timestamp
+        todas = snapshots.obtener("https://ws.smn.gob.ar/alerts/type/AL", json.loads, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
+        if todas is None: raise ValueError("respuesta no válida")
+        print(f"✅ ({len(todas)})")
+        return todas
     except: print("⚠️ Error SMN")
+    return []
+
+def filtrar_alertas(todas, ciudad):
+    alertas = []
+    for a in todas:
+        txt = json.dumps(a, ensure_ascii=False)
+        provincial = ciudad.get("provincia") and ciudad["provincia"] in txt and not any(e in txt for e in ciudad.get("excluir", []))
+        if any(z in txt for z in ciudad["zonas"]) or provincial:
+            alertas.append({"titulo": a['title'], "nivel": a['severity']})
     return alertas
 
 # --- 2. VISUAL (PLACA Y GENERACIÓN DE IMAGEN) ---
@@ -79,21 +151,28 @@ def interpretar_wmo(codigo, es_dia=True):
     if codigo in [95, 96, 99]: return "Tormenta", "⛈️", "linear-gradient(135deg, #434343 0%, #000000 100%)", "#fff"
     return "Variable", "⛅", "linear-gradient(135deg, #89f7fe 0%, #66a6ff 100%)", "#fff"
 
-def generar_placa_html(clima, alertas, fecha):
-    """Genera el HTML de la placa enfocado en el pronóstico diario."""
+def estado_visual(clima, alertas):
+    """Cielo, icono, fondo y color de texto de la placa (compartido por el HTML y la imagen)."""
     # Usamos el código WMO del día, no el actual
     texto_cielo, icono, fondo, color_texto = interpretar_wmo(clima['codigo_wmo_dia'], es_dia=True)
+    if alertas:
+        fondo, color_texto, icono = "linear-gradient(135deg, #cb2d3e 0%, #ef473a 100%)", "#fff", "⚠️"
+    return {"texto_cielo": texto_cielo, "icono": icono, "fondo": fondo, "color_texto": color_texto}
+
+def generar_placa_html(clima, alertas, fecha, ubicacion="Neuquén Capital"):
+    """Genera el HTML de la placa enfocado en el pronóstico diario."""
+    estado = estado_visual(clima, alertas)
+    texto_cielo, icono, fondo, color_texto = estado["texto_cielo"], estado["icono"], estado["fondo"], estado["color_texto"]
 
     alerta_html = ""
     if alertas:
-        fondo, color_texto, icono = "linear-gradient(135deg, #cb2d3e 0%, #ef473a 100%)", "#fff", "⚠️"
         alerta_html = f"<div style='background: rgba(0,0,0,0.3); padding: 10px; border-radius: 8px; margin-top: 15px; font-weight: bold; text-align: center; border: 1px solid rgba(255,255,255,0.5);'>🚨 {alertas[0]['titulo']}</div>"
 
     # HTML diseñado para ser convertido a imagen (anchura fija, tipografía del sistema)
     placa = f"""
     <div style="width: 800px; padding: 40px; box-sizing: border-box; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; background: {fondo}; color: {color_texto}; border-radius: 20px; position: relative;">
         <div style="display: flex; justify-content: space-between; font-size: 1.2em; opacity: 0.9; margin-bottom: 20px;">
-            <span>📍 Neuquén Capital</span><span>📅 {fecha}</span>
+            <span>📍 {ubicacion}</span><span>📅 {fecha}</span>
         </div>
         <div style="text-align: center; margin: 30px 0;">
             <div style="font-size: 6em; text-shadow: 0 4px 10px rgba(0,0,0,0.2); line-height: 1;">{icono}</div>
@@ -111,20 +190,14 @@ def generar_placa_html(clima, alertas, fecha):
     """
     return placa, texto_cielo
 
-def generar_imagen_desde_html(html_content):
-    """Convierte el HTML de la placa en bytes de una imagen JPG."""
+def generar_imagen_placa(clima, alertas, fecha, ubicacion="Neuquén Capital"):
+    """Dibuja la placa directamente a bytes JPG/WebP, sin navegador ni subprocesos."""
     print("🖼️ Renderizando placa a imagen...", end=" ")
     try:
-        # Opciones para wkhtmltoimage
-        options = {
-            'format': 'jpg',
-            'width': 820, # Un poco más que el div para margen
-            'disable-smart-width': '',
-            'quality': 90,
-            'encoding': "UTF-8"
-        }
-        # Convertimos el HTML string a bytes de imagen
-        img_bytes = imgkit.from_string(html_content, False, options=options)
+        import placa_render # Pillow se carga recién acá: es lo más pesado de importar
+        with tracing.span("placa", "render", formato=PLACA_FORMATO, ubicacion=ubicacion) as s:
+            img_bytes = placa_render.renderizar_placa(estado_visual(clima, alertas), clima, alertas, fecha, ubicacion, formato=PLACA_FORMATO)
+            s["bytes"] = len(img_bytes)
         print("✅")
         return img_bytes
     except Exception as e:
@@ -133,9 +206,9 @@ def generar_imagen_desde_html(html_content):
         return None
 
 # --- 3. REDACCIÓN IA ---
-def generar_pronostico_ia(clima, alertas, texto_cielo, fecha):
+def generar_pronostico_ia(clima, alertas, texto_cielo, fecha, ciudad=CIUDADES["Neuquén"], clave="Neuquén", limpiador=None):
     input_data = {
-        "ubicacion": "Neuquén Capital", "fecha": fecha,
+        "ubicacion": ciudad["nombre"], "fecha": fecha,
         "resumen_dia": f"Máxima {clima['temp_max']}°C, Mínima {clima['temp_min']}°C. Cielo {texto_cielo}.",
         "temp_actual": f"{clima['temp_actual']}°C",
         "viento": f"Ráfagas hasta {clima['viento_rafagas']} km/h",
@@ -147,17 +220,16 @@ def generar_pronostico_ia(clima, alertas, texto_cielo, fecha):
     DATOS: {json.dumps(input_data, ensure_ascii=False)}
     ESTRUCTURA MARKDOWN:
     1. TÍTULO (#):
-       - SI ALERTA: "⚠️ Alerta en Neuquén: [Fenómeno] y ráfagas fuertes".
-       - SI NO: "Clima en Neuquén: se espera una máxima de [Temp Max] y cielo [Cielo]".
+       - SI ALERTA: "⚠️ Alerta en {clave}: [Fenómeno] y ráfagas fuertes".
+       - SI NO: "Clima en {clave}: se espera una máxima de [Temp Max] y cielo [Cielo]".
     2. BAJADA: Resumen del día citando fuentes oficiales.
     3. CUERPO (##): "## Así estará el día" (Análisis general), "## Temperaturas y Viento" (Detalle), "## Recomendaciones" (3 tips).
     REGLAS: Negritas en datos. Tono útil y directo.
     """
     try:
         print("🤖 IA...", end=" ")
-        res = requests.post(f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}", 
-                            headers={'Content-Type': 'application/json'}, data=json.dumps({"contents": [{"parts": [{"text": prompt}]}]}), timeout=15)
-        if res.status_code == 200: print("✅"); return res.json()['candidates'][0]['content']['parts'][0]['text']
+        texto = gemini_client.llamar_modelo("gemini-2.5-flash-lite", prompt, limpiador=limpiador, timeout=15)
+        if texto: print("✅"); return texto
     except: pass
     print("❌"); return None
 
@@ -168,71 +240,124 @@ def obtener_fecha():
     now = datetime.now()
     return f"{dias[now.weekday()]} {now.day} de {meses[now.month-1]}"
 
-def subir_imagen_wordpress(img_data, es_url=False, filename_prefix="clima"):
+def slug(texto):
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-')
+
+def subir_imagen_wordpress(img_data, es_url=False, filename_prefix="clima", extension="jpg"):
     """Sube imagen a WP desde URL o desde bytes crudos."""
     print("⬆️ Subiendo a WP...", end=" ")
     try:
         if es_url:
-            res = requests.get(img_data, timeout=10); content = res.content
+            ingerida = imagenes.ingerir(img_data, f"{filename_prefix}-{int(time.time())}")
+            if not ingerida: return None
+            content, filename, mime = ingerida
         else:
             content = img_data # Ya son bytes
-
-        filename = f"{filename_prefix}-{int(time.time())}.jpg"
-        res = requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/media",
-                            headers={"Content-Type": "image/jpeg", "Content-Disposition": f"attachment; filename={filename}"},
-                            data=content, auth=(WORDPRESS_USER, WORDPRESS_APP_PASSWORD), timeout=15)
-        if res.status_code == 201: print(f"✅ ID: {res.json()['id']}"); return res.json()['id']
-        else: print(f"❌ {res.status_code} {res.text}")
+            filename = f"{filename_prefix}-{int(time.time())}.{extension}"
+            mime = "image/webp" if extension == "webp" else "image/jpeg"
+        media_id = wordpress.subir_media(WORDPRESS_URL, (WORDPRESS_USER, WORDPRESS_APP_PASSWORD), content, filename, mime)
+        if media_id: print(f"✅ ID: {media_id}"); return media_id
     except Exception as e: print(f"❌ {e}")
     return None
 
 # --- MAIN ---
+def etapas_ciudad(ciudad, indice, fecha, cola):
+    """
+    Etapas del reporte de una ciudad. La imagen (render + subida) y la redacción IA
+    solo necesitan los datos, así que corren a la vez; el post espera a las dos y
+    queda en `cola`, que al final publica todas las ciudades juntas.
+    """
+    c = ciudad["clave"]
+    auth = (WORDPRESS_USER, WORDPRESS_APP_PASSWORD)
+
+    def datos(climas, todas_alertas):
+        return climas[indice], filtrar_alertas(todas_alertas, ciudad)
+
+    def imagen(datos_ciudad):
+        # 3. GENERAR IMAGEN DESTACADA (mismos datos que la placa HTML)
+        clima, alertas = datos_ciudad
+        img_bytes = generar_imagen_placa(clima, alertas, fecha, ciudad["nombre"])
+        return subir_imagen_wordpress(img_bytes, es_url=False, filename_prefix=f"placa-clima-{slug(c)}", extension=PLACA_FORMATO)
+
+    def redaccion(datos_ciudad):
+        # 4. Redacción IA (con GEMINI_STREAM el borrador se crea apenas llega el título)
+        clima, alertas = datos_ciudad
+        borrador = wordpress.BorradorAnticipado(WORDPRESS_URL, auth, activo=gemini_client.GEMINI_STREAM)
+        limpiador = limpieza.LimpiadorIncremental("markdown", al_titulo=borrador.al_titulo)
+        texto_cielo = estado_visual(clima, alertas)["texto_cielo"]
+        texto_md = generar_pronostico_ia(clima, alertas, texto_cielo, fecha, ciudad, c, limpiador)
+        if not texto_md: borrador.descartar(); return None
+
+        # Limpieza Título (la primera línea '#' ya viene separada)
+        titulo, cuerpo_md = limpiador.terminar()
+        return titulo or f"Clima en {c}: {fecha}", cuerpo_md, borrador
+
+    def publicar(datos_ciudad, media_id, texto):
+        if not texto: return False
+        clima, alertas = datos_ciudad
+        titulo, cuerpo_md, borrador = texto
+        import markdown # Solo hace falta para publicar
+        cuerpo_html = markdown.markdown(cuerpo_md)
+
+        # 5. Armado Final (Placa HTML en cuerpo + Imagen Destacada seteada)
+        # Para el cuerpo usamos una versión escalada de la placa para que sea responsive
+        placa_html, _ = generar_placa_html(clima, alertas, fecha, ciudad["nombre"])
+        placa_responsive = f'<div style="max-width: 100%; overflow: auto;">{placa_html.replace("width: 800px;", "max-width: 600px; margin: auto;")}</div>'
+        
+        html_final = f"{placa_responsive}<br>{cuerpo_html}<hr><div style='background:#f4f4f4;padding:10px;font-size:14px;'>ℹ️ Datos oficiales: SMN y Open-Meteo.</div>"
+        
+        print(f"📮 En cola: {titulo}")
+        post = {
+            'title': titulo, 'content': html_final, 'status': 'publish',
+            'author': int(WORDPRESS_AUTHOR_ID), 
+            'featured_media': media_id # <-- AQUÍ VA LA PLACA GENERADA COMO IMAGEN
+        }
+        if media_id: cola.actualizar_media(media_id, {"alt_text": f"Pronóstico del clima en {ciudad['nombre']}: {fecha}"})
+        return borrador.encolar(cola, post)
+
+    return [
+        etapas.Etapa(f"datos:{c}", datos, "clima", "alertas"),
+        etapas.Etapa(f"imagen:{c}", imagen, f"datos:{c}"),
+        etapas.Etapa(f"redaccion:{c}", redaccion, f"datos:{c}"),
+        etapas.Etapa(f"post:{c}", publicar, f"datos:{c}", f"imagen:{c}", f"redaccion:{c}"),
+    ]
+
+@tracing.ejecucion("clima")
 def main():
     print(f"--- REPORTE CLIMA (PLACA + IMAGEN) ---")
+    if not config.wordpress_configurado():
+        print("❌ ERROR: Faltan variables de entorno WP.")
+        sys.exit(1)
     fecha = obtener_fecha()
-    
-    # 1. Datos
-    clima = obtener_clima_openmeteo()
-    if not clima: sys.exit(1)
-    alertas = obtener_alertas_smn()
-
-    # 2. Generar Placa HTML (Enfocada en el día)
-    placa_html, texto_cielo = generar_placa_html(clima, alertas, fecha)
-    
-    # 3. GENERAR IMAGEN DESTACADA DESDE EL HTML
-    img_bytes = generar_imagen_desde_html(placa_html)
-    media_id = subir_imagen_wordpress(img_bytes, es_url=False, filename_prefix="placa-clima")
-    
-    # 4. Redacción IA
-    texto_md = generar_pronostico_ia(clima, alertas, texto_cielo, fecha)
-    if not texto_md: sys.exit(1)
-
-    # Limpieza Título
-    texto_md = texto_md.replace('```markdown', '').replace('```', '').strip()
-    if texto_md.startswith('#'):
-        parts = texto_md.split('\n', 1)
-        titulo = parts[0].replace('#', '').replace('**', '').replace('__', '').strip()
-        cuerpo_md = parts[1].strip() if len(parts) > 1 else ""
-    else:
-        titulo = f"Clima: {fecha}"
-        cuerpo_md = texto_md
-    cuerpo_html = markdown.markdown(cuerpo_md)
-
-    # 5. Armado Final (Placa HTML en cuerpo + Imagen Destacada seteada)
-    # Para el cuerpo usamos una versión escalada de la placa para que sea responsive
-    placa_responsive = f'<div style="max-width: 100%; overflow: auto;">{placa_html.replace("width: 800px;", "max-width: 600px; margin: auto;")}</div>'
-    
-    html_final = f"{placa_responsive}<br>{cuerpo_html}<hr><div style='background:#f4f4f4;padding:10px;font-size:14px;'>ℹ️ Datos oficiales: SMN y Open-Meteo.</div>"
-    
-    print(f"🚀 Publicando: {titulo} ...", end=" ")
-    post = {
-        'title': titulo, 'content': html_final, 'status': 'publish',
-        'author': int(WORDPRESS_AUTHOR_ID), 
-        'featured_media': media_id # <-- AQUÍ VA LA PLACA GENERADA COMO IMAGEN
-    }
-    r = requests.post(f"{WORDPRESS_URL}/wp-json/wp/v2/posts", json=post, auth=(WORDPRESS_USER, WORDPRESS_APP_PASSWORD))
-    if r.status_code == 201: print("✅ OK")
-    else: print(f"❌ ERROR WP: {r.text}"); sys.exit(1)
+    ciudades = leer_ciudades()
+    if not ciudades: sys.exit(1)
+
+    def clima():
+        # 1. Datos: todas las ciudades en una sola llamada
+        climas = obtener_clima_openmeteo_lote(ciudades)
+        if not climas: raise RuntimeError("Open-Meteo sin datos")
+        return climas
+
+    # Open-Meteo y SMN no dependen entre sí: arrancan juntos
+    cola = wordpress.ColaPublicacion(WORDPRESS_URL, (WORDPRESS_USER, WORDPRESS_APP_PASSWORD))
+    grafo = [etapas.Etapa("clima", clima), etapas.Etapa("alertas", obtener_alertas_smn)]
+    for indice, ciudad in enumerate(ciudades): grafo += etapas_ciudad(ciudad, indice, fecha, cola)
+    resultados = etapas.ejecutar(grafo)
+    if resultados["clima"] is None: sys.exit(1)
+
+    # 6. Publicar todas las ciudades juntas (/batch/v1; de a uno si el sitio no lo tiene)
+    print(f"🚀 Publicando {len(ciudades)} ciudad(es)...")
+    cola.enviar()
+    fallidas = []
+    for c in ciudades:
+        r = resultados[f"post:{c['clave']}"]
+        r = r.result() if r else None
+        if r and r.status_code in (200, 201): print(f"✅ {c['clave']}: OK")
+        else:
+            fallidas.append(c["clave"])
+            if r: print(f"❌ ERROR WP ({c['clave']}): {r.text}")
+    if fallidas: print(f"❌ Sin publicar: {', '.join(fallidas)}"); sys.exit(1)
 
 if __name__ == "__main__":
     main()
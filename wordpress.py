@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import http_client
+import storage
+import tracing
+
+# --- CONFIGURACIÓN ---
+WP_LOTE_MAX = int(os.environ.get("WP_LOTE_MAX", "25")) # Pedidos por llamada a /batch/v1 (25 es el máximo por defecto de WP)
+WP_SUBIDAS_CONCURRENCIA = int(os.environ.get("WP_SUBIDAS_CONCURRENCIA", "4"))
+WP_MEDIA_INDICE_DIAS = int(os.environ.get("WP_MEDIA_INDICE_DIAS", "90")) # Se olvidan las subidas más viejas que esto
+
+_lock_indice = threading.Lock()
+_sin_lote = set() # Sitios donde /batch/v1 no existe (WP < 5.6 o bloqueado): se publica de a uno
+
+# --- MEDIA (con índice de deduplicación por hash) ---
+def _ruta_indice():
+    return storage.ruta("wp_media_index.json")
+
+def media_existe(wp_url, auth, media_id):
+    """Chequeo barato de que el adjunto sigue en la biblioteca (solo pedimos el campo id)."""
+    try:
+        res = http_client.get(f"{wp_url}/wp-json/wp/v2/media/{media_id}", params={"_fields": "id"}, auth=auth)
+        return res.status_code == 200
+    except Exception:
+        return False
+
+@tracing.etapa("subir_media", "upload")
+def subir_media(wp_url, auth, contenido, filename, content_type="image/jpeg"):
+    """
+    Sube bytes a /wp/v2/media y devuelve el ID del adjunto. Si ese mismo contenido
+    (hash SHA-256) ya se subió antes al sitio y el adjunto sigue existiendo, devuelve
+    el ID guardado sin volver a subir nada.
+    """
+    tracing.anotar(bytes=len(contenido), content_type=content_type)
+    clave = f"{wp_url}|{hashlib.sha256(contenido).hexdigest()}"
+    with _lock_indice:
+        previo = storage.leer_json(_ruta_indice(), {}).get(clave)
+    if previo and media_existe(wp_url, auth, previo["id"]):
+        print(f"♻️ Ya subida (ID {previo['id']})", end=" ")
+        tracing.anotar(reutilizada=True)
+        return previo["id"]
+
+    res = http_client.post(f"{wp_url}/wp-json/wp/v2/media",
+                           headers={"Content-Type": content_type, "Content-Disposition": f"attachment; filename={filename}"},
+                           data=contenido, auth=auth)
+    if res.status_code != 201:
+        print(f"❌ {res.status_code} {res.text}", end=" ")
+        return None
+
+    media_id = res.json()['id']
+    ahora = int(time.time())
+    with _lock_indice:
+        # Cada placa del clima es un hash nuevo: sin podar, el índice crecería para siempre
+        indice = {k: v for k, v in storage.leer_json(_ruta_indice(), {}).items()
+                  if ahora - v.get("subido", ahora) < WP_MEDIA_INDICE_DIAS * 86400}
+        indice[clave] = {"id": media_id, "archivo": filename, "subido": ahora}
+        storage.escribir_json(_ruta_indice(), indice)
+    return media_id
+
+# --- POSTS ---
+def buscar_posts(wp_url, auth, **filtros):
+    """
+    Posts de /wp/v2/posts que cumplen `filtros` (status, search, after, before...), solo con
+    id, estado, fecha y título; None si WP no respondió (no es lo mismo que "no hay").
+    """
+    try:
+        res = http_client.get(f"{wp_url}/wp-json/wp/v2/posts", params={"_fields": "id,status,date_gmt,title", **filtros}, auth=auth)
+        if res.status_code != 200: return None
+        return res.json()
+    except Exception:
+        return None
+
+class BorradorAnticipado:
+    """
+    Crea el post como borrador (solo con el título) en otro hilo apenas se conoce el
+    título, mientras la IA sigue escribiendo. publicar() espera ese alta y completa el
+    post; si nunca se llamó a al_titulo (o `activo` es False), publicar() lo crea de una.
+    """
+
+    def __init__(self, wp_url, auth, activo=True):
+        self.wp_url, self.auth, self.activo = wp_url, auth, activo
+        self.post_id = None
+        self._hilo = None
+
+    def al_titulo(self, titulo):
+        if not self.activo or self._hilo: return
+        self._hilo = threading.Thread(target=tracing.propagar(self._crear), args=(titulo,), daemon=True)
+        self._hilo.start()
+
+    def _crear(self, titulo):
+        try:
+            res = http_client.post(f"{self.wp_url}/wp-json/wp/v2/posts", json={"title": titulo, "status": "draft"}, auth=self.auth)
+            if res.status_code == 201: self.post_id = res.json()['id']
+        except Exception as e:
+            print(f"⚠️ Borrador anticipado: {e}")
+
+    @tracing.etapa("publicar", "post")
+    def publicar(self, post):
+        """Devuelve la respuesta de WP (201 si se creó, 200 si se completó el borrador)."""
+        if self._hilo: self._hilo.join()
+        if self.post_id: return http_client.post(f"{self.wp_url}/wp-json/wp/v2/posts/{self.post_id}", json=post, auth=self.auth)
+        return http_client.post(f"{self.wp_url}/wp-json/wp/v2/posts", json=post, auth=self.auth)
+
+    def descartar(self):
+        """Borra el borrador anticipado si la generación terminó fallando."""
+        if self._hilo: self._hilo.join()
+        if self.post_id:
+            http_client.request("DELETE", f"{self.wp_url}/wp-json/wp/v2/posts/{self.post_id}", params={"force": "true"}, auth=self.auth)
+            self.post_id = None
+
+    def encolar(self, cola, post):
+        """Como publicar(), pero el post va a `cola` (completa el borrador si se llegó a crear)."""
+        if self._hilo: self._hilo.join()
+        return cola.agregar(post, post_id=self.post_id)
+
+# --- COLA DE PUBLICACIÓN ---
+class Respuesta:
+    """Resultado de un pedido de la cola, con la misma forma que usan los reporters de una respuesta de requests."""
+
+    def __init__(self, status_code, cuerpo):
+        self.status_code, self._cuerpo = status_code, cuerpo
+
+    def json(self):
+        return self._cuerpo
+
+    @property
+    def text(self):
+        return json.dumps(self._cuerpo, ensure_ascii=False)
+
+class ColaPublicacion:
+    """
+    Junta posts y metadatos de media de una corrida y los manda juntos por
+    /wp-json/batch/v1 (de a WP_LOTE_MAX por llamada). Si el sitio no tiene ese endpoint,
+    se publican de a uno. Las subidas de archivos no entran en un lote: van en paralelo
+    sobre las conexiones del pool, y un post puede esperar la suya como destacada.
+
+        cola = ColaPublicacion(WORDPRESS_URL, auth)
+        imagen = cola.subir_media(contenido, "placa.jpg")
+        futuro = cola.agregar({"title": ..., "status": "draft"}, featured_media=imagen)
+        cola.enviar()
+        futuro.result().status_code
+    """
+
+    def __init__(self, wp_url, auth):
+        self.wp_url, self.auth = wp_url, auth
+        self._lock = threading.Lock()
+        self._pendientes = [] # (metodo, ruta, cuerpo, futuro de media o None, Future)
+        self._subidas = None
+
+    def subir_media(self, contenido, filename, content_type="image/jpeg"):
+        """Sube en segundo plano (como subir_media); devuelve un Future con el ID o None."""
+        with self._lock:
+            if self._subidas is None: self._subidas = ThreadPoolExecutor(max_workers=max(1, WP_SUBIDAS_CONCURRENCIA))
+        return self._subidas.submit(tracing.propagar(subir_media), self.wp_url, self.auth, contenido, filename, content_type)
+
+    def _encolar(self, metodo, ruta, cuerpo, media=None):
+        futuro = Future()
+        with self._lock: self._pendientes.append((metodo, ruta, cuerpo, media, futuro))
+        return futuro
+
+    def agregar(self, post, post_id=None, featured_media=None):
+        """
+        Encola el alta (o la actualización de `post_id`) de un post. `featured_media` puede
+        ser un ID o el Future de subir_media(). Devuelve un Future con la Respuesta.
+        """
+        ruta = f"/wp/v2/posts/{post_id}" if post_id else "/wp/v2/posts"
+        return self._encolar("POST", ruta, dict(post), featured_media)
+
+    def actualizar_media(self, media_id, campos):
+        """Encola cambios de metadatos de un adjunto (alt_text, caption, title...)."""
+        return self._encolar("POST", f"/wp/v2/media/{media_id}", dict(campos))
+
+    @tracing.etapa("lote", "post")
+    def enviar(self):
+        """Manda todo lo encolado; devuelve las Respuestas en el orden en que se agregaron."""
+        with self._lock: pendientes, self._pendientes = self._pendientes, []
+        if self._subidas: self._subidas.shutdown(wait=True)
+        self._subidas = None
+        if not pendientes: return []
+
+        pedidos = []
+        for metodo, ruta, cuerpo, media, futuro in pendientes:
+            if media is not None:
+                try: media_id = media.result() if isinstance(media, Future) else media
+                except Exception as e: print(f"⚠️ Subida de media: {e}"); media_id = None # Se publica sin destacada
+                if media_id: cuerpo["featured_media"] = media_id
+            pedidos.append((metodo, ruta, cuerpo))
+        tracing.anotar(pedidos=len(pedidos))
+
+        respuestas = []
+        try:
+            while len(respuestas) < len(pedidos):
+                resto = pedidos[len(respuestas):]
+                parte = None if self.wp_url in _sin_lote else self._lote(resto[:max(1, WP_LOTE_MAX)])
+                # Sin endpoint de lotes: lo que queda, de a uno
+                if parte is None:
+                    with ThreadPoolExecutor(max_workers=max(1, WP_SUBIDAS_CONCURRENCIA)) as pool:
+                        parte = list(pool.map(lambda tarea: tarea[0](*tarea[1]), [(tracing.propagar(self._individual), p) for p in resto]))
+                respuestas += parte
+        except Exception as e:
+            # Nadie puede quedar esperando un Future sin resolver: lo que no llegó a mandarse es un error
+            print(f"⚠️ Cola WP: {e}")
+            respuestas += [Respuesta(0, {"code": "sin_respuesta", "message": str(e)})] * (len(pedidos) - len(respuestas))
+
+        for (_, _, _, _, futuro), respuesta in zip(pendientes, respuestas): futuro.set_result(respuesta)
+        return respuestas
+
+    def _lote(self, pedidos):
+        """Una llamada a /batch/v1; None si el sitio no la soporta."""
+        cuerpo = {"validation": "normal", "requests": [{"method": m, "path": r, "body": c} for m, r, c in pedidos]}
+        try:
+            res = http_client.post(f"{self.wp_url}/wp-json/batch/v1", json=cuerpo, auth=self.auth)
+        except Exception as e:
+            print(f"⚠️ Lote WP: {e}")
+            return [Respuesta(0, {"code": "sin_respuesta", "message": str(e)}) for _ in pedidos]
+        if res.status_code in (404, 405) or (res.status_code == 400 and "rest_no_route" in res.text):
+            print("⚠️ WP sin /batch/v1: se publica de a uno", end=" ")
+            _sin_lote.add(self.wp_url)
+            return None
+        if res.status_code not in (200, 207):
+            return [Respuesta(res.status_code, {"code": "lote_fallido", "message": res.text[:300]}) for _ in pedidos]
+        try: datos = res.json()
+        except ValueError: return [Respuesta(res.status_code, {"code": "lote_ilegible", "message": res.text[:300]}) for _ in pedidos]
+        # Con validation "normal" cada pedido se valida y se ejecuta por su cuenta: el que falla
+        # trae su propio status y error y los demás se aplican igual. Una posición en null (o que
+        # falta) no se llegó a ejecutar
+        return [Respuesta(r.get("status", 500), r.get("body")) if r else Respuesta(0, {"code": "no_ejecutado"})
+                for r in datos.get("responses", [])] + [Respuesta(0, {"code": "sin_respuesta"})] * (len(pedidos) - len(datos.get("responses", [])))
+
+    def _individual(self, metodo, ruta, cuerpo):
+        try:
+            res = http_client.request(metodo, f"{self.wp_url}/wp-json{ruta}", json=cuerpo, auth=self.auth)
+            try: datos = res.json()
+            except ValueError: datos = {"message": res.text[:300]}
+            return Respuesta(res.status_code, datos)
+        except Exception as e:
+            return Respuesta(0, {"code": "sin_respuesta", "message": str(e)})